@@ -1,42 +1,488 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import os
+import secrets
+import threading
+import time
+from query_cache import QueryCache, normalize_query, embedding_key
+from vector_index import load_index, IVF_NPROBE, NUMPY_INDEX_DIR, RESCORE_FACTOR
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, LEXICAL_INDEX_FILE, RRF_K
+from search_filters import filters_key
+from metadata_store import MetadataStore, METADATA_DB, DEFAULT_FIELDS
+from encoder import load_encoder, ONNX_DIR
+from reranker import CrossEncoderReranker, RERANK_CANDIDATES, RERANK_BUDGET_MS, PASSAGE_CHARS, passage_text
+from metrics import Histogram, BATCH_SIZE_BUCKETS
 
-# Initialize your ChromaDB client and collection path
-client = chromadb.PersistentClient(path="./chroma_db")
-collection = client.get_collection("youtube_videos")
+# Vector backend: "chroma" (default), "numpy" (exact, memory-mapped), "ivf",
+# or "int8" / "binary" (quantized scan + exact rescoring)
+INDEX_BACKEND = os.getenv("QUERYTUBE_INDEX_BACKEND", "chroma")
+NUMPY_DIR = os.getenv("QUERYTUBE_NUMPY_INDEX_DIR", NUMPY_INDEX_DIR)
+NPROBE = int(os.getenv("QUERYTUBE_IVF_NPROBE", IVF_NPROBE))
+RESCORE = int(os.getenv("QUERYTUBE_RESCORE_FACTOR", RESCORE_FACTOR))
 
-# Load the same embedding model as used during ingestion
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Change to match your setup
+MODEL_NAME = os.getenv("QUERYTUBE_MODEL", "all-MiniLM-L6-v2")  # must match the model used at ingest
+# Query encoder: "torch" (SentenceTransformer) or "onnx" (export with: python encoder.py export)
+ENCODER_BACKEND = os.getenv("QUERYTUBE_ENCODER", "torch")
+ENCODER_ONNX_DIR = os.getenv("QUERYTUBE_ONNX_DIR", ONNX_DIR)
+ENCODER_QUANTIZED = os.getenv("QUERYTUBE_ONNX_QUANTIZED", "1") == "1"
+ENCODER_THREADS = int(os.getenv("QUERYTUBE_ENCODER_THREADS", "0"))  # 0 = library default
+METADATA_DB_PATH = os.getenv("QUERYTUBE_METADATA_DB", METADATA_DB)
 
-def search_youtube_videos(query_text, top_n=5):
-    # Encode the search query to an embedding vector
-    query_embedding = model.encode([query_text])[0]
+# Model, index and metadata store are loaded on first use (or by warm_up()),
+# never at import time
+model = None
+index = None
+metadata_store = None
+_resources_lock = threading.Lock()
 
-    # Perform semantic search in ChromaDB
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=top_n
-    )
+# BM25 index for exact-term queries; loaded on first lexical/hybrid search
+LEXICAL_INDEX_PATH = os.getenv("QUERYTUBE_LEXICAL_INDEX", LEXICAL_INDEX_FILE)
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("QUERYTUBE_HYBRID_CANDIDATES", "50"))  # per ranking, before fusion
+_lexical_index = None
+_lexical_lock = threading.Lock()
+
+# Repeat queries skip both the model and the vector index
+query_cache = QueryCache()
+# Texts per model forward pass (cache misses only), exported by the API's /metrics
+encode_batch_size = Histogram(BATCH_SIZE_BUCKETS)
+
+# Optional cross-encoder second stage; its model loads on the first rerank=True search
+reranker = CrossEncoderReranker()
+# Pair scores were computed on indexed text, so a reindex drops them with the result lists
+query_cache.attach(reranker.pair_scores)
+
+# Chunked collections hold several vectors per video: over-fetch, then fold
+# chunk hits into one result per parent video (one-vector-per-video indexes fetch exactly)
+CHUNK_OVERSAMPLE = 4
+AGGREGATION = "max"        # "max" = best chunk, "mean" = mean of the top AGGREGATION_TOP_K chunks
+AGGREGATION_TOP_K = 3
+
+# Cursor pagination: a search keeps at most this many candidates for its pages
+MAX_CANDIDATES = int(os.getenv("QUERYTUBE_PAGINATION_MAX_CANDIDATES", "1000"))
+PREFETCH_PAGES = 5         # pages of candidates fetched up front; deeper pages extend the list
+
+class CursorExpired(LookupError):
+    """The cursor's paging state was evicted, timed out or invalidated by a reindex."""
+
+def load_resources():
+    """Load the embedding model, vector index and metadata store once."""
+    global model, index, metadata_store
+    with _resources_lock:
+        if model is None:
+            model = load_encoder(ENCODER_BACKEND, MODEL_NAME, ENCODER_ONNX_DIR,
+                                 quantized=ENCODER_QUANTIZED, threads=ENCODER_THREADS)
+        if index is None:
+            index = load_index(INDEX_BACKEND, numpy_dir=NUMPY_DIR, nprobe=NPROBE, rescore=RESCORE)
+        if metadata_store is None:
+            # Display fields (title, channel, url, ...) and transcripts for snippets
+            metadata_store = MetadataStore(METADATA_DB_PATH)
+
+def get_model():
+    if model is None:
+        load_resources()
+    return model
+
+def get_index():
+    if index is None:
+        load_resources()
+    return index
+
+def get_metadata_store():
+    if metadata_store is None:
+        load_resources()
+    return metadata_store
+
+def index_stats():
+    """Vector count and scanned bytes of the loaded index ({} until it is loaded)."""
+    if index is None:
+        return {}
+    stats = {"vectors": index.count()}
+    if hasattr(index, "nbytes"):
+        stats["bytes"] = index.nbytes()
+    return stats
+
+def warm_up():
+    """Load everything and run one encode + index query so the first request is not slow."""
+    start = time.perf_counter()
+    load_resources()
+    embedding = get_model().encode(["warm up"])
+    if get_index().count():
+        get_index().query(query_embeddings=[embedding[0]], n_results=1)
+    return time.perf_counter() - start
+
+def _parse_hits(results, row, top_n, aggregation=AGGREGATION):
+    """Turn one row of a (ChromaDB-shaped) query result into per-video {id, score} hits."""
+    ids = results['ids'][row]
+    distances = results['distances'][row]
+    metadatas = results['metadatas'][row]
+
+    # Group chunk positions by parent video; ChromaDB returns them nearest first
+    groups = {}
+    for i in range(len(ids)):
+        metadata = metadatas[i] or {}
+        groups.setdefault(metadata.get('parent_id', ids[i]), []).append(i)
+
+    scored = []
+    for parent_id, positions in groups.items():
+        if aggregation == "mean":
+            top = [distances[i] for i in positions[:AGGREGATION_TOP_K]]
+            score = sum(top) / len(top)
+        else:
+            score = distances[positions[0]]
+        scored.append((score, parent_id, positions[0]))
+    scored.sort(key=lambda item: item[0])
 
-    # Parse and return the metadata for display or further processing
     hits = []
-    for i in range(len(results['ids'][0])):
-        metadata = results['metadatas'][0][i]
+    for score, parent_id, best in scored[:top_n]:
+        metadata = metadatas[best] or {}
         video_result = {
-            "id": results['ids'][0][i],
-            "title": metadata.get('title', ''),
-            "channel": metadata.get('channel', ''),
-            "url": metadata.get('url', ''),
-            "description": metadata.get('description', ''),
-            "thumbnail": metadata.get('thumbnail', ''),
-            "score": results['distances'][0][i]  # Lower = better match
+            "id": parent_id,
+            "score": score  # Lower = better match
         }
+        if 'chunk_index' in metadata:
+            # Span of the transcript that matched best
+            video_result["best_chunk"] = {
+                "chunk_index": metadata['chunk_index'],
+                "char_start": metadata.get('char_start'),
+                "char_end": metadata.get('char_end'),
+            }
         hits.append(video_result)
     return hits
 
-# Example usage
-query = "How to use pandas for data analysis"
-results = search_youtube_videos(query, top_n=5)
-for video in results:
-    print(f"{video['title']} ({video['channel']}) - {video['url']}")
-    print(f"Description: {video['description']}\nThumbnail: {video['thumbnail']}\nScore: {video['score']}\n")
+def hydrate(hits, fields=None, snippet_chars=None):
+    """Attach display fields (and optional transcript snippets) from the metadata store.
+
+    Snippets start at the best-matching chunk when the index is chunked.
+    """
+    fields = DEFAULT_FIELDS if fields is None else fields
+    starts = {h["id"]: h["best_chunk"]["char_start"] for h in hits if h.get("best_chunk")}
+    records = get_metadata_store().fetch([h["id"] for h in hits], fields, snippet_chars, starts)
+    output = []
+    for hit in hits:
+        record = records.get(hit["id"], {})
+        result = {"id": hit["id"]}
+        result.update({f: record.get(f) for f in fields})
+        if snippet_chars:
+            result["snippet"] = record.get("snippet", "")
+        result.update((k, v) for k, v in hit.items() if k != "id")
+        output.append(result)
+    return output
+
+def rerank_hits(query_texts, hit_lists, top_ns, budget_ms=RERANK_BUDGET_MS, timings=None):
+    """Rescore each query's first-stage hits with the cross-encoder and keep its top_n.
+
+    Candidates are read as title + best chunk (the start of the transcript
+    when the index is not chunked).
+    """
+    wanted = {}
+    for hits in hit_lists:
+        for hit in hits:
+            chunk = hit.get("best_chunk")
+            wanted[(hit["id"], chunk["chunk_index"] if chunk else None)] = chunk["char_start"] if chunk else 0
+    passages = {}
+    while wanted:
+        # One fetch per round; a video matched on different chunks by different queries needs another
+        round_keys = {}
+        for key in wanted:
+            round_keys.setdefault(key[0], key)
+        records = get_metadata_store().fetch(list(round_keys), ("title",), PASSAGE_CHARS,
+                                             {vid: wanted[key] for vid, key in round_keys.items()})
+        for vid, key in round_keys.items():
+            record = records.get(vid, {})
+            passages[key] = passage_text(record.get("title"), record.get("snippet"))
+            del wanted[key]
+    reranked = reranker.rerank_many(query_texts, hit_lists, passages, budget_ms, timings)
+    return [hits[:n] for hits, n in zip(reranked, top_ns)]
+
+def get_lexical_index():
+    global _lexical_index
+    with _lexical_lock:
+        if _lexical_index is None:
+            if not os.path.exists(LEXICAL_INDEX_PATH):
+                raise FileNotFoundError(
+                    f"Lexical index {LEXICAL_INDEX_PATH} not found; run: python lexical_index.py build")
+            _lexical_index = LexicalIndex(LEXICAL_INDEX_PATH)
+        return _lexical_index
+
+def _index_version():
+    lexical_version = os.path.getmtime(LEXICAL_INDEX_PATH) if os.path.exists(LEXICAL_INDEX_PATH) else None
+    return (get_index().version(), lexical_version)
+
+def _lexical_hit(hit):
+    return {"id": hit["id"], "score": hit["score"]}
+
+def _fuse(vector_hits, lexical_hits, top_n):
+    """Reciprocal rank fusion of one query's vector and lexical hit lists."""
+    by_id = {h["id"]: h for h in lexical_hits}
+    by_id.update({h["id"]: h for h in vector_hits})  # vector hits may carry a best chunk
+    vector_scores = {h["id"]: h["score"] for h in vector_hits}
+    lexical_scores = {h["id"]: h["score"] for h in lexical_hits}
+    fused = reciprocal_rank_fusion([[h["id"] for h in vector_hits], [h["id"] for h in lexical_hits]], k=RRF_K)
+    hits = []
+    for video_id, score in fused[:top_n]:
+        hit = dict(by_id[video_id])
+        hit["score"] = score  # Higher = better
+        hit["vector_score"] = vector_scores.get(video_id)
+        hit["lexical_score"] = lexical_scores.get(video_id)
+        hits.append(hit)
+    return hits
+
+def _result_key(mode, query_text, embedding, top_n, filters=None):
+    if mode == "lexical":
+        key = (normalize_query(query_text), top_n, mode)
+    elif mode == "hybrid":
+        key = (embedding_key(embedding), top_n, mode)
+    else:
+        key = (embedding_key(embedding), top_n)
+    fkey = filters_key(filters)
+    return key if fkey is None else key + (fkey,)
+
+def _ms(start):
+    return (time.perf_counter() - start) * 1000
+
+def encode_queries(query_texts):
+    """Return one embedding per query, encoding only those not already cached."""
+    keys = [normalize_query(q) for q in query_texts]
+    embeddings = [query_cache.embeddings.get(k) for k in keys]
+    to_encode = list(dict.fromkeys(k for k, e in zip(keys, embeddings) if e is None))
+    if to_encode:
+        # Encode every uncached query in a single forward pass
+        encode_batch_size.observe(len(to_encode))
+        fresh = dict(zip(to_encode, get_model().encode(to_encode)))
+        for key, emb in fresh.items():
+            query_cache.embeddings.set(key, emb)
+        embeddings = [e if e is not None else fresh[k] for k, e in zip(keys, embeddings)]
+    return embeddings
+
+def _first_stage(query_texts, query_embeddings, stage_ns, mode, filters, timings, use_cache=True):
+    """Slim {id, score} hit lists, stage_ns[i] deep, from the result cache or the index(es)."""
+    output = [None] * len(query_texts)
+    result_keys = [_result_key(mode, q, e, n, filters) for q, e, n in zip(query_texts, query_embeddings, stage_ns)]
+    pending = []
+    for row, key in enumerate(result_keys):
+        hits = query_cache.results.get(key) if use_cache else None
+        if hits is None:
+            pending.append(row)
+        else:
+            output[row] = hits
+
+    if pending:
+        # Hybrid fuses deeper candidate lists than the caller asked for
+        depth = max(stage_ns[row] for row in pending)
+        if mode == "hybrid":
+            depth = max(depth, HYBRID_CANDIDATES)
+
+        vector_hits = lexical_hits = None
+        if mode != "lexical":
+            start = time.perf_counter()
+            # One index round trip, sized for the largest request plus chunk headroom
+            vector_index = get_index()
+            results = vector_index.query(
+                query_embeddings=[query_embeddings[row] for row in pending],
+                n_results=depth * CHUNK_OVERSAMPLE if vector_index.chunked() else depth,
+                filters=filters
+            )
+            vector_hits = [_parse_hits(results, i, depth if mode == "hybrid" else stage_ns[row])
+                           for i, row in enumerate(pending)]
+            timings["vector_ms"] = _ms(start)
+        if mode != "vector":
+            start = time.perf_counter()
+            lexical = get_lexical_index()
+            lexical_hits = [[_lexical_hit(h) for h in lexical.search(query_texts[row], depth, filters)]
+                            for row in pending]
+            timings["lexical_ms"] = _ms(start)
+
+        start = time.perf_counter()
+        for i, row in enumerate(pending):
+            if mode == "hybrid":
+                hits = _fuse(vector_hits[i], lexical_hits[i], stage_ns[row])
+            elif mode == "lexical":
+                hits = lexical_hits[i][:stage_ns[row]]
+            else:
+                hits = vector_hits[i]
+            if use_cache:
+                query_cache.results.set(result_keys[row], hits)
+            output[row] = hits
+        if mode == "hybrid":
+            timings["fusion_ms"] = _ms(start)
+    return output
+
+def cached_search(query_text, top_n=5, mode="vector", filters=None, fields=None, snippet_chars=None,
+                  rerank=False):
+    """Return hits straight from the cache, or None if the model or index is needed."""
+    if rerank:
+        return None  # reranking always needs the cross-encoder (pair scores are cached there)
+    if index is not None:
+        # Hits must not outlive a reindex; before the first load nothing is cached yet
+        query_cache.check_version(_index_version)
+    embedding = None
+    if mode != "lexical":
+        embedding = query_cache.embeddings.get(normalize_query(query_text))
+        if embedding is None:
+            return None
+    hits = query_cache.results.get(_result_key(mode, query_text, embedding, top_n, filters))
+    return None if hits is None else hydrate(hits, fields, snippet_chars)
+
+def search_youtube_videos_batch(query_texts, top_ns, mode="vector", timings=None, filters=None,
+                                fields=None, snippet_chars=None, query_embeddings=None, rerank=False):
+    """Search many queries with one encode call and one multi-embedding query.
+
+    ``mode`` is "vector", "lexical" (BM25) or "hybrid" (both, fused by
+    reciprocal rank). ``filters`` (see search_filters) restrict every query
+    in the batch and are applied inside the index, not afterwards. ``fields``
+    projects the display fields (default DEFAULT_FIELDS) and ``snippet_chars``
+    adds a transcript snippet of that length. Stage durations in ms are
+    written into ``timings``. Pass ``query_embeddings`` to skip encoding.
+    With ``rerank`` the top RERANK_CANDIDATES hits are rescored by the
+    cross-encoder (see reranker) within RERANK_BUDGET_MS.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of {SEARCH_MODES}")
+    if not query_texts:
+        return []
+    timings = {} if timings is None else timings
+    total_start = time.perf_counter()
+    query_cache.check_version(_index_version)
+    if query_embeddings is None and mode == "lexical":
+        query_embeddings = [None] * len(query_texts)
+    elif query_embeddings is None:
+        start = time.perf_counter()
+        query_embeddings = encode_queries(query_texts)
+        timings["encode_ms"] = _ms(start)
+
+    # Reranking needs a deeper first stage than the caller asked for
+    stage_ns = [max(n, RERANK_CANDIDATES) for n in top_ns] if rerank else list(top_ns)
+    output = _first_stage(query_texts, query_embeddings, stage_ns, mode, filters, timings)
+
+    if rerank:
+        output = rerank_hits(query_texts, output, top_ns, timings=timings)
+
+    # Cached and fresh hits alike are slim ({id, score}); display fields come from the store
+    start = time.perf_counter()
+    output = [hydrate(hits, fields, snippet_chars) for hits in output]
+    timings["hydrate_ms"] = _ms(start)
+    timings["total_ms"] = _ms(total_start)
+    return output
+
+def search_many(queries, mode="vector", fields=None, snippet_chars=None, timings=None, rerank=False):
+    """Search a list of {"query", "top_k", "filters"} dicts; returns one hit list per query.
+
+    All queries are encoded in one call; queries sharing the same filters then
+    go to the index together, one multi-embedding query per distinct filter set.
+    """
+    timings = {} if timings is None else timings
+    total_start = time.perf_counter()
+    texts = [q["query"] for q in queries]
+    embeddings = [None] * len(queries)
+    if mode != "lexical" and texts:
+        start = time.perf_counter()
+        embeddings = encode_queries(texts)
+        timings["encode_ms"] = _ms(start)
+
+    groups = {}
+    for i, q in enumerate(queries):
+        groups.setdefault(filters_key(q.get("filters")), []).append(i)
+    output = [None] * len(queries)
+    start = time.perf_counter()
+    for rows in groups.values():
+        filters = queries[rows[0]].get("filters")
+        results = search_youtube_videos_batch(
+            [texts[i] for i in rows], [queries[i].get("top_k", 5) for i in rows], mode=mode,
+            filters=filters, fields=fields, snippet_chars=snippet_chars,
+            query_embeddings=[embeddings[i] for i in rows], rerank=rerank,
+        )
+        for i, hits in zip(rows, results):
+            output[i] = hits
+    timings["search_ms"] = _ms(start)
+    timings["filter_groups"] = len(groups)
+    timings["total_ms"] = _ms(total_start)
+    return output
+
+def _cursor_token(cursor_id, offset):
+    return f"{cursor_id}.{offset}"
+
+def _parse_cursor(cursor):
+    cursor_id, _, offset = str(cursor).rpartition(".")
+    if not cursor_id or not offset.isdigit():
+        raise ValueError("Malformed cursor")
+    return cursor_id, int(offset)
+
+def search_page(query_text=None, page_size=10, cursor=None, mode="vector", filters=None, fields=None,
+                snippet_chars=None, rerank=False, timings=None):
+    """One page of results and the cursor of the next page (None after the last one).
+
+    Without ``cursor`` the query is searched once, up to PREFETCH_PAGES pages
+    deep, and its embedding and candidate list are kept in
+    ``query_cache.cursors``. A cursor serves later pages from that state, with
+    the search options it was created with: no re-encoding, and the index is
+    queried again (with the stored embedding) only to extend the list, never
+    past MAX_CANDIDATES. Pages never overlap. ``fields`` and
+    ``snippet_chars`` may differ per page. With ``rerank`` the top
+    RERANK_CANDIDATES candidates are reranked once, when the cursor is
+    created. Raises CursorExpired for an unknown or expired cursor.
+    """
+    if page_size <= 0:
+        raise ValueError("page_size must be > 0")
+    timings = {} if timings is None else timings
+    total_start = time.perf_counter()
+    query_cache.check_version(_index_version)  # a reindex drops every cursor
+    if cursor is None:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SEARCH_MODES}")
+        embedding = None
+        if mode != "lexical":
+            start = time.perf_counter()
+            embedding = encode_queries([query_text])[0]
+            timings["encode_ms"] = _ms(start)
+        depth = min(MAX_CANDIDATES, max(page_size * PREFETCH_PAGES, RERANK_CANDIDATES if rerank else 0))
+        hits = _first_stage([query_text], [embedding], [depth], mode, filters, timings, use_cache=False)[0]
+        exhausted = len(hits) < depth
+        if rerank:
+            hits = rerank_hits([query_text], [hits[:RERANK_CANDIDATES]], [RERANK_CANDIDATES],
+                               timings=timings)[0] + hits[RERANK_CANDIDATES:]
+        cursor_id, offset = secrets.token_urlsafe(12), 0
+        state = {"query": query_text, "mode": mode, "filters": filters, "rerank": rerank,
+                 "embedding": embedding, "hits": hits, "depth": depth, "exhausted": exhausted,
+                 "lock": threading.Lock()}
+    else:
+        cursor_id, offset = _parse_cursor(cursor)
+        state = query_cache.cursors.get(cursor_id)
+        if state is None:
+            raise CursorExpired("Cursor expired; repeat the search without a cursor")
+        timings["cursor_hit"] = True
+
+    with state["lock"]:
+        end = offset + page_size
+        hits = state["hits"]
+        if end > len(hits) and not state["exhausted"] and state["depth"] < MAX_CANDIDATES:
+            # Deeper than the candidates so far: query again with the stored embedding
+            depth = min(MAX_CANDIDATES, max(state["depth"] * 2, end))
+            fresh = _first_stage([state["query"]], [state["embedding"]], [depth], state["mode"],
+                                 state["filters"], timings, use_cache=False)[0]
+            seen = {hit["id"] for hit in hits}
+            hits.extend(hit for hit in fresh if hit["id"] not in seen)
+            state["depth"], state["exhausted"] = depth, len(fresh) < depth
+        page = hits[offset:end]
+        more = end < len(hits) or (not state["exhausted"] and state["depth"] < MAX_CANDIDATES)
+    # Each page served renews the cursor's time to live
+    query_cache.cursors.set(cursor_id, state)
+    next_cursor = _cursor_token(cursor_id, end) if more and query_cache.cursors.maxsize > 0 else None
+
+    start = time.perf_counter()
+    results = hydrate(page, fields, snippet_chars)
+    timings["hydrate_ms"] = _ms(start)
+    timings["total_ms"] = _ms(total_start)
+    return {"query": state["query"], "mode": state["mode"], "rerank": state["rerank"], "offset": offset,
+            "results": results, "next_cursor": next_cursor}
+
+def search_youtube_videos(query_text, top_n=5, mode="vector", filters=None, fields=None, snippet_chars=None,
+                          rerank=False):
+    return search_youtube_videos_batch([query_text], [top_n], mode=mode, filters=filters,
+                                       fields=fields, snippet_chars=snippet_chars, rerank=rerank)[0]
+
+if __name__ == "__main__":
+    # Example usage
+    query = "How to use pandas for data analysis"
+    results = search_youtube_videos(query, top_n=5)
+    for video in results:
+        print(f"{video['title']} ({video['channel']}) - {video['url']}")
+        print(f"Description: {video['description']}\nThumbnail: {video['thumbnail']}\nScore: {video['score']}\n")
@@ -1,10 +1,125 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List, Literal, Optional
+from datetime import datetime
+import json
+import logging
+import os
+import time
 from fastapi.middleware.cors import CORSMiddleware
-from Search_Query_main import search_youtube_videos
+from Search_Query_main import query_cache, reranker, encode_batch_size, index_stats, CursorExpired
+from search_service import SearchService, ServiceNotReady
+from metadata_store import RESULT_FIELDS
+from search_filters import normalize_filters
+from metrics import MetricsRegistry
 
-app = FastAPI(title="QueryTube: YouTube Semantic Search API")
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_QUERIES = int(os.getenv("QUERYTUBE_MAX_BATCH_QUERIES", "10000"))
+MAX_TOP_K = int(os.getenv("QUERYTUBE_MAX_TOP_K", "100"))   # results (or page size) per query
+# Server-Timing header on every /search response; otherwise only when the request sends TIMING_HEADER: 1
+TIMING_HEADERS = os.getenv("QUERYTUBE_TIMING_HEADERS", "0") == "1"
+TIMING_HEADER = "x-querytube-timing"
+
+# Model, index and executor are created at startup, not on import
+service = SearchService()
+
+# Served at /metrics. Hot-path metrics are plain counters/histograms; cache,
+# index and batcher state is read at scrape time.
+metrics = MetricsRegistry()
+IN_FLIGHT = metrics.gauge("querytube_http_requests_in_flight", "HTTP requests currently being served")
+SEARCH_CACHE = {
+    True: metrics.counter("querytube_search_cache_total", "/search requests by result cache outcome", result="hit"),
+    False: metrics.counter("querytube_search_cache_total", "/search requests by result cache outcome", result="miss"),
+}
+_stage_histograms = {}
+metrics.register("querytube_encode_batch_size", "histogram", "Texts per model encode call (cache misses only)",
+                 encode_batch_size)
+metrics.callback("querytube_cache_hit_ratio", "gauge", "Hit ratio of the query caches",
+                 lambda: {(("cache", name),): stats["hit_rate"]
+                          for name, stats in query_cache.stats().items() if isinstance(stats, dict)})
+metrics.callback("querytube_cache_entries", "gauge", "Entries held by the query caches",
+                 lambda: {(("cache", name),): stats["size"]
+                          for name, stats in query_cache.stats().items() if isinstance(stats, dict)})
+metrics.callback("querytube_index_vectors", "gauge", "Vectors in the loaded index",
+                 lambda: index_stats().get("vectors"))
+metrics.callback("querytube_index_bytes", "gauge", "Bytes of the vector matrix the index scans",
+                 lambda: index_stats().get("bytes"))
+
+def _stage_histogram(key):
+    histogram = _stage_histograms.get(key)
+    if histogram is None:
+        histogram = _stage_histograms[key] = metrics.histogram(
+            "querytube_search_stage_milliseconds", "/search time per stage", stage=key[:-3])
+    return histogram
+
+def record_search(timings):
+    """Feed one /search call's stage timings into the metrics."""
+    SEARCH_CACHE[bool(timings.get("cache_hit"))].inc()
+    for key, value in timings.items():
+        if key.endswith("_ms"):
+            _stage_histogram(key).observe(value)
+
+def server_timing(timings):
+    """Stage timings as a Server-Timing header value (shown in browser dev tools)."""
+    return ", ".join(f"{key[:-3]};dur={value:.2f}" for key, value in timings.items() if key.endswith("_ms"))
+
+class RequestMetrics:
+    """ASGI middleware counting requests and their latency per route and status, plus in-flight."""
+
+    def __init__(self, app):
+        self.app = app
+        self.paths = None
+        self._counters = {}
+        self._latency = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self.paths is None:
+            self.paths = frozenset(getattr(route, "path", None) for route in scope["app"].routes)
+        # Unknown paths share one label so scanners cannot blow up the series count
+        path = scope["path"] if scope["path"] in self.paths else "other"
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            latency = self._latency.get(path)
+            if latency is None:
+                latency = self._latency[path] = metrics.histogram(
+                    "querytube_http_request_duration_milliseconds", "HTTP request latency", path=path)
+            latency.observe(elapsed_ms)
+            counter = self._counters.get((path, status))
+            if counter is None:
+                counter = self._counters[(path, status)] = metrics.counter(
+                    "querytube_http_requests_total", "HTTP requests by route and status",
+                    path=path, status=str(status))
+            counter.inc()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await service.start()
+    metrics.register("querytube_microbatch_size", "histogram", "Queries folded into one search batch",
+                     service.searcher.batch_size)
+    metrics.register("querytube_microbatch_latency_milliseconds", "histogram",
+                     "Time a query spends in the micro-batcher, queueing included", service.searcher.latency_ms)
+    yield
+    await service.stop()
+
+app = FastAPI(title="QueryTube: YouTube Semantic Search API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,28 +128,166 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetrics)
+
+class SearchFilters(BaseModel):
+    channel: Optional[List[str]] = None           # channel titles, any of
+    published_after: Optional[datetime] = None
+    published_before: Optional[datetime] = None
+    min_duration: Optional[int] = None            # seconds
+    max_duration: Optional[int] = None
+    language: Optional[List[str]] = None          # defaultLanguage values, any of
+    min_views: Optional[int] = None
 
 class SearchRequest(BaseModel):
+    query: str = ""                          # may be omitted when continuing from a cursor
+    top_k: int = 5                           # results, or page size when paginating
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+    filters: Optional[SearchFilters] = None
+    fields: Optional[List[str]] = None       # display fields to return; default title, channel, url, description, thumbnail
+    snippet_length: Optional[int] = None     # transcript snippet characters (best chunk when chunked)
+    rerank: bool = False                     # rescore the top candidates with the cross-encoder
+    paginate: bool = False                   # return top_k results plus a next_cursor for the next page
+    cursor: Optional[str] = None             # next page of an earlier search; its query, mode, filters and rerank apply
+
+class BatchQuery(BaseModel):
     query: str
     top_k: int = 5
+    filters: Optional[SearchFilters] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchQuery]
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+    fields: Optional[List[str]] = None
+    snippet_length: Optional[int] = None
+    rerank: bool = False
 
 
 @app.post("/search")
-async def search_videos(req: SearchRequest) -> Dict[str, Any]:
-    if not req.query or not req.query.strip():
+async def search_videos(req: SearchRequest, request: Request, response: Response) -> Dict[str, Any]:
+    if req.cursor is None and not req.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
     if req.top_k <= 0:
         raise HTTPException(status_code=400, detail="top_k must be > 0")
+    if req.top_k > MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be <= {MAX_TOP_K}")
+    if req.snippet_length is not None and req.snippet_length <= 0:
+        raise HTTPException(status_code=400, detail="snippet_length must be > 0")
 
+    start = time.perf_counter()
+    timings = {}
+    filters = req.filters.model_dump(exclude_none=True) if req.filters else None
+    page = None
     try:
-        results = search_youtube_videos(req.query, top_n=req.top_k)
-        return {"query": req.query, "top_k": req.top_k, "results": results}
+        if req.paginate or req.cursor is not None:
+            page = await service.search_page(req.query, page_size=req.top_k, cursor=req.cursor, timings=timings,
+                                             mode=req.mode, filters=filters or None, fields=req.fields,
+                                             snippet_chars=req.snippet_length, rerank=req.rerank)
+        else:
+            results = await service.search(req.query, top_n=req.top_k, timings=timings, mode=req.mode,
+                                           filters=filters or None, fields=req.fields,
+                                           snippet_chars=req.snippet_length, rerank=req.rerank)
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ServiceNotReady, FileNotFoundError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        metrics.counter("querytube_search_errors_total", "/search failures by exception type",
+                        type=type(e).__name__).inc()
+        logger.exception(f"❌ /search failed after {(time.perf_counter() - start) * 1000:.0f} ms, "
+                         f"stages so far {timings}")
+        raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {e}")
+    timings["request_ms"] = (time.perf_counter() - start) * 1000
+    record_search(timings)
+    if TIMING_HEADERS or request.headers.get(TIMING_HEADER) == "1":
+        response.headers["Server-Timing"] = server_timing(timings)
+    if page is not None:
+        return {**page, "top_k": req.top_k, "timings": timings}
+    return {"query": req.query, "top_k": req.top_k, "mode": req.mode, "rerank": req.rerank,
+            "results": results, "timings": timings}
+
+@app.post("/search/batch")
+async def search_batch(req: BatchSearchRequest):
+    """Run many queries; streams one NDJSON line per query, in request order.
+
+    Lines look like {"index", "query", "results"} or {"index", "query", "error"}.
+    """
+    if not req.queries:
+        raise HTTPException(status_code=400, detail="queries cannot be empty.")
+    if len(req.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    if req.snippet_length is not None and req.snippet_length <= 0:
+        raise HTTPException(status_code=400, detail="snippet_length must be > 0")
+    unknown = set(req.fields or ()) - set(RESULT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {sorted(unknown)}")
+    queries = []
+    for i, q in enumerate(req.queries):
+        if not q.query.strip() or q.top_k <= 0:
+            raise HTTPException(status_code=400, detail=f"queries[{i}]: query must be non-empty and top_k > 0")
+        if q.top_k > MAX_TOP_K:
+            raise HTTPException(status_code=400, detail=f"queries[{i}]: top_k must be <= {MAX_TOP_K}")
+        filters = q.filters.model_dump(exclude_none=True) if q.filters else None
+        try:
+            normalize_filters(filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"queries[{i}]: {e}")
+        queries.append({"query": q.query, "top_k": q.top_k, "filters": filters or None})
+    # Fail before the 200 goes out if the service cannot answer at all
+    try:
+        await service.wait_ready()
+    except ServiceNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def ndjson_lines():
+        stream = service.search_stream(queries, mode=req.mode, fields=req.fields,
+                                       snippet_chars=req.snippet_length, rerank=req.rerank)
+        async for offset, chunk, results in stream:
+            # A failed chunk reports its error on each of its queries; later chunks still run
+            failed = isinstance(results, Exception)
+            for i, q in enumerate(chunk):
+                line = {"index": offset + i, "query": q["query"]}
+                if failed:
+                    line["error"] = str(results)
+                else:
+                    line["results"] = results[i]
+                yield json.dumps(line, default=str) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@app.get("/search/stats")
+async def search_stats() -> Dict[str, Any]:
+    return {**service.stats(), "rerank": reranker.stats()}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+async def healthz() -> Dict[str, Any]:
+    # Liveness only: the process is up and the event loop is responsive
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    status = service.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/cache/stats")
+async def cache_stats() -> Dict[str, Any]:
+    return query_cache.stats()
+
+@app.post("/cache/clear")
+async def cache_clear() -> Dict[str, Any]:
+    query_cache.clear()
+    return {"cleared": True}
 
 @app.get("/")
 async def root():
-    return {"message": "QueryTube API running. Use POST /search with {query, top_k}"}    
+    return {"message": "QueryTube API running. Use POST /search with {query, top_k, mode}; "
+                       "add paginate: true and pass back next_cursor as cursor for further pages"}    
 
 # run with: uvicorn api:app --reload
 # can check it at http://127.0.0.1:8000/docs
\ No newline at end of file
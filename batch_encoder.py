@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import json
+import os
+import time
+
+from metrics import Histogram, LATENCY_BUCKETS_MS, BATCH_SIZE_BUCKETS
+
+# How long the batcher waits for more queries after the first one arrives,
+# and the most queries it will fold into a single encode/query call.
+BATCH_WINDOW_MS = float(os.getenv("QUERYTUBE_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("QUERYTUBE_MAX_BATCH_SIZE", "32"))
+
+
+class SearcherClosed(RuntimeError):
+    """Raised to callers still waiting when the searcher is closed."""
+
+
+class MicroBatchSearcher:
+    """Collects concurrent search requests and serves them with one batched call.
+
+    ``search_batch_fn(query_texts, top_ns, **options)`` must return one hit list
+    per query. It runs in a worker thread so the event loop is never blocked by
+    encoding. Requests with different options (e.g. search mode) are batched
+    separately and the batches run concurrently; a caller passing ``timings``
+    gets the batch's stage timings plus ``queue_ms``, the time spent waiting
+    for the batch to start.
+    """
+
+    def __init__(self, search_batch_fn, batch_window_ms=BATCH_WINDOW_MS,
+                 max_batch_size=MAX_BATCH_SIZE, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.search_batch_fn = search_batch_fn
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self._queue = None
+        self._worker = None
+        self._taken = []    # requests the worker has dequeued but not answered yet
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def search(self, query_text, top_n=5, timings=None, **options):
+        """Queue one query and wait for its slice of the next batch."""
+        self._ensure_worker()
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        # Options may hold unhashable values (filter dicts), so group on their JSON form
+        group_key = json.dumps(options, sort_keys=True, default=str)
+        await self._queue.put((query_text, top_n, future, group_key, timings, start, options))
+        try:
+            return await future
+        finally:
+            self.latency_ms.observe((time.perf_counter() - start) * 1000)
+
+    async def _collect(self):
+        """Block for the first request, then gather more until the window closes."""
+        batch = self._taken = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Drop requests whose callers already went away
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            self.batch_size.observe(len(batch))
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[3], []).append(item)
+            # Groups are independent batches: run them side by side, not one after another
+            await asyncio.gather(*(self._run_group(loop, dict(items[0][6]), items)
+                                   for items in groups.values()))
+
+    async def _run_group(self, loop, options, items):
+        queries = [item[0] for item in items]
+        top_ns = [item[1] for item in items]
+        started = time.perf_counter()
+        stage_timings = None
+        if any(item[4] is not None for item in items):
+            stage_timings = options["timings"] = {}
+        try:
+            results = await loop.run_in_executor(
+                self.executor, functools.partial(self.search_batch_fn, queries, top_ns, **options)
+            )
+        except Exception as e:
+            for item in items:
+                if not item[2].done():
+                    item[2].set_exception(e)
+            return
+        for (_, _, future, _, timings, enqueued, _), hits in zip(items, results):
+            if timings is not None:
+                timings.update(stage_timings)
+                timings["queue_ms"] = (started - enqueued) * 1000
+            if not future.done():
+                future.set_result(hits)
+
+    async def close(self):
+        """Stop the worker; callers still waiting get SearcherClosed instead of hanging."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        pending = self._taken
+        self._taken = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for item in pending:
+            if not item[2].done():
+                item[2].set_exception(SearcherClosed("Search batcher closed"))
+
+    def stats(self):
+        return {
+            "batch_window_ms": self.batch_window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "latency_ms": self.latency_ms.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
@@ -0,0 +1,97 @@
+"""Throughput of the vectorized cleaning pipeline against the notebook's per-row apply.
+
+Both pipelines run on the same frame and must produce identical output (the
+script exits non-zero otherwise); then the chunked CSV path is timed with
+each worker count (read + clean + write). ``--repeat`` stacks the input to
+get stable timings.
+
+    python benchmarks/bench_cleaning.py
+    python benchmarks/bench_cleaning.py --repeat 100 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cleaning import (clean_csv, clean_metadata, clean_text, clean_transcript,  # noqa: E402
+                      clean_transcripts, METADATA_TEXT_COLUMNS, MIN_TRANSCRIPT_WORDS)
+
+
+def reference_transcripts(df, id_column):
+    """master_datasets_cleaned.ipynb, transcript cell."""
+    df = df.copy()
+    df["transcript"] = df["transcript"].astype(str).apply(clean_transcript)
+    df = df[df["transcript"].notna()]
+    df = df[df["transcript"].str.strip() != ""]
+    df = df[df["transcript"].apply(lambda x: len(x.split()) >= MIN_TRANSCRIPT_WORDS)]
+    return df[df[id_column].apply(lambda x: isinstance(x, str) and len(x.split()) == 1)]
+
+
+def reference_metadata(df):
+    """master_datasets_cleaned.ipynb, metadata cell (without the duration conversion)."""
+    df = df.copy()
+    for col in METADATA_TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).apply(clean_text)
+    df = df[df["description"].notna() & (df["description"].str.strip() != "")
+            & (df["description"].str.lower() != "nan")]
+    return df.drop_duplicates(subset=["id", "title"], keep="first")
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcripts", default="all_transcripts.csv")
+    parser.add_argument("--id-column", default="video_id")
+    parser.add_argument("--metadata", default="beast_metadata_file.csv")
+    parser.add_argument("--repeat", type=int, default=20, help="stack the input this many times")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--chunksize", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    jobs = [
+        ("transcripts", args.transcripts, lambda df: reference_transcripts(df, args.id_column),
+         lambda df: clean_transcripts(df, id_column=args.id_column), {"id_column": args.id_column}),
+        ("metadata", args.metadata, reference_metadata, clean_metadata, {}),
+    ]
+    failed = False
+    tmp = tempfile.mkdtemp(prefix="bench_cleaning_")
+    print(f"{'dataset':<13}{'path':<22}{'rows':>8}{'MB':>8}{'seconds':>10}{'MB/s':>9}{'speedup':>9}")
+    for kind, path, reference, vectorized, options in jobs:
+        if not os.path.exists(path):
+            print(f"⚠️ {path} not found, skipping {kind}")
+            continue
+        # Read as text, as clean_csv does, so both sides see identical input
+        df = pd.concat([pd.read_csv(path, dtype=str)] * args.repeat, ignore_index=True)
+        source = os.path.join(tmp, f"{kind}.csv")
+        df.to_csv(source, index=False)
+        size_mb = os.path.getsize(source) / 1e6
+
+        expected, base = timed(reference, df)
+        got, seconds = timed(vectorized, df)
+        if not got.equals(expected):
+            print(f"❌ {kind}: vectorized output differs from the notebook functions")
+            failed = True
+        rows = [("notebook apply", base), ("vectorized", seconds)]
+        for workers in args.workers:
+            out = os.path.join(tmp, f"{kind}_clean.csv")
+            _, seconds = timed(clean_csv, source, out, kind, args.chunksize, workers, **options)
+            rows.append((f"csv chunks x{workers}", seconds))
+        for name, seconds in rows:
+            print(f"{kind:<13}{name:<22}{len(df):>8}{size_mb:>8.1f}{seconds:>10.3f}"
+                  f"{size_mb / seconds:>9.1f}{base / seconds:>8.1f}x")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
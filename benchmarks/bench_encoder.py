@@ -0,0 +1,99 @@
+"""Compare the PyTorch and ONNX Runtime query encoders: startup, latency, consistency.
+
+Startup is measured in a fresh interpreter (import + model load + first
+encode), which is what an API worker pays on a cold start. Latency is per
+encode() call, single queries by default. Each ONNX path is also checked
+against the PyTorch embeddings; the script exits non-zero if one falls
+outside its tolerance.
+
+    python encoder.py export                                  # once
+    python benchmarks/bench_encoder.py
+    python benchmarks/bench_encoder.py --threads 1 --batch 1 16
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from encoder import (load_encoder, check_consistency, MODEL_NAME, ONNX_DIR,  # noqa: E402
+                     FP32_MIN_COSINE, INT8_MIN_COSINE, SAMPLE_QUERIES)
+
+# name -> (backend, quantized, consistency tolerance)
+PATHS = {
+    "torch": ("torch", False, None),
+    "onnx": ("onnx", False, FP32_MIN_COSINE),
+    "onnx-int8": ("onnx", True, INT8_MIN_COSINE),
+}
+
+STARTUP_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from encoder import load_encoder
+encoder = load_encoder({backend!r}, {model!r}, {onnx_dir!r}, quantized={quantized!r}, threads={threads!r})
+encoder.encode(["warm up"])
+"""
+
+
+def startup_seconds(backend, quantized, args):
+    """Wall seconds for a child interpreter to import, load and produce its first embedding."""
+    code = STARTUP_SCRIPT.format(root=ROOT, backend=backend, model=args.model, onnx_dir=args.onnx_dir,
+                                 quantized=quantized, threads=args.threads)
+    wall = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - wall
+
+
+def latencies_ms(encoder, queries, batch):
+    latencies = []
+    for start in range(0, len(queries), batch):
+        t0 = time.perf_counter()
+        encoder.encode(queries[start:start + batch])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--onnx-dir", default=ONNX_DIR)
+    parser.add_argument("--paths", nargs="+", choices=list(PATHS), default=list(PATHS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1], help="queries per encode() call")
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = library default)")
+    parser.add_argument("--startup-runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # Distinct texts so nothing downstream can cache; cycles the sample queries
+    queries = [f"{SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]} {i}" for i in range(args.queries)]
+    reference = load_encoder("torch", args.model, threads=args.threads)
+    failed = False
+
+    print(f"{'path':<12}{'batch':>6}{'p50 ms':>10}{'p99 ms':>10}{'startup s':>11}{'min cos':>12}")
+    for name in args.paths:
+        backend, quantized, tolerance = PATHS[name]
+        encoder = reference if name == "torch" else load_encoder(
+            backend, args.model, args.onnx_dir, quantized=quantized, threads=args.threads)
+        startup = np.median([startup_seconds(backend, quantized, args) for _ in range(args.startup_runs)])
+        cosine = "-"
+        if tolerance is not None:
+            passed, report = check_consistency(reference, encoder, min_cosine=tolerance)
+            cosine = f"{report['min_cosine']:.5f}" + ("" if passed else " ❌")
+            failed |= not passed
+        encoder.encode(queries[:8])  # warm up
+        for batch in args.batch:
+            latencies = latencies_ms(encoder, queries, batch)
+            print(f"{name:<12}{batch:>6}{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}"
+                  f"{startup:>11.2f}{cosine:>12}")
+    if failed:
+        print(f"❌ An ONNX path is outside its tolerance (fp32 >= {FP32_MIN_COSINE}, int8 >= {INT8_MIN_COSINE})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
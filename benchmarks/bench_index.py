@@ -0,0 +1,126 @@
+"""Compare query latency, memory and recall@k of the vector index backends.
+
+Queries are stored vectors with a little Gaussian noise, so no embedding model
+is needed; exact NumPy search provides the ground truth for recall.
+
+    python benchmarks/bench_index.py                          # numpy_index/ from ingest
+    python benchmarks/bench_index.py --synthetic 100000       # clustered random vectors
+    python benchmarks/bench_index.py --chroma --nprobe 4 8 16
+    python benchmarks/bench_index.py --rescore 0 2 4 8          # int8 / binary shortlist sizes
+
+"MB" is the size of the matrix each backend scans in full.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import (NumpyFlatIndex, NumpyIVFIndex, NumpyQuantizedIndex,  # noqa: E402
+                          build_ivf, build_quantized, load_index, NUMPY_INDEX_DIR, IVF_NLIST,
+                          QUANTIZATIONS, RESCORE_FACTOR)
+
+
+def write_synthetic(directory, n, dim, seed=0):
+    """Write clustered random unit vectors (embeddings are far from uniform) in the export layout."""
+    import json
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 500), dim)).astype(np.float32)
+    vectors = np.lib.format.open_memmap(os.path.join(directory, "vectors.npy"), mode="w+",
+                                        dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, 50000):
+        size = min(50000, n - start)
+        block = centers[rng.integers(len(centers), size=size)]
+        block = block + 0.7 * rng.standard_normal((size, dim)).astype(np.float32)
+        vectors[start:start + len(block)] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    vectors.flush()
+    np.save(os.path.join(directory, "sq_norms.npy"), np.einsum("ij,ij->i", vectors, vectors))
+    with open(os.path.join(directory, "rows.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"v{i}", "metadata": {}}) + "\n")
+
+
+def make_queries(directory, count, noise, seed=1):
+    vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+    rng = np.random.default_rng(seed)
+    queries = np.array(vectors[rng.choice(vectors.shape[0], count, replace=False)], dtype=np.float32)
+    # ``noise`` is the norm of the perturbation relative to the unit query
+    queries += noise / np.sqrt(queries.shape[1]) * rng.standard_normal(queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def run(index, queries, k, batch):
+    """Return (per-query latency ms list, list of id lists)."""
+    latencies, ids = [], []
+    for start in range(0, len(queries), batch):
+        chunk = queries[start:start + batch]
+        t0 = time.perf_counter()
+        result = index.query(query_embeddings=chunk.tolist() if index.name == "chroma" else chunk, n_results=k)
+        elapsed = (time.perf_counter() - t0) * 1000 / len(chunk)
+        latencies.extend([elapsed] * len(chunk))
+        ids.extend(result["ids"])
+    return latencies, ids
+
+
+def recall_at_k(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / max(len(t), 1) for f, t in zip(found, truth)]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index-dir", default=NUMPY_INDEX_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="benchmark N random vectors instead of the exported index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1, help="queries per index call")
+    parser.add_argument("--nlist", type=int, default=IVF_NLIST)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, RESCORE_FACTOR],
+                        help="quantized shortlist factors (0 = no float rescoring)")
+    parser.add_argument("--chroma", action="store_true", help="include the ChromaDB collection")
+    args = parser.parse_args(argv)
+
+    directory = args.index_dir
+    if args.synthetic:
+        directory = tempfile.mkdtemp(prefix="bench_index_")
+        write_synthetic(directory, args.synthetic, args.dim)
+    if not os.path.exists(os.path.join(directory, "ivf_centroids.npy")) or args.synthetic:
+        t0 = time.perf_counter()
+        build_ivf(directory, nlist=args.nlist)
+        print(f"🏗️ Built IVF ({args.nlist} lists) in {time.perf_counter() - t0:.1f}s")
+    missing = [kind for kind in QUANTIZATIONS if not os.path.exists(os.path.join(directory, f"vectors_{kind}.npy"))]
+    if missing or args.synthetic:
+        t0 = time.perf_counter()
+        build_quantized(directory)
+        print(f"🏗️ Built int8 + binary codes in {time.perf_counter() - t0:.1f}s")
+
+    queries = make_queries(directory, args.queries, args.noise)
+    flat = NumpyFlatIndex(directory)
+    backends = [("numpy-flat", flat)]
+    backends += [(f"ivf nprobe={p}", NumpyIVFIndex(directory, nprobe=p)) for p in args.nprobe]
+    backends += [(f"{kind} rescore={r}", NumpyQuantizedIndex(directory, kind=kind, rescore=r))
+                 for kind in QUANTIZATIONS for r in args.rescore]
+    if args.chroma:
+        backends.append(("chroma", load_index("chroma")))
+
+    _, truth = run(flat, queries, args.k, args.batch)
+    print(f"\n{flat.count()} vectors x {flat.vectors.shape[1]} dims, {len(queries)} queries, k={args.k}\n")
+    print(f"{'backend':<20}{'MB':>10}{'p50 ms':>10}{'p99 ms':>10}{'recall@' + str(args.k):>12}")
+    for name, index in backends:
+        run(index, queries[:min(10, len(queries))], args.k, args.batch)  # warm page cache
+        latencies, found = run(index, queries, args.k, args.batch)
+        size = f"{index.nbytes() / 1e6:.1f}" if hasattr(index, "nbytes") else "-"
+        print(f"{name:<20}{size:>10}{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}"
+              f"{recall_at_k(found, truth):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
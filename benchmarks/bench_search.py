@@ -0,0 +1,269 @@
+"""Load-test POST /search in-process: latency percentiles, QPS and a per-stage breakdown.
+
+A sample of Merged_VideoData (rows drawn with replacement and given new ids
+when ``--rows`` exceeds the source, for a synthetic larger corpus) is ingested
+into a work directory. Then the FastAPI app runs there behind an in-process
+ASGI transport, so no server or network sits between the load generator and
+the search code. Each concurrency level is a closed loop: ``c`` clients each
+send their next request as soon as the previous one returns. Caches are
+cleared before every level.
+
+Stage times come from the ``timings`` every /search response carries:
+encode, index (vector + lexical + fusion), rerank, format (hydrating display
+fields) and overhead (queueing, micro-batching, serialisation: client latency
+minus the search's own total). Results are written as JSON; ``--baseline``
+compares against an earlier file.
+
+    python benchmarks/bench_search.py --out bench_chroma.json
+    python benchmarks/bench_search.py --backend numpy --no-cache --out bench_numpy_nocache.json
+    python benchmarks/bench_search.py --rows 20000 --concurrency 1 8 32 --baseline bench_chroma.json
+
+Configuration is read when the app is imported, so one run benchmarks one
+configuration; other QUERYTUBE_* settings are taken from the environment.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BACKENDS = ("chroma", "numpy", "ivf", "int8", "binary")
+# Timing keys from search_youtube_videos_batch folded into reported stages
+STAGES = {
+    "encode": ("encode_ms",),
+    "index": ("vector_ms", "lexical_ms", "fusion_ms"),
+    "rerank": ("rerank_ms",),
+    "format": ("hydrate_ms",),
+}
+PERCENTILES = (50, 95, 99)
+
+
+def build_corpus(work_dir, source, rows, seed=0, mode="video"):
+    """Write ``rows`` sampled source rows to ``work_dir``/sample.parquet and index them there.
+
+    ``mode`` is the ingest mode: one vector per video or transcript chunks.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    import ingest
+    from lexical_index import build_lexical_index
+    from merge_datasets import open_merged
+    from vector_index import build_ivf, build_quantized, export_numpy_index
+
+    table = open_merged(source).to_table()
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(table.num_rows, rows, replace=rows > table.num_rows)
+    sample = table.take(pa.array(picks))
+    if rows > table.num_rows:
+        # Repeated rows become distinct videos: id "<id>~<n>" for the n-th copy
+        copy = np.zeros(rows, dtype=np.int64)
+        seen = {}
+        for i, pick in enumerate(picks):
+            copy[i] = seen.get(pick, 0)
+            seen[pick] = copy[i] + 1
+        ids = pc.if_else(pa.array(copy > 0), pc.binary_join_element_wise(
+            sample["id"], pa.array(copy.astype(str)), "~"), sample["id"])
+        sample = sample.set_column(sample.schema.get_field_index("id"), "id", ids)
+    path = os.path.join(work_dir, "sample.parquet")
+    pq.write_table(sample, path)
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        ingest.ingest(source=path, mode=mode, metadata_csv=os.path.join(ROOT, "Master_Task1_withTranscriptFlag.csv"))
+        import chromadb
+        collection = chromadb.PersistentClient(path=ingest.CHROMA_PATH).get_collection(ingest.COLLECTION_NAME)
+        export_numpy_index(collection)
+        build_ivf(nlist=max(1, min(64, rows // 40)))
+        build_quantized()
+        build_lexical_index(source=path)
+    finally:
+        os.chdir(cwd)
+    return sample["title"].to_pylist()
+
+
+def make_queries(titles, count, seed=1):
+    """Title-derived queries (first few words), distinct so nothing repeats unless asked to."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for title in rng.permutation(np.array(titles, dtype=object)):
+        words = str(title).split()[:int(rng.integers(2, 7))]
+        if words:
+            queries.append(" ".join(words))
+    queries = list(dict.fromkeys(queries)) or ["python tutorial"]
+    # Cycle with a numeric suffix if the corpus has fewer distinct titles than requested
+    return [queries[i % len(queries)] + (f" {i // len(queries)}" if i >= len(queries) else "")
+            for i in range(count)]
+
+
+def summarize(values):
+    if not values:
+        return None
+    values = np.asarray(values, dtype=np.float64)
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    summary["mean"] = round(float(values.mean()), 3)
+    summary["max"] = round(float(values.max()), 3)
+    return summary
+
+
+async def run_level(client, queries, concurrency, requests, body):
+    """Closed-loop load at one concurrency level; returns the level's report dict."""
+    await client.post("/cache/clear")
+    latencies, errors, hits = [], 0, 0
+    stages = {stage: [] for stage in list(STAGES) + ["overhead"]}
+    next_request = 0
+
+    async def user():
+        nonlocal next_request, errors, hits
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            start = time.perf_counter()
+            response = await client.post("/search", json={**body, "query": queries[i % len(queries)]})
+            latency = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(latency)
+            timings = response.json().get("timings", {})
+            hits += int(bool(timings.get("cache_hit")))
+            for stage, keys in STAGES.items():
+                if any(k in timings for k in keys):
+                    stages[stage].append(sum(timings.get(k, 0.0) for k in keys))
+            total = timings.get("total_ms", timings.get("cache_ms"))
+            if total is not None:
+                stages["overhead"].append(max(latency - total, 0.0))
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(wall, 3),
+        "qps": round(len(latencies) / wall, 2),
+        "cache_hit_rate": round(hits / max(len(latencies), 1), 3),
+        "latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(values) for stage, values in stages.items() if values},
+    }
+
+
+async def run_benchmark(args, queries):
+    import httpx
+
+    import api
+    async with api.lifespan(api.app):
+        await api.service.wait_ready()
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            body = {"top_k": args.top_k, "mode": args.mode, "rerank": args.rerank}
+            # Warm-up pass at concurrency 1 (first-request costs, page cache)
+            await run_level(client, queries, 1, min(args.warmup, len(queries)), body)
+            levels = []
+            for concurrency in args.concurrency:
+                level = await run_level(client, queries, concurrency, args.requests, body)
+                levels.append(level)
+                latency = level["latency_ms"] or {}
+                print(f"{concurrency:>6}{level['qps']:>9.1f}{latency.get('p50', 0):>10.2f}"
+                      f"{latency.get('p95', 0):>10.2f}{latency.get('p99', 0):>10.2f}{level['errors']:>8}  "
+                      + " ".join(f"{s}={v['p50']:.2f}" for s, v in level["stages_ms"].items()))
+            return levels, api.service.stats()
+
+
+def compare(report, baseline_path):
+    """Print p50/p99/QPS ratios of this run to ``baseline_path`` per concurrency level."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {level["concurrency"]: level for level in json.load(f)["levels"]}
+    print(f"\nvs {baseline_path} (ratio > 1 = slower / more throughput)")
+    print(f"{'conc':>6}{'p50':>9}{'p99':>9}{'qps':>9}")
+    for level in report["levels"]:
+        old = baseline.get(level["concurrency"])
+        if not old or not old["latency_ms"] or not level["latency_ms"]:
+            continue
+        ratio = {k: level["latency_ms"][k] / max(old["latency_ms"][k], 1e-9) for k in ("p50", "p99")}
+        print(f"{level['concurrency']:>6}{ratio['p50']:>8.2f}x{ratio['p99']:>8.2f}x"
+              f"{level['qps'] / max(old['qps'], 1e-9):>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=os.path.join(ROOT, "Merged_VideoData.parquet"))
+    parser.add_argument("--rows", type=int, default=500, help="corpus size (sampled with replacement past the source)")
+    parser.add_argument("--work-dir", help="reuse an index built by an earlier run (default: fresh temp dir)")
+    parser.add_argument("--backend", choices=BACKENDS, default=os.getenv("QUERYTUBE_INDEX_BACKEND", "chroma"))
+    parser.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default="vector")
+    parser.add_argument("--rerank", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="disable the embedding and result caches")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--queries", type=int, default=0, help="distinct queries (default: one per request)")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--out", default="bench_search.json")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    args = parser.parse_args(argv)
+
+    out = os.path.abspath(args.out)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="bench_search_")
+    sample_path = os.path.join(work_dir, "sample.parquet")
+    t0 = time.perf_counter()
+    if os.path.exists(sample_path):
+        import pyarrow.parquet as pq
+        titles = pq.read_table(sample_path, columns=["title"])["title"].to_pylist()
+        print(f"♻️ Reusing the index in {work_dir}")
+    else:
+        os.makedirs(work_dir, exist_ok=True)
+        titles = build_corpus(work_dir, args.source, args.rows)
+        print(f"🏗️ Indexed {len(titles)} rows in {work_dir} in {time.perf_counter() - t0:.1f}s")
+
+    # Read by the search modules at import time
+    os.environ["QUERYTUBE_INDEX_BACKEND"] = args.backend
+    if args.no_cache:
+        os.environ["QUERYTUBE_EMBEDDING_CACHE_SIZE"] = "0"
+        os.environ["QUERYTUBE_RESULT_CACHE_SIZE"] = "0"
+    os.chdir(work_dir)
+    queries = make_queries(titles, args.queries or args.requests)
+
+    print(f"\n{args.backend} backend, {args.mode} mode, {len(titles)} rows, {len(queries)} distinct queries, "
+          f"cache {'off' if args.no_cache else 'on'}\n")
+    print(f"{'conc':>6}{'qps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}  stage p50 ms")
+    levels, service_stats = asyncio.run(run_benchmark(args, queries))
+
+    report = {
+        "config": {
+            "backend": args.backend,
+            "mode": args.mode,
+            "rerank": args.rerank,
+            "cache": not args.no_cache,
+            "rows": len(titles),
+            "distinct_queries": len(queries),
+            "top_k": args.top_k,
+            "env": {k: v for k, v in sorted(os.environ.items()) if k.startswith("QUERYTUBE_")},
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "levels": levels,
+        "service": service_stats,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\n💾 Results saved to {out}")
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Measure retrieval quality (recall@k, MRR, nDCG) and latency for each search configuration.
+
+Queries come from a labeled file or, by default, title-as-query
+self-retrieval: each sampled video's title is a query whose relevant
+results are the videos with that title. Self-retrieval is easy (the title
+is part of the indexed text), so its absolute numbers are optimistic. It
+still exposes what an approximate index, quantization or fusion loses
+against the exact baseline.
+
+A labeled file is JSON lines, relevant ids either listed or graded:
+
+    {"query": "pandas groupby", "relevant": ["abc123", "def456"]}
+    {"query": "docker volumes", "relevant": {"abc123": 2, "xyz789": 1}}
+
+Every configuration runs the same queries through
+search_youtube_videos_batch, one query at a time and with cold caches, on
+a sample of Merged_VideoData indexed once per ingest mode (see
+bench_search.build_corpus). Metrics use the ranked ids only. ``--min-score``
+additionally drops vector hits below the notebook's ``1 / (1 + distance)``
+threshold, to see what that cut-off costs.
+
+    python benchmarks/eval_retrieval.py
+    python benchmarks/eval_retrieval.py --qrels labeled_queries.jsonl -k 5 10
+    python benchmarks/eval_retrieval.py --configs exact ivf-4 int8 hybrid chunks --out eval.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_search import build_corpus  # noqa: E402
+
+# name -> ingest mode, index backend, search mode and index parameters
+CONFIGS = {
+    "chroma": {"corpus": "video", "backend": "chroma", "mode": "vector"},
+    "exact": {"corpus": "video", "backend": "numpy", "mode": "vector"},
+    "ivf-1": {"corpus": "video", "backend": "ivf", "mode": "vector", "nprobe": 1},
+    "ivf-4": {"corpus": "video", "backend": "ivf", "mode": "vector", "nprobe": 4},
+    "ivf-16": {"corpus": "video", "backend": "ivf", "mode": "vector", "nprobe": 16},
+    "int8": {"corpus": "video", "backend": "int8", "mode": "vector", "rescore": 4},
+    "int8-norescore": {"corpus": "video", "backend": "int8", "mode": "vector", "rescore": 0},
+    "binary": {"corpus": "video", "backend": "binary", "mode": "vector", "rescore": 4},
+    "binary-norescore": {"corpus": "video", "backend": "binary", "mode": "vector", "rescore": 0},
+    "lexical": {"corpus": "video", "backend": "numpy", "mode": "lexical"},
+    "hybrid": {"corpus": "video", "backend": "numpy", "mode": "hybrid"},
+    "chunks": {"corpus": "chunks", "backend": "numpy", "mode": "vector"},
+    "chunks-hybrid": {"corpus": "chunks", "backend": "numpy", "mode": "hybrid"},
+}
+
+
+def title_queries(titles, ids, count, seed=1):
+    """Title-as-query pairs: (title, {id: 1} for every video sharing the normalized title)."""
+    by_title = {}
+    for title, video_id in zip(titles, ids):
+        key = " ".join(str(title or "").lower().split())
+        if key:
+            by_title.setdefault(key, {"query": str(title), "relevant": {}})["relevant"][video_id] = 1
+    queries = list(by_title.values())
+    rng = np.random.default_rng(seed)
+    return [queries[i] for i in rng.permutation(len(queries))[:count]]
+
+
+def load_qrels(path):
+    """Labeled queries from JSON lines; a list of relevant ids means grade 1 each."""
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                relevant = record["relevant"]
+                if not isinstance(relevant, dict):
+                    relevant = {video_id: 1 for video_id in relevant}
+                queries.append({"query": record["query"], "relevant": relevant})
+    return queries
+
+
+def recall_at_k(ranked, relevant, k):
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant) if relevant else 0.0
+
+
+def reciprocal_rank(ranked, relevant, k):
+    for rank, video_id in enumerate(ranked[:k], 1):
+        if video_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked, relevant, k):
+    """Graded nDCG with (2^grade - 1) gains."""
+    dcg = sum((2 ** relevant.get(video_id, 0) - 1) / math.log2(rank + 2) for rank, video_id in enumerate(ranked[:k]))
+    ideal = sorted(relevant.values(), reverse=True)[:k]
+    idcg = sum((2 ** grade - 1) / math.log2(rank + 2) for rank, grade in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def use_config(search, config, corpus_dir):
+    """Point Search_Query_main at ``corpus_dir`` with the config's backend; the model stays loaded."""
+    os.chdir(corpus_dir)  # index, metadata store and version file paths are relative
+    search.INDEX_BACKEND = config["backend"]
+    search.NPROBE = config.get("nprobe", search.NPROBE)
+    search.RESCORE = config.get("rescore", search.RESCORE)
+    search.LEXICAL_INDEX_PATH = os.path.join(corpus_dir, "lexical_index.npz")
+    search.index = search.metadata_store = search._lexical_index = None
+    search.query_cache.clear()
+
+
+def evaluate(search, queries, mode, ks, min_score=None):
+    """Run every query alone; returns (metric means, per-query latency ms, index ms)."""
+    depth = max(ks)
+    metrics = {f"{name}@{k}": [] for k in ks for name in ("recall", "mrr", "ndcg")}
+    latencies, index_ms = [], []
+    for query in queries:
+        search.query_cache.clear()
+        timings = {}
+        start = time.perf_counter()
+        hits = search.search_youtube_videos_batch([query["query"]], [depth], mode=mode, timings=timings,
+                                                    fields=["title"])[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        index_ms.append(sum(timings.get(key, 0.0) for key in ("vector_ms", "lexical_ms", "fusion_ms")))
+        if min_score is not None and mode == "vector":
+            hits = [hit for hit in hits if 1 / (1 + hit["score"]) >= min_score]
+        ranked = [hit["id"] for hit in hits]
+        for k in ks:
+            metrics[f"recall@{k}"].append(recall_at_k(ranked, query["relevant"], k))
+            metrics[f"mrr@{k}"].append(reciprocal_rank(ranked, query["relevant"], k))
+            metrics[f"ndcg@{k}"].append(ndcg_at_k(ranked, query["relevant"], k))
+    return {name: round(float(np.mean(values)), 4) for name, values in metrics.items()}, latencies, index_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=os.path.join(ROOT, "Merged_VideoData.parquet"))
+    parser.add_argument("--rows", type=int, default=500, help="corpus size (sampled with replacement past the source)")
+    parser.add_argument("--work-dir", help="reuse corpora built by an earlier run (default: fresh temp dir)")
+    parser.add_argument("--qrels", help="labeled queries (JSON lines); default: title-as-query")
+    parser.add_argument("--queries", type=int, default=200, help="title-as-query sample size")
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS),
+                        default=[name for name, config in CONFIGS.items() if config["corpus"] == "video"])
+    parser.add_argument("-k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--min-score", type=float, help="drop vector hits with 1/(1+distance) below this")
+    parser.add_argument("--out", default="eval_retrieval.json")
+    args = parser.parse_args(argv)
+
+    out = os.path.abspath(args.out)
+    qrels = load_qrels(os.path.abspath(args.qrels)) if args.qrels else None
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="eval_retrieval_"))
+    corpora = {}
+    for corpus in dict.fromkeys(CONFIGS[name]["corpus"] for name in args.configs):
+        corpus_dir = os.path.join(work_dir, corpus)
+        if not os.path.exists(os.path.join(corpus_dir, "sample.parquet")):
+            os.makedirs(corpus_dir, exist_ok=True)
+            t0 = time.perf_counter()
+            build_corpus(corpus_dir, args.source, args.rows, mode=corpus)
+            print(f"🏗️ Indexed the {corpus} corpus in {time.perf_counter() - t0:.1f}s")
+        corpora[corpus] = corpus_dir
+
+    import pyarrow.parquet as pq
+    import Search_Query_main as search
+    # Every corpus is built from the same sample, so one query set serves all configs
+    sample = pq.read_table(os.path.join(next(iter(corpora.values())), "sample.parquet"), columns=["id", "title"])
+    queries = qrels or title_queries(sample["title"].to_pylist(), sample["id"].to_pylist(), args.queries)
+    source = args.qrels or "title-as-query"
+    print(f"\n{len(queries)} queries ({source}), {sample.num_rows} rows\n")
+
+    main_k = max(args.k)
+    print(f"{'config':<18}{'recall@' + str(main_k):>11}{'mrr@' + str(main_k):>9}{'ndcg@' + str(main_k):>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'index ms':>10}")
+    results = []
+    for name in args.configs:
+        config = CONFIGS[name]
+        use_config(search, config, corpora[config["corpus"]])
+        search.warm_up()
+        metrics, latencies, index_ms = evaluate(search, queries, config["mode"], args.k, args.min_score)
+        latency = {"p50": round(float(np.percentile(latencies, 50)), 3),
+                   "p99": round(float(np.percentile(latencies, 99)), 3),
+                   "index_p50": round(float(np.percentile(index_ms, 50)), 3)}
+        results.append({"config": name, **config, "metrics": metrics, "latency_ms": latency})
+        print(f"{name:<18}{metrics[f'recall@{main_k}']:>11.3f}{metrics[f'mrr@{main_k}']:>9.3f}"
+              f"{metrics[f'ndcg@{main_k}']:>10.3f}{latency['p50']:>9.2f}{latency['p99']:>9.2f}"
+              f"{latency['index_p50']:>10.2f}")
+
+    report = {
+        "queries": source,
+        "query_count": len(queries),
+        "rows": sample.num_rows,
+        "k": args.k,
+        "min_score": args.min_score,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
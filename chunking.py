@@ -0,0 +1,90 @@
+import pandas as pd
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; keep room for the title prefix
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP = 40
+CHUNK_ID_SEPARATOR = "#"
+
+
+def chunk_id(video_id, chunk_index):
+    return f"{video_id}{CHUNK_ID_SEPARATOR}{chunk_index}"
+
+
+def _window_spans(offsets, max_tokens, overlap):
+    """Group token (start, end) character offsets into overlapping windows."""
+    if not offsets:
+        return []
+    step = max(1, max_tokens - overlap)
+    spans = []
+    for start in range(0, len(offsets), step):
+        window = offsets[start:start + max_tokens]
+        spans.append((window[0][0], window[-1][1]))
+        if start + max_tokens >= len(offsets):
+            break
+    return spans
+
+
+def _word_offsets(text):
+    """Whitespace word offsets, used when no fast tokenizer is available."""
+    offsets, pos = [], 0
+    for word in text.split():
+        start = text.index(word, pos)
+        pos = start + len(word)
+        offsets.append((start, pos))
+    return offsets
+
+
+def chunk_spans(texts, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Return, for each text, a list of (char_start, char_end) chunk spans.
+
+    Spans are bounded by ``max_tokens`` word pieces of ``tokenizer`` (a Hugging Face
+    fast tokenizer, e.g. ``model.tokenizer``) and consecutive chunks share
+    ``overlap`` tokens. Without a tokenizer, whitespace words stand in for tokens.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    texts = list(texts)
+    if tokenizer is None:
+        all_offsets = [_word_offsets(t) for t in texts]
+    else:
+        # One batched call; offsets are relative to each input string
+        encoded = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True,
+                            return_attention_mask=False, return_token_type_ids=False,
+                            verbose=False)
+        all_offsets = encoded["offset_mapping"]
+    return [_window_spans(offsets, max_tokens, overlap) for offsets in all_offsets]
+
+
+def build_chunks(df, tokenizer=None, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """Explode a videos DataFrame (id, title, transcript) into one row per chunk.
+
+    A video without transcript text still gets one chunk, the title plus the
+    ``description`` column when there is one, spanning no transcript characters.
+    """
+    titles = df["title"].fillna("").astype(str).tolist()
+    transcripts = df["transcript"].fillna("").astype(str).tolist()
+    descriptions = (df["description"].fillna("").astype(str).tolist() if "description" in df.columns
+                    else [""] * len(df))
+    spans = chunk_spans(transcripts, tokenizer, max_tokens, overlap)
+
+    rows = []
+    for vid, title, transcript, description, video_spans in zip(
+            df["id"].astype(str), titles, transcripts, descriptions, spans):
+        if not video_spans:
+            rows.append({"chunk_id": chunk_id(vid, 0), "parent_id": vid, "chunk_index": 0,
+                         "char_start": 0, "char_end": 0, "title": title,
+                         "text": " ".join(part for part in (title, description) if part)})
+            continue
+        for idx, (start, end) in enumerate(video_spans):
+            rows.append({
+                "chunk_id": chunk_id(vid, idx),
+                "parent_id": vid,
+                "chunk_index": idx,
+                "char_start": int(start),
+                "char_end": int(end),
+                "title": title,
+                # Every chunk carries the title so short spans still match on topic
+                "text": f"{title} {transcript[start:end]}",
+            })
+    return pd.DataFrame(rows, columns=["chunk_id", "parent_id", "chunk_index",
+                                       "char_start", "char_end", "title", "text"])
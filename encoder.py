@@ -0,0 +1,209 @@
+"""Query encoders: the PyTorch SentenceTransformer or an exported ONNX Runtime model.
+
+The ONNX path skips importing torch, so a process starts much faster. With
+dynamic int8 quantization it also encodes faster on CPU. It reproduces
+all-MiniLM-L6-v2's pipeline: tokenize, transformer, mean pooling, L2
+normalisation.
+
+    python encoder.py export                 # onnx_encoder/model.onnx + model_int8.onnx + tokenizer
+    python encoder.py check                  # compare against the PyTorch embeddings
+
+Documents are still embedded with PyTorch at ingest; both paths must agree
+within the tolerances below, or query vectors drift from the stored ones.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+ONNX_DIR = "onnx_encoder"
+ENCODER_BACKENDS = ("torch", "onnx")
+ENCODE_BATCH_SIZE = 32
+ONNX_OPSET = 17
+# Minimum cosine similarity to the PyTorch embedding of the same text
+FP32_MIN_COSINE = 0.9999
+INT8_MIN_COSINE = 0.99
+SAMPLE_QUERIES = [
+    "How to use pandas for data analysis",
+    "python list comprehension tutorial",
+    "what is a transformer model",
+    "docker compose for beginners",
+    "SQL joins explained",
+    "machine learning interview questions",
+    "read_csv UnicodeDecodeError",
+    "react hooks useEffect cleanup",
+]
+
+
+class OnnxEncoder:
+    """``encode()`` compatible stand-in for SentenceTransformer, backed by ONNX Runtime."""
+
+    def __init__(self, directory=ONNX_DIR, quantized=True, threads=0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(directory, "encoder_config.json"), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model_file = "model_int8.onnx" if quantized else "model.onnx"
+        self.session = ort.InferenceSession(os.path.join(directory, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.quantized = quantized
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dimension"]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+        # Mean pooling over real tokens, as in the sentence-transformers Pooling module
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size=ENCODE_BATCH_SIZE, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Length-sorted batches pad less; results go back in input order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            out[rows] = self._encode_batch([texts[i] for i in rows])
+        return out[0] if single else out
+
+
+def load_encoder(backend="torch", model_name=MODEL_NAME, onnx_dir=ONNX_DIR, quantized=True, threads=0):
+    """The query encoder for ``backend``; ``threads`` caps CPU threads (0 = library default)."""
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return OnnxEncoder(onnx_dir, quantized=quantized, threads=threads)
+    raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
+
+
+def export_onnx(model_name=MODEL_NAME, directory=ONNX_DIR, opset=ONNX_OPSET, quantize=True):
+    """Export the transformer to ONNX (plus a dynamic int8 copy) with its tokenizer."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(directory, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    tokenizer.save_pretrained(directory)  # writes tokenizer.json for the fast tokenizer
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    sample = tokenizer(SAMPLE_QUERIES[:2], padding=True, return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    model_path = os.path.join(directory, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer), tuple(sample[n] for n in names), model_path,
+            input_names=names, output_names=["last_hidden_state"],
+            dynamic_axes={**{n: {0: "batch", 1: "sequence"} for n in names},
+                          "last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=opset,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(model_path, os.path.join(directory, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    config = {
+        "model_name": model_name,
+        "max_seq_length": st.max_seq_length,
+        "dimension": st.get_sentence_embedding_dimension(),
+        "normalize": any(type(module).__name__ == "Normalize" for module in st),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(directory, "encoder_config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return model_path
+
+
+def compare_embeddings(reference, candidate):
+    """Max absolute difference and min / mean cosine similarity between two embedding matrices."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    cosine = (reference * candidate).sum(axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1) + 1e-12)
+    return {
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+    }
+
+
+def check_consistency(reference_encoder, candidate_encoder, texts=SAMPLE_QUERIES, min_cosine=INT8_MIN_COSINE):
+    """Encode ``texts`` with both encoders; returns (passed, comparison dict)."""
+    report = compare_embeddings(reference_encoder.encode(texts), candidate_encoder.encode(texts))
+    report["tolerance_min_cosine"] = min_cosine
+    return report["min_cosine"] >= min_cosine, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or check the ONNX query encoder.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export")
+    export.add_argument("--model", default=MODEL_NAME)
+    export.add_argument("--out", default=ONNX_DIR)
+    export.add_argument("--no-quantize", action="store_true", help="skip the int8 model")
+    check = sub.add_parser("check")
+    check.add_argument("--model", default=MODEL_NAME)
+    check.add_argument("--onnx-dir", default=ONNX_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        path = export_onnx(args.model, args.out, quantize=not args.no_quantize)
+        print(f"✅ Exported {args.model} to {path}" + ("" if args.no_quantize else " (+ model_int8.onnx)"))
+        return
+
+    reference = load_encoder("torch", args.model)
+    failed = False
+    for quantized, tolerance in ((False, FP32_MIN_COSINE), (True, INT8_MIN_COSINE)):
+        passed, report = check_consistency(reference, OnnxEncoder(args.onnx_dir, quantized=quantized),
+                                           min_cosine=tolerance)
+        label = "int8" if quantized else "fp32"
+        print(f"{'✅' if passed else '❌'} onnx {label}: min cosine {report['min_cosine']:.6f} "
+              f"(>= {tolerance}), max abs diff {report['max_abs_diff']:.2e}")
+        failed |= not passed
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
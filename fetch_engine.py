@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` burst, refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, now=None):
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def try_acquire(self, now=None):
+        """Take one token if available; otherwise return seconds until one is."""
+        wait = self.wait_time(now)
+        if wait == 0:
+            self.tokens -= 1
+        return wait
+
+
+class ThroughputStats:
+    """Counts finished items and per-proxy busy time for throughput reporting."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.completed = 0
+        self.succeeded = 0
+        self.proxy_busy = {}
+        self.proxy_requests = {}
+        self._lock = threading.Lock()
+
+    def record_item(self, success):
+        with self._lock:
+            self.completed += 1
+            self.succeeded += int(bool(success))
+
+    def record_proxy(self, proxy, seconds):
+        with self._lock:
+            self.proxy_busy[proxy] = self.proxy_busy.get(proxy, 0.0) + seconds
+            self.proxy_requests[proxy] = self.proxy_requests.get(proxy, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.start, 1e-9)
+            per_proxy = {
+                proxy: {
+                    "requests": self.proxy_requests[proxy],
+                    "busy_seconds": round(busy, 1),
+                    "utilization": round(busy / elapsed, 3),
+                }
+                for proxy, busy in self.proxy_busy.items()
+            }
+            return {
+                "elapsed_seconds": round(elapsed, 1),
+                "completed": self.completed,
+                "succeeded": self.succeeded,
+                "videos_per_minute": round(self.completed / elapsed * 60, 2),
+                "proxies_used": len(per_proxy),
+                "proxy_utilization": per_proxy,
+            }
+
+
+async def run_workers(items, fetch_fn, on_result, workers):
+    """Run ``fetch_fn(item)`` for every item on ``workers`` concurrent workers.
+
+    ``fetch_fn`` is blocking (network I/O, proxy waits) and runs in a dedicated
+    thread pool; ``on_result(item, result)`` is called on the event loop as each
+    item finishes, so result handling never races with itself.
+    """
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch")
+
+    async def worker():
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = await loop.run_in_executor(executor, fetch_fn, item)
+            on_result(item, result)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
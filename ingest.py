@@ -0,0 +1,374 @@
+"""Stream Merged_VideoData.parquet into the ChromaDB ``youtube_videos`` collection.
+
+Rows are read in fixed-size record batches with pyarrow, encoded batch by batch
+and upserted in bounded chunks, so peak memory does not grow with the corpus.
+A checkpoint is written after every committed batch and re-runs resume from it.
+
+A content-hash manifest (one row per video id) makes refreshes incremental:
+only new or changed videos are embedded, vectors of videos that disappeared
+from the source are deleted, and unchanged videos are skipped entirely.
+
+Vectors carry only ids, chunk positions and typed filter fields (channel,
+publish time, duration, views, language) from Master_Task1_withTranscriptFlag.csv;
+when only those change, the metadata is updated in place without re-embedding.
+Display fields and transcripts go to the SQLite metadata store instead
+(see metadata_store.py). Collections built before the store existed still hold
+whole transcripts in their metadata: rebuild them once with ``--full --reset``.
+
+    python ingest.py                      # one vector per video (title + transcript)
+    python ingest.py --mode chunks        # overlapping transcript chunks
+    python ingest.py --reset              # ignore the checkpoint and start over
+    python ingest.py --full               # re-embed everything, ignoring the manifest
+    python ingest.py --export-numpy       # also refresh the NumPy vector index files
+    python ingest.py --source Merged_VideoData    # partitioned dataset from merge_datasets.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from chunking import build_chunks, chunk_id, CHUNK_TOKENS, CHUNK_OVERLAP
+from query_cache import bump_collection_version, collection_version_file
+from search_filters import load_video_metadata, metadata_record, METADATA_CSV
+from merge_datasets import open_merged
+from metadata_store import MetadataStore, METADATA_DB, SOURCE_COLUMNS as DISPLAY_COLUMNS
+from vector_index import export_numpy_index, build_ivf, build_quantized, NUMPY_INDEX_DIR, QUANTIZATIONS
+
+SOURCE_PARQUET = "Merged_VideoData.parquet"
+CHROMA_PATH = "./chroma_db"
+COLLECTION_NAME = "youtube_videos"
+MODEL_NAME = "all-MiniLM-L6-v2"
+ROW_BATCH_SIZE = 512        # rows read from Parquet per batch
+UPSERT_BATCH_SIZE = 1000    # vectors per collection.upsert call
+ENCODE_BATCH_SIZE = 128     # texts per model forward pass
+CHECKPOINT_FILE = os.path.join(CHROMA_PATH, "ingest_checkpoint.json")
+MANIFEST_FILE = os.path.join(CHROMA_PATH, "ingest_manifest.sqlite")
+SOURCE_COLUMNS = ["id", "title", "transcript"]
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically so a crash never leaves a torn file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Manifest:
+    """SQLite table of video id -> content hash, number of stored vectors and metadata hash."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "id TEXT PRIMARY KEY, hash TEXT NOT NULL, chunks INTEGER NOT NULL, meta_hash TEXT)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(videos)")}
+        if "meta_hash" not in columns:
+            self.conn.execute("ALTER TABLE videos ADD COLUMN meta_hash TEXT")
+        self.conn.commit()
+
+    def lookup(self, ids):
+        """Return {id: (hash, chunks, meta_hash)} for the ids already in the manifest."""
+        found = {}
+        ids = list(ids)
+        for start in range(0, len(ids), 900):  # stay under SQLite's variable limit
+            part = ids[start:start + 900]
+            rows = self.conn.execute(
+                f"SELECT id, hash, chunks, meta_hash FROM videos WHERE id IN ({','.join('?' * len(part))})", part
+            )
+            found.update({vid: (h, n, mh) for vid, h, n, mh in rows})
+        return found
+
+    def all_ids(self):
+        return {row[0] for row in self.conn.execute("SELECT id FROM videos")}
+
+    def upsert(self, entries):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO videos (id, hash, chunks, meta_hash) VALUES (?, ?, ?, ?)", entries)
+
+    def delete(self, ids):
+        self.conn.executemany("DELETE FROM videos WHERE id = ?", [(vid,) for vid in ids])
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def content_hashes(df, mode, model_name):
+    """Hash of everything that determines a video's vectors."""
+    params = f"{model_name}\x1f{mode}\x1f{CHUNK_TOKENS}\x1f{CHUNK_OVERLAP}"
+    titles = df["title"].fillna("").astype(str)
+    transcripts = df["transcript"].fillna("").astype(str)
+    if mode == "chunks" and "description" in df.columns:
+        # A video without transcript text is embedded from its description instead
+        fallback = df["description"].fillna("").astype(str)
+        transcripts = transcripts.where(transcripts.str.strip() != "", "\x1e" + fallback)
+    return [
+        hashlib.sha256(f"{params}\x1f{title}\x1f{transcript}".encode("utf-8")).hexdigest()
+        for title, transcript in zip(titles, transcripts)
+    ]
+
+
+def metadata_hashes(ids, video_metadata):
+    """Hash of each video's filter metadata; a change only needs a metadata update."""
+    return [
+        hashlib.sha256(json.dumps(metadata_record(video_metadata, vid), sort_keys=True).encode("utf-8")).hexdigest()
+        for vid in ids
+    ]
+
+
+def vector_ids(video_id, chunks):
+    """Collection ids holding a video's vectors (chunks == 0 means one whole-video vector)."""
+    if chunks:
+        return [chunk_id(video_id, i) for i in range(chunks)]
+    return [video_id]
+
+
+def prepare_batch(df, mode, tokenizer=None, video_metadata=None):
+    """Return (ids, texts, metadatas) to embed for one batch of videos.
+
+    Every vector also carries its video's typed filter fields from ``video_metadata``.
+    """
+    if mode == "chunks":
+        chunks = build_chunks(df, tokenizer, CHUNK_TOKENS, CHUNK_OVERLAP)
+        metadatas = chunks[["parent_id", "chunk_index", "char_start", "char_end"]].to_dict(orient="records")
+        for metadata in metadatas:
+            metadata.update(metadata_record(video_metadata, metadata["parent_id"]))
+        return chunks["chunk_id"].tolist(), chunks["text"].tolist(), metadatas
+
+    df = df.assign(title=df["title"].fillna("").astype(str),
+                   transcript=df["transcript"].fillna("").astype(str))
+    texts = (df["title"] + " " + df["transcript"]).tolist()
+    ids = df["id"].astype(str).tolist()
+    metadatas = [{"parent_id": vid, **metadata_record(video_metadata, vid)} for vid in ids]
+    return ids, texts, metadatas
+
+
+def upsert_in_batches(collection, ids, embeddings, metadatas, batch_size):
+    """Upsert in fixed-size slices so no single call exceeds the server's limit.
+
+    No documents are stored: texts and display fields live in the metadata store.
+    """
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            metadatas=metadatas[start:end],
+        )
+
+
+def iter_parquet_batches(source, batch_size, columns=SOURCE_COLUMNS):
+    """Yield pandas DataFrames of at most ``batch_size`` rows, one record batch at a time."""
+    # A single Parquet file or a partitioned dataset directory from merge_datasets.py
+    for record_batch in open_merged(source).to_batches(columns=columns, batch_size=batch_size):
+        yield record_batch.to_pandas()
+
+
+def ingest(source=SOURCE_PARQUET, mode="video", chroma_path=CHROMA_PATH,
+           collection_name=COLLECTION_NAME, model_name=MODEL_NAME,
+           row_batch_size=ROW_BATCH_SIZE, upsert_batch_size=UPSERT_BATCH_SIZE,
+           encode_batch_size=ENCODE_BATCH_SIZE, checkpoint_file=CHECKPOINT_FILE,
+           manifest_file=MANIFEST_FILE, metadata_csv=METADATA_CSV, metadata_db=METADATA_DB,
+           reset=False, full=False):
+    import chromadb
+    from sentence_transformers import SentenceTransformer
+
+    client = chromadb.PersistentClient(path=chroma_path)
+    collection = client.get_or_create_collection(name=collection_name)
+    upsert_batch_size = min(upsert_batch_size, client.get_max_batch_size())
+    model = SentenceTransformer(model_name)
+    tokenizer = getattr(model, "tokenizer", None)
+    version_file = collection_version_file(chroma_path)  # read by APIs serving this store
+    manifest = Manifest(manifest_file)
+    store = MetadataStore(metadata_db)
+    video_metadata = None
+    if metadata_csv and os.path.exists(metadata_csv):
+        video_metadata = load_video_metadata(metadata_csv)
+    else:
+        print(f"⚠️ Metadata file {metadata_csv} not found, vectors will carry no filter fields")
+
+    # The checkpoint is only valid for the same input and batch layout
+    run_key = {"source": os.path.abspath(source), "mode": mode, "model": model_name,
+               "collection": collection_name, "row_batch_size": row_batch_size, "full": full}
+    checkpoint = None if reset else load_checkpoint(checkpoint_file)
+    if checkpoint and checkpoint.get("run") != run_key:
+        print("⚠️ Checkpoint belongs to a different run, starting from scratch")
+        checkpoint = None
+    skip_batches = checkpoint["batches_committed"] if checkpoint else 0
+    rows_done = checkpoint["rows_committed"] if checkpoint else 0
+    if skip_batches:
+        print(f"♻️ Resuming after batch {skip_batches} ({rows_done} rows already committed)")
+
+    total_rows = open_merged(source).count_rows()
+    start = time.perf_counter()
+    session_rows = 0
+    vectors = 0
+    changed_videos = 0
+    metadata_updates = 0
+    seen_ids = set()
+
+    available = set(open_merged(source).schema.names)
+    columns = list(dict.fromkeys(SOURCE_COLUMNS + [c for c in DISPLAY_COLUMNS if c in available]))
+    for batch_idx, df in enumerate(iter_parquet_batches(source, row_batch_size, columns)):
+        batch_rows = len(df)
+        df = df.drop_duplicates(subset=["id"]).assign(id=lambda d: d["id"].astype(str))
+        df = df[~df["id"].isin(seen_ids)]
+        seen_ids.update(df["id"])
+        if batch_idx < skip_batches:
+            continue
+
+        # Display fields are cheap to rewrite, so every scanned video is refreshed
+        store.upsert_frame(df)
+        hashes = content_hashes(df, mode, model_name)
+        meta_hashes = metadata_hashes(df["id"], video_metadata)
+        known = manifest.lookup(df["id"])
+        if full:
+            changed = [True] * len(df)
+        else:
+            changed = [known.get(vid, (None, 0, None))[0] != h for vid, h in zip(df["id"], hashes)]
+        df_changed = df[changed]
+        hashes_changed = [h for h, c in zip(hashes, changed) if c]
+        meta_changed = [mh for mh, c in zip(meta_hashes, changed) if c]
+
+        # Same text, new views/title metadata: rewrite metadata without re-embedding
+        meta_only = [not c and known[vid][2] != mh for vid, mh, c in zip(df["id"], meta_hashes, changed)]
+        if any(meta_only):
+            df_meta = df[meta_only]
+            ids, _, metadatas = prepare_batch(df_meta, mode, tokenizer, video_metadata)
+            for pos in range(0, len(ids), upsert_batch_size):
+                collection.update(ids=ids[pos:pos + upsert_batch_size],
+                                  metadatas=metadatas[pos:pos + upsert_batch_size])
+            manifest.upsert([(vid, known[vid][0], known[vid][1], mh)
+                             for vid, mh, m in zip(df["id"], meta_hashes, meta_only) if m])
+            metadata_updates += len(df_meta)
+
+        # Old vectors of changed videos go first so shorter re-chunkings leave no strays
+        stale = [i for vid in df_changed["id"] if vid in known for i in vector_ids(vid, known[vid][1])]
+        if mode == "chunks":
+            # Chunk vectors replace any whole-video vectors stored under the bare id
+            stale.extend(vid for vid in df_changed["id"] if vid not in known)
+        for pos in range(0, len(stale), upsert_batch_size):
+            collection.delete(ids=stale[pos:pos + upsert_batch_size])
+
+        ids, texts, metadatas = prepare_batch(df_changed, mode, tokenizer, video_metadata)
+        if ids:
+            embeddings = model.encode(texts, batch_size=encode_batch_size)
+            upsert_in_batches(collection, ids, embeddings, metadatas, upsert_batch_size)
+            vectors += len(ids)
+
+        counts = {}
+        if mode == "chunks":
+            for metadata in metadatas:
+                counts[metadata["parent_id"]] = counts.get(metadata["parent_id"], 0) + 1
+        manifest.upsert([(vid, h, counts.get(vid, 0), mh)
+                         for vid, h, mh in zip(df_changed["id"], hashes_changed, meta_changed)])
+        manifest.commit()
+        changed_videos += len(df_changed)
+
+        rows_done += batch_rows
+        session_rows += batch_rows
+        save_checkpoint(checkpoint_file, {
+            "run": run_key,
+            "batches_committed": batch_idx + 1,
+            "rows_committed": rows_done,
+            "updated_at": time.time(),
+        })
+        if len(df_changed) or any(meta_only):
+            bump_collection_version(version_file)
+
+        elapsed = time.perf_counter() - start
+        print(f"📦 Batch {batch_idx + 1}: {rows_done}/{total_rows} rows, {len(df_changed)} changed "
+              f"({session_rows / max(elapsed, 1e-9):.1f} rows/s, {vectors} vectors this run)")
+
+    # Videos that vanished from the source lose their vectors
+    removed = manifest.all_ids() - seen_ids
+    if removed:
+        known = manifest.lookup(removed)
+        stale = [i for vid, (_, n, _) in known.items() for i in vector_ids(vid, n)]
+        for pos in range(0, len(stale), upsert_batch_size):
+            collection.delete(ids=stale[pos:pos + upsert_batch_size])
+        manifest.delete(removed)
+        store.delete(removed)
+        manifest.commit()
+        bump_collection_version(version_file)
+    manifest.close()
+    store.close()
+
+    # A finished run has nothing left to resume
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scanned {session_rows} rows in {elapsed:.1f}s ({session_rows / max(elapsed, 1e-9):.1f} rows/s): "
+          f"{changed_videos} new/changed, {metadata_updates} metadata-only, {len(removed)} removed, "
+          f"{vectors} vectors written")
+    return {"rows": session_rows, "changed": changed_videos, "metadata_updates": metadata_updates,
+            "removed": len(removed), "vectors": vectors, "seconds": elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream video data from Parquet into ChromaDB.")
+    parser.add_argument("--source", default=SOURCE_PARQUET)
+    parser.add_argument("--mode", choices=["video", "chunks"], default="video",
+                        help="one vector per video, or overlapping transcript chunks")
+    parser.add_argument("--chroma-path", default=CHROMA_PATH)
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--row-batch-size", type=int, default=ROW_BATCH_SIZE)
+    parser.add_argument("--upsert-batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--encode-batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--manifest", default=MANIFEST_FILE)
+    parser.add_argument("--metadata-db", default=METADATA_DB, help="SQLite store for display fields")
+    parser.add_argument("--metadata", default=METADATA_CSV,
+                        help="CSV with channel_title, publishedAt, duration, viewCount, defaultLanguage per video")
+    parser.add_argument("--reset", action="store_true", help="ignore any existing checkpoint")
+    parser.add_argument("--full", action="store_true",
+                        help="re-embed every video instead of only new or changed ones")
+    parser.add_argument("--export-numpy", nargs="?", const=NUMPY_INDEX_DIR, metavar="DIR",
+                        help="after ingesting, export the collection for the numpy/ivf search backends")
+    parser.add_argument("--ivf", type=int, default=0, metavar="NLIST",
+                        help="with --export-numpy, also build IVF lists")
+    parser.add_argument("--quantize", nargs="+", choices=QUANTIZATIONS, default=[],
+                        help="with --export-numpy, also write int8 and/or binary codes")
+    args = parser.parse_args(argv)
+
+    ingest(source=args.source, mode=args.mode, chroma_path=args.chroma_path,
+           collection_name=args.collection, model_name=args.model,
+           row_batch_size=args.row_batch_size, upsert_batch_size=args.upsert_batch_size,
+           encode_batch_size=args.encode_batch_size, checkpoint_file=args.checkpoint,
+           manifest_file=args.manifest, metadata_csv=args.metadata, metadata_db=args.metadata_db,
+           reset=args.reset, full=args.full)
+
+    if args.export_numpy:
+        import chromadb
+        collection = chromadb.PersistentClient(path=args.chroma_path).get_collection(args.collection)
+        n = export_numpy_index(collection, args.export_numpy)
+        print(f"✅ Exported {n} vectors to {args.export_numpy}")
+        if args.ivf:
+            nlist = build_ivf(args.export_numpy, nlist=args.ivf)
+            print(f"✅ Built IVF index with {nlist} lists")
+        if args.quantize:
+            build_quantized(args.export_numpy, args.quantize)
+            print(f"✅ Wrote {' + '.join(args.quantize)} codes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""BM25 inverted index over video titles, descriptions and transcripts.
+
+Catches what embeddings miss: library names, function names and error strings
+that appear verbatim. The index is a CSR posting matrix (term -> doc ids and
+term frequencies) saved as one compressed ``.npz``:
+
+    python lexical_index.py build                 # from Merged_VideoData.parquet
+    python lexical_index.py search "read_csv"     # quick check
+
+Vector and lexical rankings are combined with ``reciprocal_rank_fusion``.
+"""
+import argparse
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from merge_datasets import open_merged
+from search_filters import filter_mask, typed_metadata, STRING_FIELDS, NUMERIC_FIELDS, RAW_COLUMNS
+
+SOURCE_PARQUET = "Merged_VideoData.parquet"
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+TEXT_COLUMNS = ["title", "description", "transcript"]   # already cleaned by the merge notebooks
+TITLE_WEIGHT = 2            # title terms count this many times (cheap field boost)
+ROW_BATCH_SIZE = 512
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+# Letters and digits only: "pandas.read_csv" -> pandas, read, csv, which also
+# matches cleaned transcripts where punctuation became spaces
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _pack(strings):
+    """Newline-joined UTF-8 bytes: far smaller in an .npz than a fixed-width str array."""
+    return np.frombuffer("\n".join(s.replace("\n", " ") for s in strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack(array):
+    data = array.tobytes().decode("utf-8")
+    return data.split("\n") if data else []
+
+
+def build_lexical_index(source=SOURCE_PARQUET, path=LEXICAL_INDEX_FILE, row_batch_size=ROW_BATCH_SIZE):
+    """Stream the Parquet file and write the BM25 index; returns (docs, terms)."""
+    vocab = {}
+    ids, titles, doc_lens = [], [], []
+    term_parts, doc_parts, tf_parts = [], [], []
+    # Filter fields ride along so lexical search honours the same filters as vector search
+    filter_values = {field: [] for field in STRING_FIELDS + NUMERIC_FIELDS}
+    seen = set()
+    dataset = open_merged(source)
+    available = set(dataset.schema.names)
+    columns = ["id"] + TEXT_COLUMNS + [c for c in RAW_COLUMNS[1:] if c in available]
+    for batch in dataset.to_batches(columns=columns, batch_size=row_batch_size):
+        df = batch.to_pandas()
+        df["id"] = df["id"].astype(str)
+        df = df.drop_duplicates(subset=["id"])
+        df = df[~df["id"].isin(seen)]
+        seen.update(df["id"])
+        typed = typed_metadata(df)
+        for field in STRING_FIELDS:
+            filter_values[field].extend(v or "" for v in typed[field])
+        for field in NUMERIC_FIELDS:
+            filter_values[field].extend(typed[field].astype("Float64").to_numpy(dtype=np.float64, na_value=np.nan))
+        term_ids, doc_ids, tfs = [], [], []
+        for row in df.itertuples(index=False):
+            title = row.title if isinstance(row.title, str) else ""
+            tokens = tokenize(title) * TITLE_WEIGHT
+            for column in TEXT_COLUMNS[1:]:
+                value = getattr(row, column)
+                tokens += tokenize(value if isinstance(value, str) else "")
+            doc = len(ids)
+            ids.append(row.id)
+            titles.append(title)
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc)
+                tfs.append(tf)
+        term_parts.append(np.asarray(term_ids, dtype=np.int32))
+        doc_parts.append(np.asarray(doc_ids, dtype=np.int32))
+        tf_parts.append(np.minimum(np.asarray(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16))
+
+    term_ids = np.concatenate(term_parts) if term_parts else np.empty(0, dtype=np.int32)
+    # Stable sort keeps each posting list in doc order
+    order = np.argsort(term_ids, kind="stable")
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+    terms = sorted(vocab, key=vocab.get)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(
+            f,
+            indptr=indptr,
+            doc_ids=np.concatenate(doc_parts)[order] if doc_parts else np.empty(0, dtype=np.int32),
+            tfs=np.concatenate(tf_parts)[order] if tf_parts else np.empty(0, dtype=np.uint16),
+            doc_lens=np.asarray(doc_lens, dtype=np.int32),
+            terms=_pack(terms),
+            ids=_pack(ids),
+            titles=_pack(titles),
+            **{f"filter_{field}": _pack(filter_values[field]) for field in STRING_FIELDS},
+            **{f"filter_{field}": np.asarray(filter_values[field], dtype=np.float64) for field in NUMERIC_FIELDS},
+        )
+    os.replace(tmp, path)
+    return len(ids), len(terms)
+
+
+class LexicalIndex:
+    def __init__(self, path=LEXICAL_INDEX_FILE, k1=BM25_K1, b=BM25_B):
+        self.path = path
+        with np.load(path) as data:
+            self.indptr = data["indptr"]
+            self.doc_ids = data["doc_ids"]
+            self.tfs = data["tfs"].astype(np.float32)
+            doc_lens = data["doc_lens"].astype(np.float32)
+            self.vocab = {term: i for i, term in enumerate(_unpack(data["terms"]))}
+            self.ids = _unpack(data["ids"])
+            self.titles = _unpack(data["titles"])
+            self.filter_columns = {}
+            for field in STRING_FIELDS:
+                if f"filter_{field}" in data:
+                    values = _unpack(data[f"filter_{field}"])
+                    self.filter_columns[field] = np.array([v or None for v in values], dtype=object)
+            for field in NUMERIC_FIELDS:
+                if f"filter_{field}" in data:
+                    self.filter_columns[field] = data[f"filter_{field}"]
+        n_docs = len(self.ids)
+        df = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avg_len = float(doc_lens.mean()) if n_docs else 1.0
+        # Per-document part of the BM25 denominator, computed once
+        self.length_norm = k1 * (1 - b + b * doc_lens / max(avg_len, 1e-9))
+        self.k1 = k1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def version(self):
+        return os.path.getmtime(self.path)
+
+    def scores(self, query):
+        """BM25 score of every document for ``query`` (zeros where no term matches)."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            start, end = self.indptr[tid], self.indptr[tid + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end]
+            scores[docs] += self.idf[tid] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, query, top_n=10, filters=None):
+        """Return up to ``top_n`` hits as {id, title, channel, score}, best first."""
+        scores = self.scores(query)
+        if filters:
+            if len(self.filter_columns) < len(STRING_FIELDS) + len(NUMERIC_FIELDS):
+                raise ValueError("Lexical index has no filter fields; rebuild it: python lexical_index.py build")
+            scores[~filter_mask(filters, self.filter_columns)] = 0.0
+        matched = np.flatnonzero(scores)
+        if matched.size > top_n:
+            matched = matched[np.argpartition(-scores[matched], top_n - 1)[:top_n]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        channels = self.filter_columns.get("channel_title")
+        return [{"id": self.ids[d], "title": self.titles[d],
+                 "channel": (channels[d] or "") if channels is not None else "",
+                 "score": float(scores[d])} for d in matched]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the BM25 lexical index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--source", default=SOURCE_PARQUET)
+    build.add_argument("--out", default=LEXICAL_INDEX_FILE)
+    build.add_argument("--row-batch-size", type=int, default=ROW_BATCH_SIZE)
+    search = sub.add_parser("search")
+    search.add_argument("query")
+    search.add_argument("--index", default=LEXICAL_INDEX_FILE)
+    search.add_argument("--top-n", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        docs, terms = build_lexical_index(args.source, args.out, args.row_batch_size)
+        size_mb = os.path.getsize(args.out) / 1e6
+        print(f"✅ Indexed {docs} videos, {terms} terms in {time.perf_counter() - start:.1f}s "
+              f"({args.out}, {size_mb:.1f} MB)")
+    else:
+        for hit in LexicalIndex(args.index).search(args.query, args.top_n):
+            print(f"{hit['score']:.3f}  {hit['id']}  {hit['title']}")
+
+
+if __name__ == "__main__":
+    main()
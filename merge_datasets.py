@@ -0,0 +1,171 @@
+"""Merge cleaned metadata with transcripts into a partitioned Parquet dataset.
+
+Replaces the notebook merge (full CSV loads, ``apply`` over a set for
+``has_transcript``, CSV + Parquet copies). The transcript CSV is streamed in
+blocks with only the id and transcript columns parsed; each block is
+hash-joined against the metadata table in Arrow and written straight into a
+hive-partitioned dataset, so transcripts never have to fit in memory. The
+metadata side (one row per video) is loaded once.
+
+    python merge_datasets.py                                  # -> Merged_VideoData/
+    python merge_datasets.py --transcripts all_transcripts.csv --block-mb 64
+
+``has_transcript`` is written back to the metadata CSV the filters and
+ingest read. ingest, lexical_index and metadata_store accept the dataset
+directory as ``--source``.
+"""
+import argparse
+import os
+import shutil
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+
+METADATA_SOURCE = "Master_task1_Cleaned_main.csv"
+TRANSCRIPT_SOURCE = "Master_task2_Cleaned_main.csv"
+FLAGGED_METADATA = "Master_Task1_withTranscriptFlag.csv"
+MERGED_DATASET = "Merged_VideoData"
+PARTITION_COLUMN = "channel_id"
+BLOCK_MB = 32                       # transcript CSV bytes parsed per block
+MAX_ROWS_PER_FILE = 100000
+METADATA_COLUMNS = [
+    "id", "title", "description", "publishedAt", "tags", "categoryId", "defaultLanguage",
+    "defaultAudioLanguage", "thumbnail_default", "thumbnail_high", "duration", "viewCount",
+    "likeCount", "commentCount", "privacyStatus", "channel_id", "channel_title",
+    "channel_description", "channel_country", "channel_thumbnail", "channel_subscriberCount",
+    "channel_videoCount",
+]
+# Parsed as numbers; everything else stays text exactly as in the CSV
+NUMERIC_COLUMNS = ["categoryId", "duration", "viewCount", "likeCount", "commentCount",
+                   "channel_subscriberCount", "channel_videoCount"]
+# Few distinct values per file: dictionary pages pay off. Free text is left plain.
+DICTIONARY_COLUMNS = ["channel_title", "channel_description", "channel_country", "channel_thumbnail",
+                      "defaultLanguage", "defaultAudioLanguage", "privacyStatus", "publishedAt"]
+
+
+def open_merged(source):
+    """Arrow dataset over a merged Parquet file or a partitioned dataset directory."""
+    return ds.dataset(source, format="parquet", partitioning="hive" if os.path.isdir(source) else None)
+
+
+def read_metadata(path, columns=METADATA_COLUMNS):
+    """The metadata CSV with only ``columns`` parsed; non-numeric columns stay strings."""
+    convert = pv.ConvertOptions(
+        include_columns=columns,
+        include_missing_columns=True,
+        column_types={c: pa.string() for c in columns if c not in NUMERIC_COLUMNS},
+    )
+    table = pv.read_csv(path, convert_options=convert)
+    # Columns absent from the CSV come back untyped, which joins reject
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table[i].cast(pa.float64()))
+    # First row per id wins, as in ingest
+    rows = table.append_column("_row", pa.array(range(len(table)), pa.int64()))
+    first = rows.group_by("id", use_threads=False).aggregate([("_row", "min")])["_row_min"]
+    # The minima are row numbers; sort them to keep the CSV's order
+    return table.take(pc.take(first, pc.sort_indices(first)))
+
+
+def write_flagged(path, flag_ids, out):
+    """Copy the metadata CSV to ``out`` with a has_transcript column, every row and column kept as is.
+
+    Values are passed through as text, so numbers, the pandas index column and
+    duplicate rows come out exactly as they went in.
+    """
+    names = pv.open_csv(path).schema.names
+    table = pv.read_csv(path, convert_options=pv.ConvertOptions(
+        column_types={c: pa.string() for c in names}, strings_can_be_null=False))
+    flag = pc.fill_null(pc.is_in(table["id"], value_set=flag_ids), False)
+    # Spelled the way pandas writes booleans, as in the notebook's copy
+    pv.write_csv(table.append_column("has_transcript", pc.if_else(flag, "True", "False")), out,
+                 write_options=pv.WriteOptions(quoting_style="needed"))
+    return int(pc.sum(flag).as_py() or 0)
+
+
+def iter_transcripts(path, id_column="id", block_mb=BLOCK_MB):
+    """Stream (id, transcript) record batches from the transcript CSV, skipping malformed rows."""
+    reader = pv.open_csv(
+        path,
+        read_options=pv.ReadOptions(block_size=int(block_mb * 1024 * 1024)),
+        parse_options=pv.ParseOptions(newlines_in_values=True, invalid_row_handler=lambda row: "skip"),
+        convert_options=pv.ConvertOptions(
+            include_columns=[id_column, "transcript"],
+            column_types={id_column: pa.string(), "transcript": pa.string()},
+        ),
+    )
+    for batch in reader:
+        yield batch.rename_columns(["id", "transcript"])
+
+
+def merge(metadata_path=METADATA_SOURCE, transcripts_path=TRANSCRIPT_SOURCE, out=MERGED_DATASET,
+          flag_out=FLAGGED_METADATA, id_column="id", partition_by=PARTITION_COLUMN, block_mb=BLOCK_MB):
+    """Join metadata and transcripts on id; returns (merged rows, videos with transcripts)."""
+    metadata = read_metadata(metadata_path)
+    schema = metadata.schema.append(pa.field("has_transcript", pa.bool_())).append(
+        pa.field("transcript", pa.string()))
+    transcript_ids = []
+    merged_rows = 0
+
+    def joined_batches():
+        nonlocal merged_rows
+        for batch in iter_transcripts(transcripts_path, id_column, block_mb):
+            transcript_ids.append(pc.unique(batch["id"]))
+            text = pc.fill_null(batch["transcript"], "")
+            batch = batch.filter(pc.not_equal(pc.utf8_trim_whitespace(text), ""))
+            if batch.num_rows == 0:
+                continue
+            joined = metadata.join(pa.Table.from_batches([batch]), keys="id", join_type="inner",
+                                   use_threads=True)
+            joined = joined.append_column("has_transcript", pa.repeat(True, joined.num_rows))
+            merged_rows += joined.num_rows
+            yield from joined.select(schema.names).to_batches()
+
+    tmp = f"{out}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    file_format = ds.ParquetFileFormat()
+    ds.write_dataset(
+        joined_batches(), tmp, schema=schema, format=file_format,
+        partitioning=ds.partitioning(pa.schema([schema.field(partition_by)]), flavor="hive") if partition_by else None,
+        file_options=file_format.make_write_options(
+            compression="zstd", use_dictionary=[c for c in DICTIONARY_COLUMNS if c != partition_by]),
+        max_rows_per_file=MAX_ROWS_PER_FILE,
+        max_rows_per_group=min(MAX_ROWS_PER_FILE, 64 * 1024),
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    # Swap in the finished dataset only once every block is written
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+
+    # Vectorized membership test instead of apply(lambda x: x in transcript_ids)
+    all_ids = pc.unique(pa.chunked_array(transcript_ids, pa.string()))
+    flag = pc.fill_null(pc.is_in(metadata["id"], value_set=all_ids), False)
+    if flag_out:
+        write_flagged(metadata_path, all_ids, flag_out)
+    return merged_rows, int(pc.sum(flag).as_py() or 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge cleaned metadata and transcripts into Parquet.")
+    parser.add_argument("--metadata", default=METADATA_SOURCE)
+    parser.add_argument("--transcripts", default=TRANSCRIPT_SOURCE)
+    parser.add_argument("--id-column", default="id", help="id column of the transcript CSV (e.g. video_id)")
+    parser.add_argument("--out", default=MERGED_DATASET)
+    parser.add_argument("--flag-out", default=FLAGGED_METADATA,
+                        help="metadata CSV with has_transcript ('' to skip)")
+    parser.add_argument("--partition-by", default=PARTITION_COLUMN, help="'' for an unpartitioned dataset")
+    parser.add_argument("--block-mb", type=float, default=BLOCK_MB)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows, flagged = merge(args.metadata, args.transcripts, args.out, args.flag_out or None,
+                          args.id_column, args.partition_by or None, args.block_mb)
+    print(f"✅ Merged dataset: {rows} rows in {time.perf_counter() - start:.1f}s")
+    print(f"💾 Saved to {args.out}/" + (f", {flagged} videos flagged in {args.flag_out}" if args.flag_out else ""))
+
+
+if __name__ == "__main__":
+    main()
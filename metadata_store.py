@@ -0,0 +1,185 @@
+"""SQLite store of per-video display fields, keyed by video id.
+
+The vector index only carries ids and filter fields; search results are
+assembled from this store after the index query. Transcripts live here too, so
+snippets are cut inside SQLite with ``substr`` and never leave the database in
+full.
+
+    python metadata_store.py build        # (re)build from Merged_VideoData.parquet
+
+``ingest.py`` keeps the store in sync on every run.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+
+from merge_datasets import open_merged
+from search_filters import parse_duration
+
+SOURCE_PARQUET = "Merged_VideoData.parquet"
+METADATA_DB = os.path.join("chroma_db", "video_metadata.sqlite")
+VIDEO_URL = "https://www.youtube.com/watch?v={}"
+ROW_BATCH_SIZE = 512
+
+# Store column -> source column (None = derived)
+COLUMNS = {
+    "title": "title",
+    "channel": "channel_title",
+    "channel_id": "channel_id",
+    "url": None,
+    "description": "description",
+    "thumbnail": "thumbnail_high",
+    "published_at": "publishedAt",
+    "duration": "duration",
+    "view_count": "viewCount",
+    "language": "defaultLanguage",
+    "transcript": "transcript",
+}
+SOURCE_COLUMNS = ["id"] + [c for c in COLUMNS.values() if c]
+# Fields a search response may ask for; the transcript is only exposed through snippets
+RESULT_FIELDS = tuple(c for c in COLUMNS if c != "transcript")
+DEFAULT_FIELDS = ("title", "channel", "url", "description", "thumbnail")
+
+
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+def _int(value):
+    try:
+        return None if value is None or value != value else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def rows_from_frame(df):
+    """Store rows (tuples in COLUMNS order, id first) for a frame of source rows."""
+    rows = []
+    for record in df.to_dict(orient="records"):
+        video_id = str(record["id"])
+        rows.append((
+            video_id,
+            _text(record.get("title")),
+            _text(record.get("channel_title")),
+            _text(record.get("channel_id")),
+            VIDEO_URL.format(video_id),
+            _text(record.get("description")),
+            _text(record.get("thumbnail_high")),
+            _text(record.get("publishedAt")),
+            parse_duration(record.get("duration")),
+            _int(record.get("viewCount")),
+            _text(record.get("defaultLanguage")),
+            _text(record.get("transcript")),
+        ))
+    return rows
+
+
+class MetadataStore:
+    def __init__(self, path=METADATA_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos (id TEXT PRIMARY KEY, "
+            + ", ".join(f"{c} {'INTEGER' if c in ('duration', 'view_count') else 'TEXT'}" for c in COLUMNS)
+            + ")"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # One connection per thread: searches run on executor threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+
+    def upsert_frame(self, df):
+        rows = rows_from_frame(df)
+        conn = self._conn()
+        conn.executemany(
+            f"INSERT OR REPLACE INTO videos (id, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+            rows,
+        )
+        conn.commit()
+        return len(rows)
+
+    def delete(self, ids):
+        conn = self._conn()
+        conn.executemany("DELETE FROM videos WHERE id = ?", [(vid,) for vid in ids])
+        conn.commit()
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def fetch(self, ids, fields=DEFAULT_FIELDS, snippet_chars=None, snippet_starts=None):
+        """Return {id: {field: value}} for ``ids``, one query per 450 ids.
+
+        With ``snippet_chars`` each record also gets ``snippet``: that many
+        transcript characters from ``snippet_starts[id]`` (0 when absent).
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        unknown = set(fields) - set(RESULT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)}; expected any of {list(RESULT_FIELDS)}")
+        fields = list(fields)
+        select = [f"v.{f}" for f in fields]
+        if snippet_chars:
+            select.append(f"substr(v.transcript, want.start + 1, {int(snippet_chars)})")
+        records = {}
+        for start in range(0, len(ids), 450):  # two variables per id; stay under SQLite's limit
+            part = ids[start:start + 450]
+            params = []
+            for vid in part:
+                params += [vid, (snippet_starts or {}).get(vid) or 0]
+            sql = (f"WITH want(id, start) AS (VALUES {', '.join('(?, ?)' for _ in part)}) "
+                   f"SELECT want.id, {', '.join(select)} FROM want JOIN videos v ON v.id = want.id")
+            for row in self._conn().execute(sql, params):
+                record = dict(zip(fields, row[1:1 + len(fields)]))
+                if snippet_chars:
+                    record["snippet"] = row[-1] or ""
+                records[row[0]] = record
+        return records
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def build_metadata_store(source=SOURCE_PARQUET, path=METADATA_DB, row_batch_size=ROW_BATCH_SIZE):
+    """Load every video's display fields from the Parquet file into the store."""
+    store = MetadataStore(path)
+    dataset = open_merged(source)
+    available = set(dataset.schema.names)
+    columns = [c for c in SOURCE_COLUMNS if c in available]
+    seen = set()
+    for batch in dataset.to_batches(columns=columns, batch_size=row_batch_size):
+        # First occurrence wins, as in ingest
+        df = batch.to_pandas().assign(id=lambda d: d["id"].astype(str)).drop_duplicates(subset=["id"])
+        df = df[~df["id"].isin(seen)]
+        seen.update(df["id"])
+        store.upsert_frame(df)
+    rows = store.count()
+    store.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the per-video display metadata store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--source", default=SOURCE_PARQUET)
+    build.add_argument("--db", default=METADATA_DB)
+    args = parser.parse_args(argv)
+
+    rows = build_metadata_store(args.source, args.db)
+    print(f"✅ Stored display metadata for {rows} videos in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
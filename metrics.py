@@ -0,0 +1,166 @@
+import math
+import threading
+from bisect import bisect_left
+
+# Default latency buckets in milliseconds and batch-size buckets in queries
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, safe to share across threads."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Return count, sum, mean and cumulative bucket counts."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets, counts):
+            running += c
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = running + counts[-1]
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "mean": round(total / count, 3) if count else 0.0,
+            "buckets": cumulative,
+        }
+
+
+class Counter:
+    """Monotonically increasing value, safe to share across threads."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        return self._value
+
+
+class Gauge(Counter):
+    """Value that can go up and down (e.g. requests in flight)."""
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value):
+        self._value = value
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_help(text):
+    return str(text).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Named metric families, rendered in the Prometheus text exposition format.
+
+    ``counter``/``gauge``/``histogram`` return the child for one label set,
+    creating it on first use; hot paths should keep the child rather than
+    look it up per request. ``callback`` families are computed at scrape time
+    from state that already exists elsewhere (cache stats, index size).
+    """
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, kind, help_text):
+        family = self._families.get(name)
+        if family is None:
+            with self._lock:
+                family = self._families.setdefault(name, {"kind": kind, "help": help_text, "children": {}})
+        if family["kind"] != kind:
+            raise ValueError(f"Metric {name} is already registered as a {family['kind']}")
+        return family
+
+    def _child(self, name, kind, help_text, factory, labels):
+        children = self._family(name, kind, help_text)["children"]
+        key = tuple(sorted(labels.items()))
+        child = children.get(key)
+        if child is None:
+            with self._lock:
+                child = children.setdefault(key, factory())
+        return child
+
+    def counter(self, name, help_text, **labels):
+        return self._child(name, "counter", help_text, Counter, labels)
+
+    def gauge(self, name, help_text, **labels):
+        return self._child(name, "gauge", help_text, Gauge, labels)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS_MS, **labels):
+        return self._child(name, "histogram", help_text, lambda: Histogram(buckets), labels)
+
+    def register(self, name, kind, help_text, metric, **labels):
+        """Export an existing Counter/Gauge/Histogram (e.g. one owned by another component)."""
+        self._family(name, kind, help_text)["children"][tuple(sorted(labels.items()))] = metric
+        return metric
+
+    def callback(self, name, kind, help_text, fn):
+        """Export ``fn()`` at scrape time: a number, or {label dict as tuple of pairs: number}."""
+        self._family(name, kind, help_text)["callback"] = fn
+
+    def render(self):
+        lines = []
+        for name, family in sorted(self._families.items()):
+            samples = []
+            if "callback" in family:
+                try:
+                    value = family["callback"]()
+                except Exception:
+                    continue  # a broken source must not take the whole scrape down
+                items = value.items() if isinstance(value, dict) else [((), value)]
+                samples = [f"{name}{_format_labels(labels)} {_format_value(v)}"
+                           for labels, v in items if v is not None]
+            for labels, metric in sorted(family["children"].items()):
+                if isinstance(metric, Histogram):
+                    snapshot = metric.snapshot()
+                    for bound, count in snapshot["buckets"].items():
+                        samples.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {count}")
+                    samples.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+                    samples.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+                else:
+                    samples.append(f"{name}{_format_labels(labels)} {_format_value(metric.value())}")
+            if samples:
+                lines.append(f"# HELP {name} {_format_help(family['help'])}")
+                lines.append(f"# TYPE {name} {family['kind']}")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
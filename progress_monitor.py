@@ -0,0 +1,253 @@
+"""Thread-safe progress telemetry for the transcript extractor.
+
+Fetch workers update an ``ExtractionMetrics`` object through small locked
+methods and never print. One ``ProgressReporter`` thread reads it on a timer
+and:
+
+* appends a structured JSON snapshot per interval to a ``.jsonl`` file, for
+  dashboards, ``tail -f`` or post-run analysis,
+* redraws a live summary at most once per interval (a notebook cell, a
+  terminal, or nothing at all when headless).
+
+IPython is imported only when the notebook display is actually used, so the
+extractor starts quickly as a plain CLI on servers.
+"""
+import json
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+DISPLAY_MODES = ("auto", "notebook", "terminal", "none")
+SNAPSHOT_INTERVAL = 5.0     # seconds between JSON snapshots / redraws
+MAX_RECENT_ERRORS = 10
+TRANSCRIPT_TYPES = ("manual", "auto-generated", "unknown")
+
+
+class ExtractionMetrics:
+    """Counters and status of one extraction run, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0            # bumped on every change, so readers can skip unchanged states
+        self.total_videos = 0
+        self.processed_videos = 0
+        self.successful_transcripts = 0
+        self.failed_videos = 0
+        self.session_done = 0
+        self.session_total = 0
+        self.current_video = ""
+        self.current_status = "Initializing..."
+        self.start_time = time.time()
+        self.transcript_types = {t: 0 for t in TRANSCRIPT_TYPES}
+        self.recent_errors = deque(maxlen=MAX_RECENT_ERRORS)
+        self.proxy_stats = {}
+        self.throughput = {}
+
+    def _changed(self):
+        self.version += 1
+
+    def start(self, total_videos, done_types=(), session_total=None):
+        """Begin a run over ``total_videos``; ``done_types`` are the types of videos already stored.
+
+        ``session_total`` is how many videos this session will fetch (default:
+        the ones not already stored); the ETA is based on it.
+        """
+        with self._lock:
+            self.start_time = time.time()
+            self.total_videos = total_videos
+            self.processed_videos = self.successful_transcripts = 0
+            for transcript_type in done_types:
+                self.processed_videos += 1
+                self.successful_transcripts += 1
+                if transcript_type in self.transcript_types:
+                    self.transcript_types[transcript_type] += 1
+            self.session_done = 0
+            self.session_total = (max(total_videos - self.processed_videos, 0)
+                                  if session_total is None else session_total)
+            self._changed()
+
+    def set_status(self, status):
+        with self._lock:
+            self.current_status = status
+            self._changed()
+
+    def count_transcript_type(self, transcript_type):
+        with self._lock:
+            self.transcript_types[transcript_type] = self.transcript_types.get(transcript_type, 0) + 1
+            self._changed()
+
+    def record_error(self, video_id, message):
+        with self._lock:
+            self.recent_errors.append(f"{video_id}: {message}")
+            self._changed()
+
+    def record_result(self, video_id, success):
+        """One video finished this session, with or without a transcript."""
+        with self._lock:
+            self.current_video = video_id
+            self.processed_videos += 1
+            self.session_done += 1
+            if success:
+                self.successful_transcripts += 1
+            else:
+                self.failed_videos += 1
+            self._changed()
+
+    def set_proxy_stats(self, stats):
+        with self._lock:
+            self.proxy_stats = stats
+            self._changed()
+
+    def set_throughput(self, throughput):
+        with self._lock:
+            self.throughput = throughput
+            self._changed()
+
+    def eta_minutes(self):
+        """Remaining session time at the session's observed pace (0 before the first result)."""
+        with self._lock:
+            if not self.session_done:
+                return 0.0
+            per_video = (time.time() - self.start_time) / self.session_done
+            return (self.session_total - self.session_done) * per_video / 60
+
+    def snapshot(self):
+        """Consistent plain-dict copy of every counter, plus derived rates."""
+        eta = self.eta_minutes()
+        with self._lock:
+            elapsed = time.time() - self.start_time
+            processed = self.processed_videos
+            return {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "elapsed_seconds": round(elapsed, 1),
+                "total_videos": self.total_videos,
+                "processed_videos": processed,
+                "successful_transcripts": self.successful_transcripts,
+                "failed_videos": self.failed_videos,
+                "progress_percent": round(processed / self.total_videos * 100, 2) if self.total_videos else 0.0,
+                "success_rate": round(self.successful_transcripts / max(1, processed) * 100, 2),
+                "session_done": self.session_done,
+                "videos_per_minute": round(self.session_done / max(elapsed, 1e-9) * 60, 2),
+                "eta_minutes": round(eta, 1),
+                "current_video": self.current_video,
+                "current_status": self.current_status,
+                "transcript_types": dict(self.transcript_types),
+                "recent_errors": list(self.recent_errors),
+                "proxy_stats": dict(self.proxy_stats),
+                "throughput": dict(self.throughput),
+            }
+
+
+def format_progress(snapshot):
+    """The live monitor text for one snapshot."""
+    bar_length = 40
+    filled_length = int(bar_length * snapshot["progress_percent"] / 100)
+    bar = "█" * filled_length + "░" * (bar_length - filled_length)
+    lines = [
+        "🎯 YOUTUBE TRANSCRIPT EXTRACTION - LIVE MONITOR",
+        "=" * 60,
+        f"📊 Progress: [{bar}] {snapshot['progress_percent']:.1f}%",
+        f"📹 Videos: {snapshot['processed_videos']}/{snapshot['total_videos']}",
+        f"✅ Success: {snapshot['successful_transcripts']} ({snapshot['success_rate']:.1f}%)",
+        f"❌ Failed: {snapshot['failed_videos']}",
+        f"🕐 Runtime: {snapshot['elapsed_seconds'] / 60:.1f} minutes",
+        f"⏱️ ETA: {snapshot['eta_minutes']:.1f} minutes remaining",
+        f"📺 Current: {snapshot['current_video']}",
+        f"🔄 Status: {snapshot['current_status']}",
+    ]
+    stats = snapshot["proxy_stats"]
+    if stats:
+        lines.append(f"🌐 Proxies: {stats['working']}/{stats['total']} working "
+                     f"(Success: {stats['avg_success_rate']:.2f})")
+    types = snapshot["transcript_types"]
+    if sum(types.values()) > 0:
+        lines.append(f"📝 Types: Manual={types['manual']}, Auto={types['auto-generated']}, "
+                     f"Unknown={types['unknown']}")
+    if snapshot["recent_errors"]:
+        lines.append(f"⚠️ Recent errors: {len(snapshot['recent_errors'])}")
+        lines.extend(f"   • {error}" for error in snapshot["recent_errors"][-3:])
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def resolve_display(mode="auto"):
+    """Pick a concrete display: a notebook if running in a Jupyter/Colab kernel, a TTY, else none."""
+    if mode not in DISPLAY_MODES:
+        raise ValueError(f"display must be one of {DISPLAY_MODES}")
+    if mode != "auto":
+        return mode
+    # Only a kernel that is already loaded counts; never import IPython to find out
+    if "ipykernel" in sys.modules or "google.colab" in sys.modules:
+        return "notebook"
+    return "terminal" if sys.stdout.isatty() else "none"
+
+
+class ProgressReporter:
+    """Background thread that snapshots ``metrics`` every ``interval`` seconds.
+
+    Each changed state is appended to ``snapshot_path`` (JSON lines) and drawn
+    on ``display``. Drawing is therefore rate-limited to one redraw per
+    interval, however often the workers update.
+    """
+
+    def __init__(self, metrics, snapshot_path=None, display="auto", interval=SNAPSHOT_INTERVAL):
+        self.metrics = metrics
+        self.snapshot_path = snapshot_path
+        self.display = resolve_display(display)
+        self.interval = interval
+        self._clear_output = None
+        self._last_version = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _draw(self, snapshot):
+        text = format_progress(snapshot)
+        if self.display == "notebook":
+            if self._clear_output is None:
+                from IPython.display import clear_output
+                self._clear_output = clear_output
+            self._clear_output(wait=True)
+            print(text)
+        elif self.display == "terminal":
+            # Home the cursor and clear below instead of scrolling a new block each time
+            print("\033[H\033[J" + text if sys.stdout.isatty() else text, flush=True)
+
+    def flush(self, force=False):
+        """Write and draw the current state now if it changed since the last one (or ``force``)."""
+        with self._lock:
+            version = self.metrics.version
+            if version == self._last_version and not force:
+                return None
+            self._last_version = version
+            snapshot = self.metrics.snapshot()
+            if self.snapshot_path:
+                with open(self.snapshot_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+            if self.display != "none":
+                self._draw(snapshot)
+            return snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:  # telemetry must never stop the extraction
+                print(f"⚠️ Progress snapshot failed: {e}", file=sys.stderr)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and write one final snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.flush(force=True)
@@ -0,0 +1,230 @@
+"""Scored proxy pool with a background health checker.
+
+Proxies live in two heaps: ``waiting`` ordered by next-available time and
+``ready`` ordered by score. Acquiring a proxy promotes the ones whose time has
+come and pops the best-scored one, so selection is O(log n). Proxies that the
+health checker found dead are dropped from both heaps and are never handed out
+until a later probe succeeds.
+
+Probing is plain HTTP through the proxy, so it can be exercised against a local
+stand-in server (see tests/test_proxy_pool.py) without touching the internet.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from fetch_engine import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+PROBE_URL = "https://www.youtube.com/generate_204"
+PROBE_TIMEOUT = 10
+PROBE_WORKERS = 16
+HEALTH_CHECK_INTERVAL = 120     # seconds between background probe rounds
+DEAD_AFTER = 1                  # consecutive failed probes before a proxy is dropped
+LATENCY_SMOOTHING = 0.3         # weight of the newest probe in the latency average
+
+
+class _ProxyState:
+    __slots__ = ("proxy", "bucket", "success_rate", "uses", "latency", "probe_failures",
+                 "dead", "available_at", "version")
+
+    def __init__(self, proxy, bucket):
+        self.proxy = proxy
+        self.bucket = bucket
+        self.success_rate = 1.0
+        self.uses = 0
+        self.latency = None
+        self.probe_failures = 0
+        self.dead = False
+        self.available_at = 0.0
+        self.version = 0
+
+    def score(self):
+        usage_factor = 1 / (self.uses + 1)
+        latency_factor = 1 / (1 + (self.latency or 0.0))
+        return usage_factor * self.success_rate * latency_factor
+
+
+class ProxyPool:
+    def __init__(self, proxies, rate, burst, spacing=(0.0, 0.0), cooldown=300.0,
+                 dead_after=DEAD_AFTER):
+        self.spacing = spacing
+        self.cooldown = cooldown
+        self.dead_after = dead_after
+        self._states = {p: _ProxyState(p, TokenBucket(rate, burst)) for p in proxies}
+        self._waiting = []   # (available_at, seq, version, proxy)
+        self._ready = []     # (-score, seq, version, proxy)
+        self._seq = itertools.count()
+        self._changed = threading.Condition()
+        for state in self._states.values():
+            self._schedule(state)
+
+    def __len__(self):
+        return len(self._states)
+
+    # ----- heap bookkeeping (caller holds self._changed) -----
+    def _schedule(self, state):
+        """Invalidate any queued entry for this proxy and queue it again."""
+        state.version += 1
+        if not state.dead:
+            heapq.heappush(self._waiting, (state.available_at, next(self._seq), state.version, state.proxy))
+
+    def _promote(self, now):
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, version, proxy = heapq.heappop(self._waiting)
+            state = self._states[proxy]
+            if version == state.version and not state.dead:
+                heapq.heappush(self._ready, (-state.score(), next(self._seq), version, proxy))
+
+    def _next_wait(self, now):
+        while self._waiting:
+            at, _, version, proxy = self._waiting[0]
+            if version == self._states[proxy].version and not self._states[proxy].dead:
+                return max(at - now, 0.0)
+            heapq.heappop(self._waiting)
+        return None
+
+    # ----- selection -----
+    def acquire(self, now=None):
+        """Take the best ready proxy: returns (proxy, 0) or (None, seconds to wait)."""
+        with self._changed:
+            now = time.monotonic() if now is None else now
+            self._promote(now)
+            while self._ready:
+                _, _, version, proxy = heapq.heappop(self._ready)
+                state = self._states[proxy]
+                if version != state.version or state.dead:
+                    continue
+                state.bucket.try_acquire(now)
+                state.uses += 1
+                spacing = random.uniform(*self.spacing)
+                state.available_at = now + max(spacing, state.bucket.wait_time(now))
+                self._schedule(state)
+                return proxy, 0.0
+
+            wait = self._next_wait(now)
+            if wait is None:
+                # Every proxy is dead: give them all another chance rather than stall
+                logger.warning("⚠️ All proxies failed health checks, resetting pool...")
+                for state in self._states.values():
+                    state.dead = False
+                    state.probe_failures = 0
+                    state.available_at = now
+                    self._schedule(state)
+                wait = 0.0
+            return None, wait
+
+    def wait_for_change(self, timeout):
+        """Sleep up to ``timeout`` seconds, waking early if a proxy is revived or freed."""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    # ----- feedback -----
+    def record_result(self, proxy, success):
+        """Fold a real fetch outcome into the proxy's score; failures cool it down."""
+        with self._changed:
+            state = self._states[proxy]
+            if success:
+                state.success_rate = min(1.0, state.success_rate + 0.1)
+            else:
+                state.success_rate = max(0.1, state.success_rate - 0.3)
+                state.available_at = max(state.available_at, time.monotonic() + self.cooldown)
+            self._schedule(state)
+
+    def record_probe(self, proxy, ok, latency=None):
+        with self._changed:
+            state = self._states[proxy]
+            if ok:
+                state.probe_failures = 0
+                if latency is not None:
+                    state.latency = latency if state.latency is None else (
+                        LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * state.latency)
+                if state.dead:
+                    state.dead = False
+                    state.available_at = time.monotonic()
+                self._schedule(state)
+                self._changed.notify_all()
+            else:
+                state.probe_failures += 1
+                if state.probe_failures >= self.dead_after and not state.dead:
+                    state.dead = True
+                    state.version += 1  # drops it from both heaps
+
+    def stats(self):
+        with self._changed:
+            states = list(self._states.values())
+            latencies = [s.latency for s in states if s.latency is not None and not s.dead]
+            working = [s for s in states if not s.dead and s.success_rate > 0.3]
+            return {
+                'total': len(states),
+                'working': len(working),
+                'failed': len(states) - len(working),
+                'dead': sum(s.dead for s in states),
+                'avg_success_rate': sum(s.success_rate for s in states) / max(1, len(states)),
+                'avg_latency': sum(latencies) / len(latencies) if latencies else None,
+            }
+
+
+def probe_proxy(proxy, url=PROBE_URL, timeout=PROBE_TIMEOUT):
+    """Fetch ``url`` through ``proxy``; returns (ok, latency_seconds)."""
+    start = time.monotonic()
+    try:
+        response = requests.get(url, proxies={"http": proxy, "https": proxy},
+                                timeout=timeout, allow_redirects=False)
+        ok = response.status_code < 400
+    except requests.RequestException:
+        ok = False
+    return ok, time.monotonic() - start
+
+
+class ProxyHealthChecker:
+    """Probes every proxy concurrently, once up front and then every ``interval`` seconds."""
+
+    def __init__(self, pool, proxies, url=PROBE_URL, interval=HEALTH_CHECK_INTERVAL,
+                 timeout=PROBE_TIMEOUT, workers=PROBE_WORKERS, probe=probe_proxy):
+        self.pool = pool
+        self.proxies = list(proxies)
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.workers = workers
+        self.probe = probe
+        self.rounds = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check_now(self):
+        """Run one probe round and return {proxy: (ok, latency)}."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="probe") as executor:
+            outcomes = dict(zip(self.proxies, executor.map(
+                lambda p: self.probe(p, self.url, self.timeout), self.proxies)))
+        for proxy, (ok, latency) in outcomes.items():
+            self.pool.record_probe(proxy, ok, latency if ok else None)
+        self.rounds += 1
+        return outcomes
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_now()
+            except Exception as e:
+                logger.warning(f"⚠️ Proxy health check failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="proxy-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache sizes are in entries; a MiniLM embedding is 384 float32 values (~1.5 KB)
+EMBEDDING_CACHE_SIZE = int(os.getenv("QUERYTUBE_EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL = float(os.getenv("QUERYTUBE_EMBEDDING_CACHE_TTL", "86400"))
+RESULT_CACHE_SIZE = int(os.getenv("QUERYTUBE_RESULT_CACHE_SIZE", "5000"))
+RESULT_CACHE_TTL = float(os.getenv("QUERYTUBE_RESULT_CACHE_TTL", "600"))
+# Paging state behind /search cursors: an embedding plus up to the candidate cap
+# of slim {id, score} hits each, so memory is bounded by size x cap entries.
+# The TTL is an idle timeout; every page served renews it.
+CURSOR_STORE_SIZE = int(os.getenv("QUERYTUBE_CURSOR_STORE_SIZE", "1000"))
+CURSOR_TTL = float(os.getenv("QUERYTUBE_CURSOR_TTL", "300"))
+# How often (seconds) to check whether the collection changed underneath us
+VERSION_CHECK_INTERVAL = float(os.getenv("QUERYTUBE_VERSION_CHECK_INTERVAL", "5"))
+# Touched by ingestion so running APIs drop stale result lists
+COLLECTION_VERSION_FILE = os.path.join("chroma_db", "collection_version")
+
+_MISSING = object()
+
+
+def normalize_query(text):
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return " ".join(str(text).lower().split())
+
+
+def embedding_key(embedding):
+    """Short stable digest of an embedding vector, used in result cache keys."""
+    return hashlib.blake2b(embedding.tobytes(), digest_size=16).hexdigest()
+
+
+class LRUTTLCache:
+    """Bounded mapping with least-recently-used and time-to-live eviction."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires, value = entry
+            if expires < now:
+                del self._data[key]
+                self.misses += 1
+                self.evictions += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def collection_version(collection, version_file=COLLECTION_VERSION_FILE):
+    """Cheap fingerprint of the collection: row count plus the ingest marker mtime."""
+    try:
+        marker = os.path.getmtime(version_file)
+    except OSError:
+        marker = 0.0
+    return (collection.count(), marker)
+
+
+def collection_version_file(chroma_path):
+    """The version marker of the Chroma store at ``chroma_path``."""
+    return os.path.join(chroma_path, os.path.basename(COLLECTION_VERSION_FILE))
+
+
+def bump_collection_version(version_file=COLLECTION_VERSION_FILE):
+    """Mark the collection as changed; call after every ingest commit."""
+    os.makedirs(os.path.dirname(version_file) or ".", exist_ok=True)
+    with open(version_file, "w") as f:
+        f.write(str(time.time()))
+
+
+class QueryCache:
+    """Two-level cache: normalized query -> embedding, (embedding, top_n) -> hits.
+
+    ``cursors`` holds the paging state of recent searches by cursor id.
+    """
+
+    def __init__(self, embedding_size=EMBEDDING_CACHE_SIZE, embedding_ttl=EMBEDDING_CACHE_TTL,
+                 result_size=RESULT_CACHE_SIZE, result_ttl=RESULT_CACHE_TTL,
+                 version_check_interval=VERSION_CHECK_INTERVAL,
+                 cursor_size=CURSOR_STORE_SIZE, cursor_ttl=CURSOR_TTL):
+        self.embeddings = LRUTTLCache(embedding_size, embedding_ttl)
+        self.results = LRUTTLCache(result_size, result_ttl)
+        self.cursors = LRUTTLCache(cursor_size, cursor_ttl)
+        self.version_check_interval = version_check_interval
+        self.invalidations = 0
+        self._dependents = []
+        self._version = None
+        self._next_check = 0.0
+
+    def check_version(self, version_fn):
+        """Drop cached result lists if the collection changed since the last check."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.version_check_interval
+        version = version_fn()
+        if self._version is not None and version != self._version:
+            self.invalidate()
+        self._version = version
+
+    def attach(self, cache):
+        """Also clear ``cache`` (anything derived from indexed content) whenever results are invalidated."""
+        self._dependents.append(cache)
+
+    def invalidate(self):
+        """Forget result lists, cursors and attached caches; embeddings stay valid because the model is unchanged."""
+        self.results.clear()
+        self.cursors.clear()
+        for cache in self._dependents:
+            cache.clear()
+        self.invalidations += 1
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+        self.cursors.clear()
+        for cache in self._dependents:
+            cache.clear()
+
+    def stats(self):
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+            "cursors": self.cursors.stats(),
+            "invalidations": self.invalidations,
+        }
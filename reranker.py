@@ -0,0 +1,130 @@
+"""Optional second stage: rescore first-stage candidates with a cross-encoder.
+
+The bi-encoder ranks by embedding distance only. A cross-encoder reads the
+query and each candidate's text together, which orders the top of the list
+much better but costs one forward pass per (query, candidate) pair. Pairs are
+scored in batches under a per-query latency budget; if the budget runs out,
+the query keeps its first-stage order. Pair scores are cached, so repeat
+candidates are not rescored; the cache depends on the indexed text, so the
+search module clears it on reindex (see QueryCache.attach).
+"""
+import os
+import threading
+import time
+
+from query_cache import LRUTTLCache, normalize_query
+
+RERANK_MODEL = os.getenv("QUERYTUBE_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("QUERYTUBE_RERANK_CANDIDATES", "20"))    # first-stage hits rescored per query
+RERANK_BUDGET_MS = float(os.getenv("QUERYTUBE_RERANK_BUDGET_MS", "150"))
+RERANK_BATCH_SIZE = int(os.getenv("QUERYTUBE_RERANK_BATCH_SIZE", "16"))    # pairs per forward pass
+PASSAGE_CHARS = int(os.getenv("QUERYTUBE_RERANK_PASSAGE_CHARS", "512"))    # best-chunk text after the title
+PAIR_CACHE_SIZE = int(os.getenv("QUERYTUBE_RERANK_CACHE_SIZE", "50000"))
+PAIR_CACHE_TTL = float(os.getenv("QUERYTUBE_RERANK_CACHE_TTL", "86400"))
+ESTIMATE_SMOOTHING = 0.3   # weight of the newest batch in the per-pair cost estimate
+
+
+def passage_text(title, chunk_text):
+    """What the cross-encoder reads for one candidate: title, then the best chunk."""
+    return " ".join(part for part in (title, chunk_text) if part)
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name=RERANK_MODEL, batch_size=RERANK_BATCH_SIZE,
+                 cache_size=PAIR_CACHE_SIZE, cache_ttl=PAIR_CACHE_TTL):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.pair_scores = LRUTTLCache(cache_size, cache_ttl)
+        self.model = None
+        self.pair_ms = None        # estimated cost of scoring one pair, seeded by warm_up()
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self.model is None:
+                from sentence_transformers import CrossEncoder
+                self.model = CrossEncoder(self.model_name)
+        return self.model
+
+    def warm_up(self):
+        """Load the model and time one full batch; returns the per-pair cost estimate in ms."""
+        model = self.load()
+        with self._lock:
+            if self.pair_ms is None:
+                pairs = [("warm up", "warm up")] * self.batch_size
+                model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)  # first call pays setup
+                start = time.perf_counter()
+                model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+                self.pair_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+        return self.pair_ms
+
+    def rerank_many(self, queries, hit_lists, passages, budget_ms=RERANK_BUDGET_MS, timings=None):
+        """Reorder each hit list by cross-encoder score, best first.
+
+        ``passages`` maps (video id, chunk index or None) to candidate text.
+        Returns one list per query. Every query gets its own ``budget_ms``:
+        a batch is only started if its estimated cost still fits, and a query
+        whose pairs were not all scored keeps its first-stage order. Reranked
+        hits gain ``rerank_score``.
+        """
+        timings = {} if timings is None else timings
+        self.warm_up()  # a cold load and the first estimate are not charged to the budget
+        start = time.perf_counter()
+
+        scores = {}
+        output = []
+        scored = cached_pairs = fallbacks = 0
+        for query, hits in zip(queries, hit_lists):
+            query_key = normalize_query(query)
+            keys = [(query_key,) + _passage_key(hit) for hit in hits]
+            todo = []
+            for key in dict.fromkeys(keys):
+                if scores.get(key) is not None:
+                    continue
+                cached = self.pair_scores.get(key)
+                if cached is None:
+                    todo.append(key)
+                else:
+                    scores[key] = cached
+                    cached_pairs += 1
+
+            deadline = time.perf_counter() + budget_ms / 1000
+            for i in range(0, len(todo), self.batch_size):
+                batch = todo[i:i + self.batch_size]
+                # Stop (or never start) if this batch would likely overrun the query's budget
+                if time.perf_counter() + self.pair_ms * len(batch) / 1000 > deadline:
+                    break
+                batch_start = time.perf_counter()
+                pairs = [(query, passages.get(key[1:], "")) for key in batch]
+                for key, score in zip(batch, self.model.predict(pairs, batch_size=self.batch_size,
+                                                                show_progress_bar=False)):
+                    scores[key] = float(score)
+                    self.pair_scores.set(key, float(score))
+                scored += len(batch)
+                measured = (time.perf_counter() - batch_start) * 1000 / len(batch)
+                self.pair_ms = ESTIMATE_SMOOTHING * measured + (1 - ESTIMATE_SMOOTHING) * self.pair_ms
+
+            pair_scores = [scores.get(key) for key in keys]
+            if any(score is None for score in pair_scores):
+                fallbacks += 1
+                output.append(hits)
+                continue
+            reranked = [dict(hit, rerank_score=score) for hit, score in zip(hits, pair_scores)]
+            # Stable sort keeps first-stage order between equal scores
+            reranked.sort(key=lambda hit: -hit["rerank_score"])
+            output.append(reranked)
+
+        timings["rerank_ms"] = (time.perf_counter() - start) * 1000
+        timings["rerank_pairs"] = scored
+        timings["rerank_cached_pairs"] = cached_pairs
+        timings["rerank_fallbacks"] = fallbacks
+        return output
+
+    def stats(self):
+        return {"model": self.model_name, "loaded": self.model is not None, "pair_ms": self.pair_ms,
+                "pair_cache": self.pair_scores.stats()}
+
+
+def _passage_key(hit):
+    chunk = hit.get("best_chunk")
+    return (hit["id"], chunk["chunk_index"] if chunk else None)
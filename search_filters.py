@@ -0,0 +1,182 @@
+"""Metadata filters shared by ingest, the vector backends and the lexical index.
+
+Ingest stores these typed fields on every vector:
+
+    channel_title    str
+    published_ts     int, publishedAt as Unix seconds (Chroma compares numbers only)
+    duration         int seconds
+    viewCount        int
+    defaultLanguage  str
+
+A filter is a plain dict, e.g. ``{"channel": ["sundas khalid"], "min_views": 1000,
+"published_after": "2025-01-01"}``. ``to_chroma_where`` turns it into a Chroma
+``where`` clause and ``filter_mask`` into a boolean row mask for in-process
+indexes, so the filter is applied inside the index query instead of afterwards.
+"""
+import json
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+METADATA_CSV = "Master_Task1_withTranscriptFlag.csv"
+STRING_FIELDS = ("channel_title", "defaultLanguage")
+NUMERIC_FIELDS = ("published_ts", "duration", "viewCount")
+FILTER_FIELDS = STRING_FIELDS + NUMERIC_FIELDS
+RAW_COLUMNS = ["id", "channel_title", "publishedAt", "duration", "viewCount", "defaultLanguage"]
+
+# Filter key -> (metadata field, operator)
+FILTER_CONDITIONS = {
+    "channel": ("channel_title", "$in"),
+    "language": ("defaultLanguage", "$in"),
+    "published_after": ("published_ts", "$gte"),
+    "published_before": ("published_ts", "$lte"),
+    "min_duration": ("duration", "$gte"),
+    "max_duration": ("duration", "$lte"),
+    "min_views": ("viewCount", "$gte"),
+}
+
+_ISO_DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$")
+
+
+def parse_duration(value):
+    """Seconds from an int, a numeric string or an ISO 8601 duration like PT1H2M3S."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    match = _ISO_DURATION.match(text)
+    if not match:
+        return None
+    days, hours, minutes, seconds = (float(part) if part else 0.0 for part in match.groups())
+    return int(days * 86400 + hours * 3600 + minutes * 60 + seconds)
+
+
+def parse_timestamp(value):
+    """Unix seconds from an ISO date/datetime string, a datetime or a number."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    if not isinstance(value, datetime):
+        text = str(value).strip()
+        if not text:
+            return None
+        value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def typed_metadata(df):
+    """Typed filter columns for a frame holding the raw YouTube API columns, indexed by id."""
+    out = pd.DataFrame(index=df["id"].astype(str))
+    for field in STRING_FIELDS:
+        values = df[field] if field in df else pd.Series([None] * len(df))
+        out[field] = [v.strip().lower() if isinstance(v, str) and v.strip() else None for v in values]
+    published = df["publishedAt"] if "publishedAt" in df else pd.Series([None] * len(df))
+    out["published_ts"] = pd.array([parse_timestamp(v) for v in published], dtype="Int64")
+    durations = df["duration"] if "duration" in df else pd.Series([None] * len(df))
+    out["duration"] = pd.array([parse_duration(v) for v in durations], dtype="Int64")
+    views = pd.to_numeric(df["viewCount"], errors="coerce") if "viewCount" in df else pd.Series([None] * len(df))
+    out["viewCount"] = pd.array([None if pd.isna(v) else int(v) for v in views], dtype="Int64")
+    return out[~out.index.duplicated(keep="last")]
+
+
+def metadata_records(typed):
+    """{video id: filter fields} as Chroma-safe dicts (missing values omitted)."""
+    records = {}
+    for video_id, row in zip(typed.index, typed.to_dict(orient="records")):
+        records[video_id] = {
+            field: value if field in STRING_FIELDS else int(value)
+            for field, value in row.items()
+            if value is not None and not pd.isna(value)
+        }
+    return records
+
+
+def load_video_metadata(path=METADATA_CSV):
+    """Filter metadata for every video in the metadata CSV, keyed by id."""
+    return metadata_records(typed_metadata(pd.read_csv(path, usecols=RAW_COLUMNS, dtype={"id": str})))
+
+
+def metadata_record(video_metadata, video_id):
+    """Filter fields for one video, or {} when unknown."""
+    if not video_metadata:
+        return {}
+    return dict(video_metadata.get(video_id, {}))
+
+
+def normalize_filters(filters):
+    """Validate a filter dict and return a list of (field, operator, value) conditions."""
+    conditions = []
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if key not in FILTER_CONDITIONS:
+            raise ValueError(f"Unknown filter {key!r}; expected one of {sorted(FILTER_CONDITIONS)}")
+        field, op = FILTER_CONDITIONS[key]
+        if op == "$in":
+            values = [value] if isinstance(value, str) else list(value)
+            values = [str(v).strip().lower() for v in values]
+            if values:
+                conditions.append((field, op, values))
+        elif field == "published_ts":
+            ts = parse_timestamp(value)
+            if ts is not None:
+                conditions.append((field, op, ts))
+        else:
+            conditions.append((field, op, int(value)))
+    return conditions
+
+
+def filters_key(filters):
+    """Stable, hashable form of a filter dict (for cache keys); None when empty."""
+    conditions = normalize_filters(filters)
+    return json.dumps(conditions, sort_keys=True) if conditions else None
+
+
+def to_chroma_where(filters):
+    """Chroma ``where`` clause for a filter dict, or None when there is nothing to filter."""
+    clauses = [{field: {op: value}} for field, op, value in normalize_filters(filters)]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def metadata_columns(metadatas):
+    """Column arrays of the filter fields (NaN / None where missing) for ``filter_mask``."""
+    columns = {}
+    for field in STRING_FIELDS:
+        columns[field] = np.array([(m or {}).get(field) for m in metadatas], dtype=object)
+    for field in NUMERIC_FIELDS:
+        values = [(m or {}).get(field) for m in metadatas]
+        columns[field] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return columns
+
+
+def filter_mask(filters, columns):
+    """Boolean mask of rows passing every condition; None when there are no conditions.
+
+    Rows missing a filtered field never pass, matching Chroma's behaviour.
+    """
+    conditions = normalize_filters(filters)
+    if not conditions:
+        return None
+    n = len(next(iter(columns.values())))
+    mask = np.ones(n, dtype=bool)
+    for field, op, value in conditions:
+        column = columns[field]
+        if op == "$in":
+            mask &= np.isin(column, np.array(value, dtype=object))
+        elif op == "$gte":
+            mask &= column >= value  # NaN compares False
+        else:
+            mask &= column <= value
+    return mask
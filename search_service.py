@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_encoder import MicroBatchSearcher, SearcherClosed, BATCH_WINDOW_MS, MAX_BATCH_SIZE
+from Search_Query_main import search_youtube_videos_batch, search_many, search_page, cached_search, warm_up
+
+logger = logging.getLogger(__name__)
+
+# Threads for encoding, index queries and metadata lookups; the event loop never runs them
+SEARCH_WORKERS = int(os.getenv("QUERYTUBE_SEARCH_WORKERS", "4"))
+# Queries per encode/index round trip when streaming a batch request
+BATCH_CHUNK_SIZE = int(os.getenv("QUERYTUBE_BATCH_CHUNK_SIZE", "256"))
+
+
+class ServiceNotReady(RuntimeError):
+    pass
+
+
+class SearchService:
+    """Owns the search executor, the micro-batcher and startup warm-up.
+
+    ``start()`` returns immediately and warms up in the background, so the
+    process answers /healthz while the model loads; /readyz and searches wait
+    for the warm-up to finish.
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS, batch_window_ms=BATCH_WINDOW_MS,
+                 max_batch_size=MAX_BATCH_SIZE):
+        self.workers = workers
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+        self.executor = None
+        self.searcher = None
+        self.warmup_seconds = None
+        self.error = None
+        self._warmup = None
+
+    @property
+    def ready(self):
+        return self._warmup is not None and self._warmup.done() and self.error is None
+
+    async def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search")
+        # Concurrent /search calls are folded into one encode + one index query
+        self.searcher = MicroBatchSearcher(
+            search_youtube_videos_batch,
+            batch_window_ms=self.batch_window_ms,
+            max_batch_size=self.max_batch_size,
+            executor=self.executor,
+        )
+        self._warmup = asyncio.get_running_loop().create_task(self._warm_up())
+
+    async def _warm_up(self):
+        try:
+            self.warmup_seconds = await asyncio.get_running_loop().run_in_executor(self.executor, warm_up)
+            logger.info(f"✅ Search warm-up finished in {self.warmup_seconds:.1f}s")
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Search warm-up failed: {self.error}")
+
+    async def wait_ready(self):
+        if self._warmup is None:
+            raise ServiceNotReady("Search service not started")
+        await asyncio.shield(self._warmup)
+        if self.error is not None:
+            raise ServiceNotReady(f"Search warm-up failed: {self.error}")
+
+    async def stop(self):
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+        if self.searcher is not None:
+            await self.searcher.close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def search(self, query_text, top_n=5, timings=None, **options):
+        await self.wait_ready()
+        start = time.perf_counter()
+        # Repeat queries are answered from the cache without waiting for a batch
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(cached_search, query_text, top_n, **options)
+        )
+        if results is not None:
+            if timings is not None:
+                timings["cache_hit"] = True
+                timings["cache_ms"] = (time.perf_counter() - start) * 1000
+            return results
+        try:
+            return await self.searcher.search(query_text, top_n=top_n, timings=timings, **options)
+        except SearcherClosed as e:
+            raise ServiceNotReady(str(e)) from e  # shutting down
+
+    async def search_page(self, query_text=None, page_size=10, cursor=None, **options):
+        """One page of a paginated search (see Search_Query_main.search_page), on the search executor.
+
+        Pages bypass the micro-batcher: a first page keeps its own candidate
+        list, and later pages are served from the cursor's state.
+        """
+        await self.wait_ready()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(search_page, query_text, page_size, cursor, **options)
+        )
+
+    async def search_stream(self, queries, chunk_size=BATCH_CHUNK_SIZE, **options):
+        """Yield (offset, chunk, hit lists or exception) for ``queries``, one chunk at a time.
+
+        Each chunk is a single ``search_many`` call on the search executor, so
+        results can be streamed out while later chunks are still pending.
+        """
+        await self.wait_ready()
+        loop = asyncio.get_running_loop()
+        for offset in range(0, len(queries), chunk_size):
+            chunk = queries[offset:offset + chunk_size]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, functools.partial(search_many, chunk, **options)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Batch chunk at {offset} failed: {e}")
+                results = e
+            yield offset, chunk, results
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+            "workers": self.workers,
+        }
+
+    def stats(self):
+        return self.searcher.stats() if self.searcher is not None else {}
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules live at the repository root (and benchmarks/), not in a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
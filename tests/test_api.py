@@ -0,0 +1,28 @@
+"""Request validation in the search API (no model or index is loaded)."""
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture
+def client():
+    # Without the context manager the lifespan (warm-up) never runs
+    return TestClient(api.app)
+
+
+def test_top_k_is_capped(client):
+    response = client.post("/search", json={"query": "cats", "top_k": api.MAX_TOP_K + 1})
+    assert response.status_code == 400
+    assert str(api.MAX_TOP_K) in response.json()["detail"]
+
+
+def test_top_k_must_be_positive(client):
+    assert client.post("/search", json={"query": "cats", "top_k": 0}).status_code == 400
+
+
+def test_batch_top_k_is_capped(client):
+    response = client.post("/search/batch", json={"queries": [{"query": "cats", "top_k": 1},
+                                                             {"query": "dogs", "top_k": api.MAX_TOP_K + 1}]})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("queries[1]")
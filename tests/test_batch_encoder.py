@@ -0,0 +1,93 @@
+"""Micro-batching: grouping by options and concurrent dispatch of the groups."""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_encoder import MicroBatchSearcher, SearcherClosed
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_same_options_share_one_batch():
+    calls = []
+
+    def search_batch(queries, top_ns, mode="vector", timings=None):
+        if timings is not None:
+            timings["encode_ms"] = 1.0
+        calls.append((mode, list(queries)))
+        return [[{"id": q, "top_n": n}] for q, n in zip(queries, top_ns)]
+
+    async def main():
+        searcher = MicroBatchSearcher(search_batch, batch_window_ms=50)
+        timings = {}
+        results = await asyncio.gather(
+            searcher.search("a", 1, timings=timings), searcher.search("b", 2),
+            searcher.search("c", 3, mode="lexical"))
+        await searcher.close()
+        return results, timings
+
+    results, timings = run(main())
+    assert results == [[{"id": "a", "top_n": 1}], [{"id": "b", "top_n": 2}], [{"id": "c", "top_n": 3}]]
+    assert sorted(calls) == [("lexical", ["c"]), ("vector", ["a", "b"])]
+    assert timings["encode_ms"] == 1.0 and "queue_ms" in timings
+
+
+def test_option_groups_run_concurrently():
+    # Each group blocks until the other has started: sequential dispatch would time out
+    barrier = threading.Barrier(2, timeout=5)
+
+    def search_batch(queries, top_ns, mode="vector"):
+        barrier.wait()
+        return [[mode] for _ in queries]
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            searcher = MicroBatchSearcher(search_batch, batch_window_ms=50, executor=executor)
+            results = await asyncio.gather(searcher.search("a", mode="vector"),
+                                           searcher.search("b", mode="lexical"))
+            await searcher.close()
+        return results
+
+    assert run(main()) == [["vector"], ["lexical"]]
+
+
+def test_group_failure_only_fails_its_callers():
+    def search_batch(queries, top_ns, mode="vector"):
+        if mode == "lexical":
+            raise FileNotFoundError("no lexical index")
+        return [["ok"] for _ in queries]
+
+    async def main():
+        searcher = MicroBatchSearcher(search_batch, batch_window_ms=50)
+        results = await asyncio.gather(searcher.search("a"), searcher.search("b", mode="lexical"),
+                                       return_exceptions=True)
+        await searcher.close()
+        return results
+
+    ok, failed = run(main())
+    assert ok == ["ok"]
+    assert isinstance(failed, FileNotFoundError)
+
+
+def test_close_fails_in_flight_and_queued_requests():
+    started, release = threading.Event(), threading.Event()
+
+    def search_batch(queries, top_ns):
+        started.set()
+        release.wait(5)
+        return [[] for _ in queries]
+
+    async def main():
+        searcher = MicroBatchSearcher(search_batch, batch_window_ms=1)
+        in_flight = asyncio.ensure_future(searcher.search("a"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        queued = asyncio.ensure_future(searcher.search("b"))  # the worker is busy with "a"
+        await asyncio.sleep(0.01)
+        await searcher.close()
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(in_flight, queued, return_exceptions=True), 1)
+
+    results = run(main())
+    assert all(isinstance(result, SearcherClosed) for result in results)
@@ -0,0 +1,45 @@
+"""Transcript chunking for ingest --mode chunks."""
+import pandas as pd
+
+from chunking import build_chunks, chunk_id
+from ingest import content_hashes, prepare_batch
+
+
+def videos(**columns):
+    return pd.DataFrame({"id": ["a", "b"], "title": ["first video", "second video"], **columns})
+
+
+def test_transcript_is_split_into_overlapping_chunks():
+    transcript = " ".join(f"w{i}" for i in range(25))
+    chunks = build_chunks(videos(transcript=[transcript, "short one"]), max_tokens=10, overlap=2)
+    a = chunks[chunks["parent_id"] == "a"]
+    assert a["chunk_id"].tolist() == [chunk_id("a", i) for i in range(3)]
+    assert a["text"].iloc[0] == "first video " + " ".join(f"w{i}" for i in range(10))
+    assert a["text"].iloc[1].split()[2:4] == ["w8", "w9"]  # shared with the first chunk
+    assert chunks[chunks["parent_id"] == "b"]["text"].tolist() == ["second video short one"]
+
+
+def test_empty_transcript_gets_one_chunk_from_title_and_description():
+    df = videos(transcript=["", None], description=["all about a", ""])
+    chunks = build_chunks(df)
+    assert chunks["chunk_id"].tolist() == [chunk_id("a", 0), chunk_id("b", 0)]
+    assert chunks["text"].tolist() == ["first video all about a", "second video"]
+    assert (chunks["char_start"] == 0).all() and (chunks["char_end"] == 0).all()
+
+    # Without a description column the title alone is embedded
+    assert build_chunks(videos(transcript=["   ", ""]))["text"].tolist() == ["first video", "second video"]
+
+
+def test_every_video_is_indexed_in_chunks_mode():
+    df = videos(transcript=["some words here", ""], description=["", "only a description"])
+    ids, texts, metadatas = prepare_batch(df, "chunks")
+    assert {m["parent_id"] for m in metadatas} == {"a", "b"}
+    assert texts[ids.index(chunk_id("b", 0))] == "second video only a description"
+
+
+def test_description_change_reembeds_only_videos_without_transcript():
+    before = videos(transcript=["spoken text", ""], description=["old", "old"])
+    after = videos(transcript=["spoken text", ""], description=["new", "new"])
+    old, new = content_hashes(before, "chunks", "m"), content_hashes(after, "chunks", "m")
+    assert old[0] == new[0] and old[1] != new[1]
+    assert content_hashes(before, "video", "m") == content_hashes(after, "video", "m")
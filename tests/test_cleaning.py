@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_cleaning import reference_metadata, reference_transcripts
+from cleaning import (clean_metadata, clean_text, clean_text_series, clean_transcript, clean_transcript_series,
+                      clean_transcripts, valid_ids)
+
+# Every character str.isspace() accepts, which is what the reference's \s matches
+UNICODE_SPACES = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0        　"
+
+TEXT_VALUES = [
+    np.nan, None, "", "   ", "nan", 42, 3.5,
+    "Hello, <b>World</b>!! #data @user | [x] {y}",
+    "Crème Brûlée STRASSE ß İstanbul ÉCOLE",
+    "snake_case_words, and 1,000 numbers",
+    "emoji 🚀🔥 and ð mojibake",
+    f"tabs{UNICODE_SPACES}and{UNICODE_SPACES}spaces",
+    "​zero width​",
+]
+TRANSCRIPT_VALUES = TEXT_VALUES + [
+    "[Music] hello [Applause] world [unclosed",
+    "at 0:05 and 12:34:56 we start; 1:2 and 123:45 stay",
+    "a1:23 b 9:99:99x 10:00, 7:30.",
+    "time12:30 12:30pm (4:05) 4:05:",
+    "line one\nline two\r\nDon't STOP?! ok.",
+    "ünïcödé wörds stripped; keep's apostrophes",
+]
+
+
+def _series(values, dtype):
+    """Object values as read by pandas, or the pandas string dtype clean_csv's dtype=str gives."""
+    values = pd.Series(values, dtype=object)
+    return values if dtype == object else values.astype(dtype)
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_clean_text_series_matches_notebook(dtype):
+    values = _series(TEXT_VALUES, dtype)
+    expected = values.astype(str).apply(clean_text)
+    pd.testing.assert_series_equal(clean_text_series(values), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_clean_transcript_series_matches_notebook(dtype):
+    values = _series(TRANSCRIPT_VALUES, dtype)
+    expected = values.astype(str).apply(clean_transcript)
+    pd.testing.assert_series_equal(clean_transcript_series(values), expected, check_dtype=False)
+
+
+def test_timestamps_and_tags_are_stripped_like_the_notebook():
+    cleaned = clean_transcript_series(pd.Series(["[Music] at 0:05 and 12:34:56 go", "a1:23 123:45"]))
+    assert cleaned.tolist() == ["at and go", "a1 23 123 45"]
+    assert cleaned.tolist() == [clean_transcript(v) for v in ["[Music] at 0:05 and 12:34:56 go", "a1:23 123:45"]]
+
+
+def test_unicode_whitespace_collapses_to_single_spaces():
+    value = f"{UNICODE_SPACES}a{UNICODE_SPACES}b{UNICODE_SPACES}"
+    assert clean_text_series(pd.Series([value])).tolist() == ["a b"] == [clean_text(value)]
+    assert clean_transcript_series(pd.Series([value])).tolist() == ["a b"] == [clean_transcript(value)]
+
+
+def test_missing_values_become_empty_strings_like_astype_str_apply():
+    values = pd.Series([np.nan, None, "x"], dtype=object)
+    # astype(str) turns missing values into the text "nan" / "None" before the reference sees them
+    assert clean_text_series(values).tolist() == values.astype(str).apply(clean_text).tolist()
+
+
+def _transcript_frame():
+    words = "one two three four five six seven eight nine ten"
+    return pd.DataFrame({
+        "video_id": ["ok1", "two words", np.nan, 123, "", " padded ", "ok2", "ok3", "ok4"],
+        "transcript": [words, words, words, words, words, words,
+                       "[Music] too short 0:01", np.nan, f"{words} 1:23 [Applause]"],
+    }, dtype=object)
+
+
+def test_clean_transcripts_matches_notebook_including_id_filter():
+    df = _transcript_frame()
+    got = clean_transcripts(df, id_column="video_id")
+    expected = reference_transcripts(df, "video_id")
+    pd.testing.assert_frame_equal(got, expected)
+    assert got["video_id"].tolist() == ["ok1", " padded ", "ok4"]
+
+
+def test_valid_ids_without_strings():
+    assert not valid_ids(pd.Series([1, 2, 3])).any()
+
+
+def test_clean_metadata_matches_notebook():
+    df = pd.DataFrame({
+        "id": ["a", "a", "b", "c", "d", "e", "f"],
+        "title": ["Title!", "title", "B", "C", "D", "E", "F"],
+        "description": ["Desc <i>one</i>", "desc one", np.nan, "nan", "   ", "NaN", "ok　desc"],
+        "channel_title": ["Chan", "Chan", "Chan", "Chan", "Chan", "Chan", "Chan"],
+        "viewCount": ["1", "2", "3", "4", "5", "6", "7"],
+    }, dtype=object)
+    got = clean_metadata(df)
+    pd.testing.assert_frame_equal(got, reference_metadata(df))
+    assert got["id"].tolist() == ["a", "f"]
+    assert got["description"].tolist() == ["desc i one i", "ok desc"]
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pytest
+
+from encoder import (FP32_MIN_COSINE, INT8_MIN_COSINE, MODEL_NAME, ONNX_DIR, SAMPLE_QUERIES, OnnxEncoder,
+                     check_consistency, compare_embeddings, load_encoder)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPORT_DIR = os.getenv("QUERYTUBE_ONNX_DIR", os.path.join(ROOT, ONNX_DIR))
+
+
+class FixedEncoder:
+    def __init__(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, texts):
+        return self.vectors[:len(texts)]
+
+
+def test_compare_embeddings_reports_worst_row():
+    reference = np.eye(3, dtype=np.float32)
+    candidate = reference.copy()
+    candidate[2] = [0.0, 1.0, 1.0]  # 45 degrees off
+    report = compare_embeddings(reference, candidate)
+    assert report["min_cosine"] == pytest.approx(np.sqrt(0.5), abs=1e-6)
+    assert report["max_abs_diff"] == pytest.approx(1.0)
+
+
+def test_check_consistency_applies_tolerance():
+    rng = np.random.default_rng(0)
+    reference = rng.normal(size=(4, 8))
+    close = reference + rng.normal(scale=1e-3, size=reference.shape)
+    assert check_consistency(FixedEncoder(reference), FixedEncoder(close), ["q"] * 4, INT8_MIN_COSINE)[0]
+    assert not check_consistency(FixedEncoder(reference), FixedEncoder(-reference), ["q"] * 4, INT8_MIN_COSINE)[0]
+
+
+@pytest.fixture(scope="module")
+def reference_encoder():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("tokenizers")
+    pytest.importorskip("sentence_transformers")
+    for name in ("model.onnx", "model_int8.onnx", "encoder_config.json", "tokenizer.json"):
+        if not os.path.exists(os.path.join(EXPORT_DIR, name)):
+            pytest.skip(f"no exported encoder in {EXPORT_DIR} (run: python encoder.py export)")
+    return load_encoder("torch", MODEL_NAME)
+
+
+@pytest.mark.parametrize("quantized, tolerance", [(False, FP32_MIN_COSINE), (True, INT8_MIN_COSINE)],
+                         ids=["fp32", "int8"])
+def test_onnx_matches_reference_model(reference_encoder, quantized, tolerance):
+    candidate = OnnxEncoder(EXPORT_DIR, quantized=quantized)
+    # Uneven lengths exercise padding, length-sorted batching and the single-string path
+    texts = SAMPLE_QUERIES + ["a", "x " * 300]
+    passed, report = check_consistency(reference_encoder, candidate, texts, min_cosine=tolerance)
+    assert passed, report
+    single = candidate.encode(texts[0])
+    assert single.shape == (candidate.get_sentence_embedding_dimension(),)
+    assert compare_embeddings(reference_encoder.encode([texts[0]]), single[None])["min_cosine"] >= tolerance
@@ -0,0 +1,94 @@
+"""Incremental ingest against an in-memory stand-in for the Chroma client and the model."""
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+from query_cache import collection_version_file
+
+MAX_BATCH = 5
+
+
+class FakeCollection:
+    def __init__(self):
+        self.vectors = {}
+        self.deletes = []
+
+    def _check(self, ids):
+        if len(ids) > MAX_BATCH:
+            raise ValueError(f"batch of {len(ids)} exceeds the max batch size {MAX_BATCH}")
+
+    def upsert(self, ids, embeddings, metadatas):
+        self._check(ids)
+        self.vectors.update(zip(ids, metadatas))
+
+    def update(self, ids, metadatas):
+        self._check(ids)
+        self.vectors.update(zip(ids, metadatas))
+
+    def delete(self, ids):
+        self._check(ids)
+        self.deletes.append(list(ids))
+        for vid in ids:
+            self.vectors.pop(vid, None)
+
+
+class FakeModel:
+    tokenizer = None
+
+    def __init__(self, name):
+        pass
+
+    def encode(self, texts, batch_size=None):
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection()
+    client = types.SimpleNamespace(get_or_create_collection=lambda name: collection,
+                                   get_max_batch_size=lambda: MAX_BATCH)
+    monkeypatch.setitem(sys.modules, "chromadb", types.SimpleNamespace(PersistentClient=lambda path: client))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=FakeModel))
+    return collection
+
+
+def run(tmp_path, transcripts):
+    source = tmp_path / "videos.parquet"
+    pd.DataFrame({"id": [f"v{i}" for i in range(len(transcripts))], "title": "t",
+                  "transcript": transcripts}).to_parquet(source)
+    chroma = tmp_path / "store"
+    return ingest.ingest(str(source), mode="chunks", chroma_path=str(chroma),
+                         checkpoint_file=str(chroma / "checkpoint.json"),
+                         manifest_file=str(chroma / "manifest.sqlite"), metadata_csv=None,
+                         metadata_db=str(chroma / "meta.sqlite"))
+
+
+def long_text(word, n=450):
+    return " ".join(f"{word}{i}" for i in range(n))
+
+
+def test_reingest_deletes_stale_chunks_in_bounded_calls(tmp_path, collection):
+    run(tmp_path, [long_text("a"), long_text("b")])
+    assert len(collection.vectors) == 6  # three chunks per video
+    collection.deletes.clear()
+
+    # Both videos change: six stale chunk ids, more than one call may carry
+    stats = run(tmp_path, [long_text("c"), long_text("d")])
+    assert stats["changed"] == 2
+    assert sum(len(ids) for ids in collection.deletes) == 6
+    assert max(len(ids) for ids in collection.deletes) <= MAX_BATCH
+    assert len(collection.vectors) == 6
+
+
+def test_version_file_follows_the_chroma_path(tmp_path, collection):
+    version_file = collection_version_file(str(tmp_path / "store"))
+    run(tmp_path, ["some words"])
+    first = os.path.getmtime(version_file)
+    os.utime(version_file, (first - 10, first - 10))
+    run(tmp_path, ["other words"])
+    assert os.path.getmtime(version_file) > first - 10
@@ -0,0 +1,62 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from merge_datasets import merge, open_merged, read_metadata
+
+METADATA = """Unnamed: 0,id,title,channel_id,viewCount
+0,a,first a,c1,10
+1,b,first b,c1,20
+2,a,second a,c2,30
+3,c,only c,c2,40
+4,b,second b,c1,50
+5,d,only d,c2,60
+"""
+TRANSCRIPTS = """id,transcript
+a,hello world
+d,"multi
+line"
+c,
+"""
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_read_metadata_keeps_first_row_per_id_in_file_order(tmp_path):
+    table = read_metadata(_write(tmp_path, "meta.csv", METADATA))
+    assert table["id"].to_pylist() == ["a", "b", "c", "d"]
+    assert table["title"].to_pylist() == ["first a", "first b", "only c", "only d"]
+    assert table["viewCount"].to_pylist() == [10, 20, 40, 60]
+
+
+def test_merge_dedupes_dataset_and_keeps_flag_csv_intact(tmp_path):
+    meta = _write(tmp_path, "meta.csv", METADATA)
+    transcripts = _write(tmp_path, "transcripts.csv", TRANSCRIPTS)
+    out, flag_out = str(tmp_path / "merged"), str(tmp_path / "flagged.csv")
+
+    rows, flagged = merge(meta, transcripts, out, flag_out)
+
+    # "c" is listed with an empty transcript: flagged, as the notebook did, but not merged
+    assert (rows, flagged) == (2, 3)
+    merged = open_merged(out).to_table().to_pandas().sort_values("id")
+    assert merged["id"].tolist() == ["a", "d"]
+    assert merged["title"].tolist() == ["first a", "only d"]
+    assert merged["transcript"].tolist() == ["hello world", "multi\nline"]
+
+    original = pd.read_csv(meta)
+    flags = pd.read_csv(flag_out)
+    # Every original row and column, duplicates and the pandas index column included
+    assert list(flags.columns) == list(original.columns) + ["has_transcript"]
+    pd.testing.assert_frame_equal(flags[original.columns], original)
+    assert flags["has_transcript"].tolist() == [True, False, True, True, False, True]
+
+
+def test_merge_without_partitioning_writes_flat_dataset(tmp_path):
+    meta = _write(tmp_path, "meta.csv", METADATA)
+    transcripts = _write(tmp_path, "transcripts.csv", TRANSCRIPTS)
+    out = str(tmp_path / "merged")
+    merge(meta, transcripts, out, None, partition_by=None)
+    assert pq.read_table(out).num_rows == 2
@@ -0,0 +1,39 @@
+"""Display-field lookups in the SQLite metadata store."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from metadata_store import MetadataStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetadataStore(str(tmp_path / "meta.sqlite"))
+    store.upsert_frame(pd.DataFrame({
+        "id": [f"v{i}" for i in range(1200)],
+        "title": [f"title {i}" for i in range(1200)],
+        "transcript": [f"transcript of video {i}" for i in range(1200)],
+    }))
+    yield store
+    store.close()
+
+
+def test_fetch_fields_and_snippets(store):
+    records = store.fetch(["v1", "v2", "missing"], ("title",), snippet_chars=5, snippet_starts={"v2": 14})
+    assert records == {"v1": {"title": "title 1", "snippet": "trans"},
+                       "v2": {"title": "title 2", "snippet": "video"}}
+
+
+def test_fetch_more_ids_than_sqlite_variables(store):
+    # Old SQLite builds allow only 999 bound variables per statement
+    store._conn().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    ids = [f"v{i}" for i in range(1200)]
+    records = store.fetch(ids, ("title",), snippet_chars=10, snippet_starts={"v1199": 14})
+    assert len(records) == 1200
+    assert records["v1199"] == {"title": "title 1199", "snippet": "video 1199"}
+
+
+def test_unknown_field_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.fetch(["v1"], ("nope",))
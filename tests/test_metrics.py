@@ -0,0 +1,176 @@
+"""Exposition format of the metrics registry and the per-request cost of the API's instrumentation."""
+import asyncio
+import re
+import time
+
+import numpy as np
+import pytest
+
+import api
+from metrics import Histogram, MetricsRegistry
+
+# Per-request budgets for the hot-path instrumentation, in microseconds
+MAX_MIDDLEWARE_US = 50.0
+MAX_RECORD_US = 30.0
+REQUESTS = 5000
+ROUNDS = 5
+SAMPLE_TIMINGS = {"encode_ms": 4.1, "vector_ms": 1.3, "hydrate_ms": 0.4, "total_ms": 6.0,
+                  "queue_ms": 2.2, "request_ms": 8.5}
+
+_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_LABEL_VALUE = r'"(?:[^"\\\n]|\\[\\"n])*"'
+_SAMPLE = re.compile(rf"^({_NAME})(?:\{{((?:{_NAME}={_LABEL_VALUE})(?:,{_NAME}={_LABEL_VALUE})*)\}})? "
+                     r"(-?[0-9.e+-]+|[+-]Inf|NaN)$")
+_LABEL = re.compile(rf"({_NAME})=({_LABEL_VALUE})")
+
+
+def _unescape(value):
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value[1:-1])
+
+
+def parse_exposition(text):
+    """Strict-enough parser of the text format: {family: {"type", "help", "samples": [(name, labels, value)]}}."""
+    assert text.endswith("\n")
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, _, help_text = line[7:].partition(" ")
+            assert name not in families, f"family {name} rendered twice"
+            current = families[name] = {"help": help_text, "type": None, "samples": []}
+        elif line.startswith("# TYPE "):
+            name, _, kind = line[7:].partition(" ")
+            assert current is families.get(name) and kind in ("counter", "gauge", "histogram")
+            current["type"] = kind
+        else:
+            match = _SAMPLE.match(line)
+            assert match, f"malformed sample line: {line!r}"
+            name, labels, value = match.groups()
+            assert current is not None and current["type"], f"sample before HELP/TYPE: {line!r}"
+            family = next(n for n in families if name in (n, f"{n}_bucket", f"{n}_sum", f"{n}_count"))
+            assert families[family] is current, f"{name} outside its family"
+            parsed = {k: _unescape(v) for k, v in _LABEL.findall(labels or "")}
+            current["samples"].append((name, parsed, float(value)))
+    return families
+
+
+def check_histogram(family, name):
+    """Buckets ascend by le, counts are cumulative and the +Inf bucket equals _count."""
+    series = {}
+    for sample, labels, value in family["samples"]:
+        key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+        series.setdefault(key, {"buckets": []})
+        if sample == f"{name}_bucket":
+            series[key]["buckets"].append((float(labels["le"]), value))
+        else:
+            series[key][sample[len(name) + 1:]] = value
+    for s in series.values():
+        bounds = [b for b, _ in s["buckets"]]
+        counts = [c for _, c in s["buckets"]]
+        assert bounds == sorted(bounds) and bounds[-1] == float("inf")
+        assert counts == sorted(counts), "bucket counts must be cumulative"
+        assert counts[-1] == s["count"]
+    return series
+
+
+def test_render_is_valid_exposition_with_cumulative_buckets():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests", path="/search", status="200").inc(3)
+    registry.gauge("in_flight", "In flight").set(2)
+    latency = registry.histogram("latency_ms", "Latency", buckets=(1, 5, 10), stage="encode")
+    for value in (0.5, 1, 3, 7, 7, 50):
+        latency.observe(value)
+    registry.register("batch_size", "histogram", "Batch size", Histogram((1, 2, 4)))
+    registry.callback("cache_entries", "gauge", "Entries", lambda: {(("cache", "results"),): 4})
+    registry.callback("broken", "gauge", "Raises", lambda: 1 / 0)
+
+    families = parse_exposition(registry.render())
+
+    assert set(families) == {"requests_total", "in_flight", "latency_ms", "batch_size", "cache_entries"}
+    assert families["requests_total"]["samples"] == [("requests_total", {"path": "/search", "status": "200"}, 3)]
+    [encode] = check_histogram(families["latency_ms"], "latency_ms").values()
+    # le is inclusive: 1 falls in le="1", 50 only in +Inf
+    assert encode["buckets"] == [(1, 2), (5, 3), (10, 5), (float("inf"), 6)]
+    assert encode["sum"] == pytest.approx(68.5)
+    [empty] = check_histogram(families["batch_size"], "batch_size").values()
+    assert empty["count"] == 0
+
+
+def test_label_values_and_help_are_escaped():
+    registry = MetricsRegistry()
+    nasty = 'C:\\path "quoted"\nsecond line'
+    registry.counter("errors_total", "Errors\nby type \\ kind", type=nasty).inc()
+    registry.gauge("odd", "Non-finite").set(float("inf"))
+    text = registry.render()
+    assert "# HELP errors_total Errors\\nby type \\\\ kind" in text
+    families = parse_exposition(text)
+    assert families["errors_total"]["samples"][0][1] == {"type": nasty}
+    assert families["odd"]["samples"][0][2] == float("inf")
+
+
+def test_api_metrics_render_is_valid():
+    api.record_search(dict(SAMPLE_TIMINGS))
+    families = parse_exposition(api.metrics.render())
+    check_histogram(families["querytube_search_stage_milliseconds"], "querytube_search_stage_milliseconds")
+
+
+class _Routes:
+    routes = [type("Route", (), {"path": "/search"})()]
+
+
+async def _bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    pass
+
+
+async def _per_call_us(app, scope, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), _receive, _send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def _middleware_overhead_us():
+    """Median over ROUNDS of (instrumented - bare) microseconds per request."""
+    scope = {"type": "http", "path": "/search", "method": "POST", "app": _Routes()}
+    wrapped = api.RequestMetrics(_bare_app)
+    await _per_call_us(wrapped, scope, 1000)  # warm up (creates the metric children)
+    diffs = []
+    for _ in range(ROUNDS):
+        bare = await _per_call_us(_bare_app, scope, REQUESTS)
+        diffs.append(await _per_call_us(wrapped, scope, REQUESTS) - bare)
+    return float(np.median(diffs))
+
+
+def test_request_metrics_middleware_overhead_is_bounded():
+    overhead = asyncio.run(_middleware_overhead_us())
+    assert overhead <= MAX_MIDDLEWARE_US, f"RequestMetrics costs {overhead:.1f} us/request"
+
+
+def test_record_search_overhead_is_bounded():
+    api.record_search(dict(SAMPLE_TIMINGS))
+    per_call = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            api.record_search(dict(SAMPLE_TIMINGS))
+        per_call.append((time.perf_counter() - start) / REQUESTS * 1e6)
+    cost = float(np.median(per_call))
+    assert cost <= MAX_RECORD_US, f"record_search costs {cost:.1f} us/request"
+
+
+def test_request_metrics_counts_requests_and_restores_in_flight():
+    scope = {"type": "http", "path": "/search", "method": "POST", "app": _Routes()}
+    counter = api.metrics.counter("querytube_http_requests_total", "HTTP requests by route and status",
+                                  path="/search", status="200")
+    before, in_flight = counter.value(), api.IN_FLIGHT.value()
+    asyncio.run(_per_call_us(api.RequestMetrics(_bare_app), scope, 10))
+    assert counter.value() == before + 10
+    assert api.IN_FLIGHT.value() == in_flight
@@ -0,0 +1,122 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from proxy_pool import ProxyHealthChecker, ProxyPool, probe_proxy
+
+DEAD = "http://127.0.0.1:9"  # discard port: nothing listens, connections are refused
+
+
+class _StandInProxy(BaseHTTPRequestHandler):
+    """Answers every proxied GET with 204, like the real probe URL."""
+
+    def do_GET(self):
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def live_proxy():
+    server = HTTPServer(("127.0.0.1", 0), _StandInProxy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+class ScriptedProbe:
+    """Probe stand-in: proxy -> (ok, latency), changeable between rounds."""
+
+    def __init__(self, outcomes):
+        self.outcomes = dict(outcomes)
+
+    def __call__(self, proxy, url, timeout):
+        return self.outcomes[proxy]
+
+
+def _drain(pool, now=None):
+    """Proxies handed out until the pool has nothing ready."""
+    picked = []
+    while True:
+        proxy, _ = pool.acquire(now)
+        if proxy is None:
+            return picked
+        picked.append(proxy)
+
+
+def test_probe_through_stand_in_proxy(live_proxy):
+    assert probe_proxy(live_proxy, "http://probe.invalid/generate_204", timeout=2)[0]
+    assert not probe_proxy(DEAD, "http://probe.invalid/generate_204", timeout=2)[0]
+
+
+def test_dead_proxy_is_never_handed_out(live_proxy):
+    pool = ProxyPool([live_proxy, DEAD], rate=100.0, burst=100, dead_after=1)
+    checker = ProxyHealthChecker(pool, [live_proxy, DEAD], url="http://probe.invalid/generate_204", timeout=2)
+    outcomes = checker.check_now()
+    assert outcomes[live_proxy][0] and not outcomes[DEAD][0]
+    assert {pool.acquire()[0] for _ in range(20)} == {live_proxy}
+    stats = pool.stats()
+    assert (stats["dead"], stats["working"]) == (1, 1) and stats["avg_latency"] is not None
+
+
+def test_proxy_dies_only_after_dead_after_failures():
+    probe = ScriptedProbe({"a": (False, None), "b": (True, 0.1)})
+    pool = ProxyPool(["a", "b"], rate=100.0, burst=100, dead_after=2)
+    checker = ProxyHealthChecker(pool, ["a", "b"], probe=probe)
+    checker.check_now()
+    assert pool.stats()["dead"] == 0
+    checker.check_now()
+    assert pool.stats()["dead"] == 1
+    assert {pool.acquire()[0] for _ in range(10)} == {"b"}
+
+
+def test_dead_proxy_is_revived_by_a_later_health_check():
+    probe = ScriptedProbe({"a": (False, None), "b": (True, 0.1)})
+    pool = ProxyPool(["a", "b"], rate=100.0, burst=100)
+    checker = ProxyHealthChecker(pool, ["a", "b"], probe=probe)
+    checker.check_now()
+    assert {pool.acquire()[0] for _ in range(10)} == {"b"}
+
+    woken = threading.Event()
+
+    def waiter():
+        pool.wait_for_change(timeout=5)
+        woken.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    probe.outcomes["a"] = (True, 0.1)
+    checker.check_now()
+    thread.join(timeout=5)
+    assert woken.is_set(), "a revival must wake waiting workers"
+    assert pool.stats()["dead"] == 0
+    assert "a" in {pool.acquire()[0] for _ in range(10)}
+
+
+def test_ready_proxies_come_out_best_score_first():
+    # One token each and a negligible refill: every proxy is handed out once per round
+    proxies = ["slow", "fast", "medium", "flaky"]
+    pool = ProxyPool(proxies, rate=1e-6, burst=1, cooldown=0.0)
+    for proxy, latency in (("slow", 3.0), ("fast", 0.0), ("medium", 1.0), ("flaky", 0.0)):
+        pool.record_probe(proxy, True, latency)
+    pool.record_result("flaky", False)  # success rate 1.0 -> 0.7
+
+    # Scores: fast 1.0, flaky 0.7, medium 0.5, slow 0.25
+    assert _drain(pool) == ["fast", "flaky", "medium", "slow"]
+    proxy, wait = pool.acquire()
+    assert proxy is None and wait > 1000  # all waiting on their token buckets
+
+
+def test_all_dead_pool_resets_instead_of_stalling():
+    pool = ProxyPool(["a", "b"], rate=100.0, burst=100)
+    for proxy in ("a", "b"):
+        pool.record_probe(proxy, False)
+    assert pool.acquire() == (None, 0.0)
+    assert pool.stats()["dead"] == 0
+    assert pool.acquire()[0] in ("a", "b")
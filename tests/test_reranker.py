@@ -0,0 +1,90 @@
+"""Cross-encoder reranking budget and pair cache, with a fake model."""
+import time
+
+from query_cache import QueryCache
+from reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by passage length; each predict() sleeps ``pair_ms`` per pair."""
+
+    def __init__(self, pair_ms=0.0):
+        self.pair_ms = pair_ms
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=False):
+        time.sleep(self.pair_ms * len(pairs) / 1000)
+        self.pairs.extend(pairs)
+        return [float(len(passage)) for _, passage in pairs]
+
+
+def make_reranker(pair_ms=0.0, batch_size=4):
+    reranker = CrossEncoderReranker(batch_size=batch_size)
+    reranker.model = FakeCrossEncoder(pair_ms)
+    return reranker
+
+
+def hits_and_passages(n):
+    hits = [{"id": f"v{i}", "score": i} for i in range(n)]
+    # Longer passage = higher score, so the reranked order is the reverse
+    passages = {(f"v{i}", None): "x" * (i + 1) for i in range(n)}
+    return hits, passages
+
+
+def test_rerank_orders_by_score_and_caches_pairs():
+    reranker = make_reranker()
+    hits, passages = hits_and_passages(6)
+    timings = {}
+    [reranked] = reranker.rerank_many(["query"], [hits], passages, budget_ms=1000, timings=timings)
+    assert [hit["id"] for hit in reranked] == [f"v{i}" for i in reversed(range(6))]
+    assert timings["rerank_pairs"] == 6 and timings["rerank_fallbacks"] == 0
+
+    reranker.rerank_many(["Query "], [hits], passages, budget_ms=1000, timings=timings)
+    assert timings["rerank_pairs"] == 0 and timings["rerank_cached_pairs"] == 6
+
+
+def test_warm_up_seeds_the_estimate():
+    reranker = make_reranker(pair_ms=2.0)
+    assert reranker.pair_ms is None
+    assert reranker.warm_up() >= 2.0
+    assert reranker.model.pairs  # the estimate comes from real predict() calls
+
+
+def test_budget_is_per_query():
+    # 8 pairs per query at ~2 ms each: one query fits in 40 ms, the whole micro-batch does not
+    reranker = make_reranker(pair_ms=2.0)
+    hit_lists, passages = [], {}
+    for q in range(4):
+        hits, query_passages = hits_and_passages(8)
+        hit_lists.append(hits)
+        passages.update(query_passages)
+    timings = {}
+    output = reranker.rerank_many([f"query {q}" for q in range(4)], hit_lists, passages,
+                                  budget_ms=40, timings=timings)
+    assert timings["rerank_fallbacks"] == 0
+    assert all("rerank_score" in hits[0] for hits in output)
+
+
+def test_skips_when_first_batch_cannot_fit():
+    reranker = make_reranker(pair_ms=20.0)
+    reranker.warm_up()
+    scored_before = len(reranker.model.pairs)
+    hits, passages = hits_and_passages(4)
+    timings = {}
+    [kept] = reranker.rerank_many(["query"], [hits], passages, budget_ms=10, timings=timings)
+    assert kept == hits
+    assert timings["rerank_fallbacks"] == 1 and timings["rerank_pairs"] == 0
+    assert len(reranker.model.pairs) == scored_before  # no forward pass was spent
+
+
+def test_invalidate_drops_pair_scores():
+    reranker = make_reranker()
+    cache = QueryCache(version_check_interval=0)
+    cache.attach(reranker.pair_scores)
+    hits, passages = hits_and_passages(3)
+    reranker.rerank_many(["query"], [hits], passages, budget_ms=1000)
+    assert len(reranker.pair_scores) == 3
+
+    cache.check_version(lambda: 1)
+    cache.check_version(lambda: 2)  # the collection changed
+    assert len(reranker.pair_scores) == 0
@@ -0,0 +1,50 @@
+"""Result cache invalidation on the cache-hit path (cached_search)."""
+import numpy as np
+import pytest
+
+import Search_Query_main as search
+from query_cache import QueryCache, normalize_query
+
+
+class FakeIndex:
+    def __init__(self):
+        self.generation = 1
+
+    def version(self):
+        return self.generation
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = QueryCache(version_check_interval=0)
+    monkeypatch.setattr(search, "query_cache", cache)
+    monkeypatch.setattr(search, "index", FakeIndex())
+    monkeypatch.setattr(search, "LEXICAL_INDEX_PATH", str(tmp_path / "missing.pkl"))
+    monkeypatch.setattr(search, "hydrate", lambda hits, fields=None, snippet_chars=None: hits)
+    return cache
+
+
+def remember(cache, query, hits, top_n=5):
+    embedding = np.ones(4, dtype=np.float32)
+    cache.embeddings.set(normalize_query(query), embedding)
+    cache.results.set(search._result_key("vector", query, embedding, top_n), hits)
+
+
+def test_repeat_query_is_served_from_the_cache(cache):
+    search.cached_search("cats", 5)  # first check records the collection version
+    remember(cache, "cats", [{"id": "a", "score": 0.1}])
+    assert search.cached_search("cats", 5) == [{"id": "a", "score": 0.1}]
+
+
+def test_reindex_makes_a_repeat_query_miss(cache):
+    search.cached_search("cats", 5)
+    remember(cache, "cats", [{"id": "a", "score": 0.1}])
+    search.index.generation += 1  # the collection changed
+    assert search.cached_search("cats", 5) is None
+    assert cache.invalidations == 1
+
+
+def test_no_version_check_before_the_index_is_loaded(cache, monkeypatch):
+    monkeypatch.setattr(search, "index", None)
+    monkeypatch.setattr(search, "load_resources", lambda: pytest.fail("cache lookup loaded the index"))
+    assert search.cached_search("cats", 5) is None
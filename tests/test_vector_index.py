@@ -0,0 +1,51 @@
+"""Vector index backends and how the search sizes its index query."""
+import json
+
+import numpy as np
+import pytest
+
+import Search_Query_main as search
+from vector_index import NumpyFlatIndex
+
+
+def write_numpy_index(directory, rows):
+    vectors = np.eye(len(rows), 4, dtype=np.float32)
+    np.save(directory / "vectors.npy", vectors)
+    np.save(directory / "sq_norms.npy", np.einsum("ij,ij->i", vectors, vectors))
+    with open(directory / "rows.jsonl", "w", encoding="utf-8") as f:
+        for vid, metadata in rows:
+            f.write(json.dumps({"id": vid, "metadata": metadata}) + "\n")
+    return NumpyFlatIndex(str(directory))
+
+
+def test_numpy_index_knows_whether_it_is_chunked(tmp_path):
+    (tmp_path / "videos").mkdir()
+    (tmp_path / "chunks").mkdir()
+    videos = write_numpy_index(tmp_path / "videos", [("a", {"parent_id": "a"}), ("b", {"parent_id": "b"})])
+    chunks = write_numpy_index(tmp_path / "chunks", [("a#0", {"parent_id": "a", "chunk_index": 0}),
+                                                     ("a#1", {"parent_id": "a", "chunk_index": 1})])
+    assert not videos.chunked()
+    assert chunks.chunked()
+    result = chunks.query([np.eye(1, 4, dtype=np.float32)[0]], 2)
+    assert result["ids"] == [["a#0", "a#1"]]
+
+
+class RecordingIndex:
+    def __init__(self, chunked):
+        self._chunked = chunked
+        self.n_results = []
+
+    def chunked(self):
+        return self._chunked
+
+    def query(self, query_embeddings, n_results, filters=None):
+        self.n_results.append(n_results)
+        return {"ids": [[]], "distances": [[]], "metadatas": [[]]}
+
+
+@pytest.mark.parametrize("chunked, expected", [(False, 7), (True, 7 * search.CHUNK_OVERSAMPLE)])
+def test_oversample_only_for_chunked_indexes(monkeypatch, chunked, expected):
+    index = RecordingIndex(chunked)
+    monkeypatch.setattr(search, "index", index)
+    search._first_stage(["cats"], [np.ones(4, dtype=np.float32)], [7], "vector", None, {}, use_cache=False)
+    assert index.n_results == [expected]
@@ -0,0 +1,154 @@
+import hashlib
+import json
+
+import pytest
+
+import youtube_harvester as yh
+from youtube_harvester import (ApiResponse, ChannelHarvester, QuotaBudget, RecordedTransport, ResponseCache,
+                               YouTubeClient)
+
+
+class FakeApi:
+    """In-memory stand-in for the Data API with ETags; uploads are listed newest first."""
+
+    def __init__(self):
+        self.channels = {}
+        self.calls = []
+
+    def add_channel(self, channel_id, video_ids):
+        self.channels[channel_id] = list(video_ids)
+
+    def _body(self, resource, params):
+        if resource == "channels":
+            items = [{
+                "id": c,
+                "snippet": {"title": f"title {c}", "description": "", "thumbnails": {"high": {"url": "u"}}},
+                "statistics": {"videoCount": str(len(self.channels[c]))},
+                "contentDetails": {"relatedPlaylists": {"uploads": f"UU{c}"}},
+            } for c in params["id"].split(",") if c in self.channels]
+            return {"items": items}
+        if resource == "playlistItems":
+            videos = self.channels[params["playlistId"][2:]]
+            start = int(params.get("pageToken") or 0)
+            end = start + int(params["maxResults"])
+            page = {"items": [{"snippet": {"resourceId": {"videoId": v}}} for v in videos[start:end]]}
+            if end < len(videos):
+                page["nextPageToken"] = str(end)
+            return page
+        if resource == "videos":
+            return {"items": [{"id": v, "snippet": {"title": f"video {v}", "publishedAt": f"2025-01-{int(v[1:]):02d}"}}
+                              for v in params["id"].split(",")]}
+        raise AssertionError(resource)
+
+    def get(self, resource, params, headers=None):
+        self.calls.append(resource)
+        body = json.dumps(self._body(resource, params))
+        etag = hashlib.md5(body.encode()).hexdigest()
+        if (headers or {}).get("If-None-Match") == etag:
+            return ApiResponse(304, etag, "")
+        return ApiResponse(200, etag, body)
+
+
+@pytest.fixture
+def api():
+    fake = FakeApi()
+    fake.add_channel("C1", ["v5", "v4", "v3", "v2", "v1"])
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(yh, "MAX_RESULTS", 2)
+
+
+def test_recorded_transport_replays_offline_and_honours_etags(tmp_path, api):
+    recorder = RecordedTransport(str(tmp_path / "rec"), inner=api)
+    live = recorder.get("channels", {"id": "C1", "part": "snippet"})
+    assert live.status == 200 and api.calls == ["channels"]
+
+    replay = RecordedTransport(str(tmp_path / "rec"))
+    assert replay.get("channels", {"part": "snippet", "id": "C1"}) == live  # param order does not matter
+    assert replay.get("channels", {"id": "C1", "part": "snippet"}, {"If-None-Match": live.etag}).status == 304
+    assert api.calls == ["channels"]
+    with pytest.raises(LookupError):
+        replay.get("channels", {"id": "C2", "part": "snippet"})
+
+
+def test_revalidation_returns_cached_body_and_is_charged(tmp_path, api):
+    client = YouTubeClient(api, QuotaBudget(100), ResponseCache(str(tmp_path / "cache")), max_age=0)
+    first = client.list("channels", id="C1", part="snippet")
+    second = client.list("channels", id="C1", part="snippet")
+    assert first == second
+    # The API charges conditional requests, so the budget does too
+    assert client.stats()["not_modified"] == 1
+    assert client.budget.used == 2 and client.stats()["units_saved"] == 0
+
+
+def test_fresh_cache_entries_cost_no_quota(tmp_path, api):
+    client = YouTubeClient(api, QuotaBudget(100), ResponseCache(str(tmp_path / "cache")), max_age=3600)
+    client.list("channels", id="C1", part="snippet")
+    client.list("channels", id="C1", part="snippet")
+    assert api.calls == ["channels"]
+    assert client.budget.used == 1
+    assert client.stats()["cache_hits"] == 1 and client.stats()["units_saved"] == 1
+
+
+def test_budget_stops_before_the_call(tmp_path, api):
+    client = YouTubeClient(api, QuotaBudget(1), None)
+    client.list("channels", id="C1", part="snippet")
+    with pytest.raises(yh.QuotaExceeded):
+        client.list("channels", id="C1", part="snippet")
+    assert api.calls == ["channels"]
+
+
+def _harvester(tmp_path, transport, **kwargs):
+    client = YouTubeClient(transport, QuotaBudget(1000), ResponseCache(str(tmp_path / "state" / "responses")))
+    return ChannelHarvester(client, str(tmp_path / "state"), str(tmp_path / "out"), **kwargs)
+
+
+def test_unchanged_channel_is_skipped_after_one_lookup(tmp_path, api):
+    [first] = _harvester(tmp_path, api).run(["C1"], workers=1)
+    assert first["status"] == "complete" and first["new_videos"] == 5
+
+    api.calls.clear()
+    harvester = _harvester(tmp_path, api)
+    summaries = harvester.run(["C1"], workers=1)
+    assert [s["status"] for s in summaries] == ["unchanged"]
+    assert api.calls == ["channels"] and harvester.client.budget.used == 1
+
+
+def test_new_upload_fetches_only_the_first_page(tmp_path, api):
+    _harvester(tmp_path, api).run(["C1"], workers=1)
+    api.add_channel("C1", ["v6", "v5", "v4", "v3", "v2", "v1"])
+    api.calls.clear()
+
+    harvester = _harvester(tmp_path, api)
+    [summary] = harvester.run(["C1"], workers=1)
+    assert summary["status"] == "complete" and summary["new_videos"] == 1
+    assert api.calls == ["channels", "playlistItems", "videos"]
+    assert [row["id"] for row in harvester.load_videos("C1")][0] == "v6"
+    assert len(harvester.load_videos("C1")) == 6
+
+
+def test_quota_stop_resumes_from_checkpoint(tmp_path, api):
+    client = YouTubeClient(api, QuotaBudget(4), None)
+    harvester = ChannelHarvester(client, str(tmp_path / "state"), str(tmp_path / "out"))
+    [summary] = harvester.run(["C1"], workers=1)  # channels + 2 x (page + videos) = 5 units
+    assert summary["status"] == "quota"
+    checkpoint = harvester.load_checkpoint("C1")
+    assert checkpoint["video_ids"] == ["v5", "v4"] and checkpoint["page_token"] == "2"
+
+    api.calls.clear()
+    [summary] = _harvester(tmp_path, api).run(["C1"], workers=1)
+    assert summary["status"] == "complete" and summary["new_videos"] == 3
+    assert api.calls.count("playlistItems") == 2  # pages 2 and 3 only
+
+
+def test_replayed_harvest_needs_no_network(tmp_path, api):
+    recordings = str(tmp_path / "rec")
+    _harvester(tmp_path / "live", RecordedTransport(recordings, inner=api)).run(["C1"], workers=1)
+    calls = len(api.calls)
+
+    [summary] = _harvester(tmp_path / "offline", RecordedTransport(recordings)).run(["C1"], workers=1)
+    assert summary["status"] == "complete" and summary["new_videos"] == 5
+    assert len(api.calls) == calls
@@ -0,0 +1,155 @@
+"""Append-only, crash-safe storage for extracted transcripts.
+
+Each finished video is appended as one JSON line to a part file under
+``<store>/parts/`` and its id (plus transcript type) to ``<store>/index.tsv``.
+Nothing is ever rewritten during a run, so saving is O(1) per video and a crash
+can at worst truncate the last line, which readers skip. ``compact()`` folds
+the parts into the final CSV once, at the end.
+"""
+import csv
+import glob
+import json
+import os
+import threading
+
+import pandas as pd
+
+FSYNC_EVERY = 10            # records between fsyncs of part + index
+MAX_PART_RECORDS = 1000     # records per part file before rolling to a new one
+FIELDNAMES = ["video_id", "transcript", "transcript_type"]
+
+
+def _read_jsonl(path):
+    """Yield records from a part file, skipping a torn trailing line."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class TranscriptStore:
+    def __init__(self, directory, fsync_every=FSYNC_EVERY, max_part_records=MAX_PART_RECORDS):
+        self.directory = directory
+        self.parts_dir = os.path.join(directory, "parts")
+        self.index_path = os.path.join(directory, "index.tsv")
+        self.fsync_every = fsync_every
+        self.max_part_records = max_part_records
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._part = None
+        self._part_records = 0
+        self._index = None
+        self._unsynced = 0
+
+    # ----- resume -----
+    def load_index(self):
+        """Return {video_id: transcript_type} for everything already stored."""
+        done = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # torn last line from a crash
+                    video_id, _, transcript_type = line.rstrip("\n").partition("\t")
+                    done[video_id] = transcript_type
+        return done
+
+    # ----- writing -----
+    def _part_paths(self):
+        return sorted(glob.glob(os.path.join(self.parts_dir, "part-*.jsonl")))
+
+    def _open_part(self):
+        existing = self._part_paths()
+        number = int(os.path.basename(existing[-1])[5:10]) + 1 if existing else 1
+        self._part = open(os.path.join(self.parts_dir, f"part-{number:05d}.jsonl"), "a", encoding="utf-8")
+        self._part_records = 0
+
+    def append(self, record):
+        """Durably (every ``fsync_every`` records) append one transcript record."""
+        with self._lock:
+            if self._part is None or self._part_records >= self.max_part_records:
+                self._close_part()
+                self._open_part()
+            if self._index is None:
+                self._index = open(self.index_path, "a", encoding="utf-8")
+            self._part.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._part_records += 1
+            self._index.write(f"{record['video_id']}\t{record.get('transcript_type') or ''}\n")
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+
+    def _sync(self):
+        # Part before index: an indexed id must never point at a lost record
+        for handle in (self._part, self._index):
+            if handle is not None:
+                handle.flush()
+                os.fsync(handle.fileno())
+        self._unsynced = 0
+
+    def _close_part(self):
+        if self._part is not None:
+            self._sync()
+            self._part.close()
+            self._part = None
+
+    def close(self):
+        with self._lock:
+            self._close_part()
+            if self._index is not None:
+                self._sync()
+                self._index.close()
+                self._index = None
+
+    # ----- compaction -----
+    def compact(self, output_csv, chunksize=5000):
+        """Merge an existing CSV and all part files into ``output_csv``.
+
+        Later records win over earlier ones for the same video id. The old CSV
+        is streamed in chunks, the new file is written next to it and swapped
+        in atomically, and the merged parts are then deleted.
+        """
+        self.close()
+        parts = self._part_paths()
+        # First pass keeps only ids and where each one was last written
+        last_seen = {}
+        for part_no, path in enumerate(parts):
+            for line_no, record in enumerate(_read_jsonl(path)):
+                last_seen[record["video_id"]] = (part_no, line_no)
+
+        tmp = f"{output_csv}.tmp"
+        rows = 0
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+            writer.writeheader()
+            if os.path.exists(output_csv):
+                for chunk in pd.read_csv(output_csv, chunksize=chunksize, dtype={"video_id": str}):
+                    chunk = chunk[~chunk["video_id"].isin(list(last_seen))]
+                    writer.writerows(chunk.to_dict("records"))
+                    rows += len(chunk)
+            for part_no, path in enumerate(parts):
+                for line_no, record in enumerate(_read_jsonl(path)):
+                    if last_seen[record["video_id"]] == (part_no, line_no):
+                        writer.writerow(record)
+                        rows += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, output_csv)
+
+        for path in parts:
+            os.remove(path)
+        self._rewrite_index()
+        return rows
+
+    def _rewrite_index(self):
+        """Drop duplicate index lines left by retried or re-fetched videos."""
+        done = self.load_index()
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for video_id, transcript_type in done.items():
+                f.write(f"{video_id}\t{transcript_type}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.index_path)
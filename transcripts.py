@@ -1,22 +1,30 @@
 import os
 import time
 import random
+import argparse
+import asyncio
 import pandas as pd
 import requests
 from youtube_transcript_api import YouTubeTranscriptApi
 from fake_useragent import UserAgent
 import logging
 from datetime import datetime
-import threading
-from IPython.display import display, clear_output
-import matplotlib.pyplot as plt
+from fetch_engine import ThroughputStats, run_workers
+from progress_monitor import ExtractionMetrics, ProgressReporter, DISPLAY_MODES, SNAPSHOT_INTERVAL
+from proxy_pool import ProxyPool, ProxyHealthChecker
+from transcript_store import TranscriptStore
 
 # ===== FIXED CONFIGURATION WITH MONITORING =====
 INPUT_CSV = "Inputfilepath"
 OUTPUT_FOLDER = "Output"
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 OUTPUT_CSV = "Output/all_transcripts.csv"
+# Append-only part files + id index; compacted into OUTPUT_CSV at the end of a run
+STORE_DIR = "Output/transcripts_store"
 PROGRESS_LOG = "Output/progress_log.txt"
+# One JSON line per SNAPSHOT_INTERVAL with every counter (see progress_monitor.py)
+PROGRESS_SNAPSHOTS = "Output/progress_snapshots.jsonl"
+# "auto" = notebook display in Jupyter/Colab, live terminal view on a TTY, headless otherwise
+DISPLAY = os.getenv("TRANSCRIPTS_DISPLAY", "auto")
 
 # Updated with verified working proxies (September 18, 2025)
 PROXIES = [
@@ -65,20 +73,8 @@ PROXIES = [
     "http://164.90.179.64:8080",
 ]
 
-# Global monitoring variables
-monitoring_data = {
-    'total_videos': 0,
-    'processed_videos': 0,
-    'successful_transcripts': 0,
-    'failed_videos': 0,
-    'current_video': '',
-    'start_time': 0,
-    'eta_minutes': 0,
-    'current_status': 'Initializing...',
-    'proxy_stats': {},
-    'transcript_types': {'manual': 0, 'auto-generated': 0, 'unknown': 0},
-    'recent_errors': []
-}
+# Run telemetry: workers update it, a ProgressReporter thread snapshots and draws it
+progress = ExtractionMetrics()
 
 def fetch_additional_proxies():
     """Fetch extra fresh proxies from ProxyScrape API"""
@@ -100,150 +96,90 @@ def fetch_additional_proxies():
         print(f"⚠️ Could not fetch additional proxies: {e}")
     return additional_proxies
 
-# Add fresh proxies dynamically
-extra_proxies = fetch_additional_proxies()
-PROXIES.extend(extra_proxies)
-PROXIES = list(set([p for p in PROXIES if p.startswith('http://') and ':' in p]))
+def load_proxies():
+    """Static proxy list plus fresh ProxyScrape proxies, de-duplicated"""
+    extra_proxies = fetch_additional_proxies()
+    proxies = list(set([p for p in PROXIES + extra_proxies if p.startswith('http://') and ':' in p]))
 
-print(f"✅ Total working proxies loaded: {len(PROXIES)}")
-print(f"🌍 Proxy sources: ProxyScrape, Free-Proxy-List.net, Spys.one, ProxyBros, Advanced.name")
+    print(f"✅ Total working proxies loaded: {len(proxies)}")
+    print(f"🌍 Proxy sources: ProxyScrape, Free-Proxy-List.net, Spys.one, ProxyBros, Advanced.name")
+    return proxies
 
 # Optimized settings
 RETRIES = 3
-MIN_DELAY = 30
+MIN_DELAY = 30            # per-proxy spacing between two uses of the same proxy
 MAX_DELAY = 60
-REQUESTS_PER_PROXY = 2
-COOLDOWN_TIME = 300
-
-# Setup logging with file handler
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(PROGRESS_LOG),
-        logging.StreamHandler()
-    ]
-)
+REQUESTS_PER_PROXY = 2    # token bucket burst per proxy...
+COOLDOWN_TIME = 300       # ...refilled over this many seconds; also the failure cooldown
+WORKERS = 8               # concurrent fetch workers; throughput scales with healthy proxies
+HEALTH_CHECK_INTERVAL = 120  # seconds between background proxy probe rounds
+
 logger = logging.getLogger(__name__)
 
+def setup_logging():
+    """Setup logging with file handler"""
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(PROGRESS_LOG),
+            logging.StreamHandler()
+        ]
+    )
+
 # User agent rotation
 ua = UserAgent()
 
 class MonitoringProxyManager:
     def __init__(self, proxies):
         self.proxies = proxies
-        self.request_counts = {proxy: 0 for proxy in proxies}
-        self.failed_proxies = set()
-        self.last_used = {}
-        self.success_rates = {proxy: 1.0 for proxy in proxies}
+        # Each proxy gets its own token bucket (REQUESTS_PER_PROXY per COOLDOWN_TIME)
+        # and spacing; the pool picks the best-scored ready proxy in O(log n)
+        self.pool = ProxyPool(
+            proxies,
+            rate=REQUESTS_PER_PROXY / COOLDOWN_TIME,
+            burst=REQUESTS_PER_PROXY,
+            spacing=(MIN_DELAY, MAX_DELAY),
+            cooldown=COOLDOWN_TIME,
+        )
+        # Background prober keeps known-dead proxies out of the pool
+        self.health_checker = ProxyHealthChecker(self.pool, proxies, interval=HEALTH_CHECK_INTERVAL)
+        self.throughput = ThroughputStats()
 
     def get_next_proxy(self):
-        available_proxies = [p for p in self.proxies if p not in self.failed_proxies]
-
-        if not available_proxies:
-            logger.warning("⚠️ All proxies failed, resetting failed list...")
-            self.failed_proxies.clear()
-            available_proxies = self.proxies
-
-        def proxy_score(proxy):
-            usage_factor = 1 / (self.request_counts[proxy] + 1)
-            success_factor = self.success_rates[proxy]
-            return usage_factor * success_factor
-
-        best_proxy = max(available_proxies, key=proxy_score)
-
-        if self.request_counts[best_proxy] >= REQUESTS_PER_PROXY:
-            if best_proxy in self.last_used:
-                time_since_last = time.time() - self.last_used[best_proxy]
-                if time_since_last < COOLDOWN_TIME:
-                    cooldown_remaining = COOLDOWN_TIME - time_since_last
-                    monitoring_data['current_status'] = f"🕒 Proxy cooldown: {cooldown_remaining:.0f}s"
-                    update_progress_display()
-                    logger.info(f"🕒 Proxy cooling down, waiting {cooldown_remaining:.0f}s...")
-                    time.sleep(cooldown_remaining)
-            self.request_counts[best_proxy] = 0
-
-        return best_proxy
+        while True:
+            proxy, wait = self.pool.acquire()
+            if proxy is not None:
+                return proxy
+            progress.set_status(f"🕒 All proxies pacing, next in {wait:.0f}s")
+            logger.info(f"🕒 No proxy ready, waiting {wait:.0f}s...")
+            # Wakes early if the health checker revives a proxy
+            self.pool.wait_for_change(max(wait, 0.05))
+
+    def _update_stats(self):
+        progress.set_proxy_stats(self.pool.stats())
 
     def mark_success(self, proxy):
-        self.request_counts[proxy] += 1
-        self.last_used[proxy] = time.time()
-        self.success_rates[proxy] = min(1.0, self.success_rates[proxy] + 0.1)
-        if proxy in self.failed_proxies:
-            self.failed_proxies.remove(proxy)
+        self.pool.record_result(proxy, True)
 
         # Update monitoring
-        monitoring_data['proxy_stats'] = {
-            'total': len(self.proxies),
-            'working': len([p for p in self.proxies if p not in self.failed_proxies]),
-            'failed': len(self.failed_proxies),
-            'avg_success_rate': sum(self.success_rates.values()) / len(self.success_rates)
-        }
+        self._update_stats()
 
     def mark_failure(self, proxy):
-        self.success_rates[proxy] = max(0.1, self.success_rates[proxy] - 0.3)
-        if self.success_rates[proxy] <= 0.3:
-            self.failed_proxies.add(proxy)
+        # Blocked proxies lose score and sit out a full cooldown; others keep working
+        self.pool.record_result(proxy, False)
 
         # Update monitoring
-        monitoring_data['proxy_stats'] = {
-            'total': len(self.proxies),
-            'working': len([p for p in self.proxies if p not in self.failed_proxies]),
-            'failed': len(self.failed_proxies),
-            'avg_success_rate': sum(self.success_rates.values()) / len(self.success_rates)
-        }
+        self._update_stats()
 
-def update_progress_display():
-    """Update the progress display in Colab"""
-    clear_output(wait=True)
-
-    # Calculate progress percentage
-    if monitoring_data['total_videos'] > 0:
-        progress_percent = (monitoring_data['processed_videos'] / monitoring_data['total_videos']) * 100
-        success_rate = (monitoring_data['successful_transcripts'] / max(1, monitoring_data['processed_videos'])) * 100
-    else:
-        progress_percent = 0
-        success_rate = 0
-
-    # Create progress bar
-    bar_length = 40
-    filled_length = int(bar_length * progress_percent / 100)
-    bar = '█' * filled_length + '░' * (bar_length - filled_length)
-
-    print("🎯 YOUTUBE TRANSCRIPT EXTRACTION - LIVE MONITOR")
-    print("=" * 60)
-    print(f"📊 Progress: [{bar}] {progress_percent:.1f}%")
-    print(f"📹 Videos: {monitoring_data['processed_videos']}/{monitoring_data['total_videos']}")
-    print(f"✅ Success: {monitoring_data['successful_transcripts']} ({success_rate:.1f}%)")
-    print(f"❌ Failed: {monitoring_data['failed_videos']}")
-    print(f"🕐 Runtime: {(time.time() - monitoring_data['start_time'])/60:.1f} minutes")
-    print(f"⏱️ ETA: {monitoring_data['eta_minutes']:.1f} minutes remaining")
-    print(f"📺 Current: {monitoring_data['current_video']}")
-    print(f"🔄 Status: {monitoring_data['current_status']}")
-
-    # Proxy statistics
-    if monitoring_data['proxy_stats']:
-        stats = monitoring_data['proxy_stats']
-        print(f"🌐 Proxies: {stats['working']}/{stats['total']} working (Success: {stats['avg_success_rate']:.2f})")
-
-    # Transcript type breakdown
-    if sum(monitoring_data['transcript_types'].values()) > 0:
-        types = monitoring_data['transcript_types']
-        print(f"📝 Types: Manual={types['manual']}, Auto={types['auto-generated']}, Unknown={types['unknown']}")
-
-    # Recent errors (last 3)
-    if monitoring_data['recent_errors']:
-        print(f"⚠️ Recent errors: {len(monitoring_data['recent_errors'])}")
-        for error in monitoring_data['recent_errors'][-3:]:
-            print(f"   • {error}")
-
-    print("=" * 60)
+def count_transcript_type(transcript_type):
+    progress.count_transcript_type(transcript_type)
 
 def fetch_transcript_fixed(video_id, proxy):
     """FIXED: Proper transcript fetching with correct API usage"""
     try:
-        monitoring_data['current_status'] = f"🔍 Fetching transcript via {proxy[:20]}..."
-        update_progress_display()
+        progress.set_status(f"🔍 Fetching transcript via {proxy[:20]}...")
 
         session = requests.Session()
         session.proxies = {"http": proxy, "https": proxy}
@@ -260,10 +196,6 @@ def fetch_transcript_fixed(video_id, proxy):
             'Pragma': 'no-cache',
         }
 
-        # Monkey-patch youtube_transcript_api
-        import youtube_transcript_api._api as _api
-        _api.requests = session
-
         # Enhanced session
         original_get = session.get
         def enhanced_get(*args, **kwargs):
@@ -271,7 +203,10 @@ def fetch_transcript_fixed(video_id, proxy):
             kwargs.setdefault('timeout', 30)
             return original_get(*args, **kwargs)
         session.get = enhanced_get
-        ytt_api = YouTubeTranscriptApi()
+
+        # Hand the session to this API instance only (patching the module-level
+        # requests would leak one worker's proxy into every other worker)
+        ytt_api = YouTubeTranscriptApi(http_client=session)
 
         # Try to get original English transcript first (manual/provided by creator)
         try:
@@ -282,7 +217,7 @@ def fetch_transcript_fixed(video_id, proxy):
                 manual_transcript = transcript_list.find_manually_created_transcript(['en'])
                 fetched_transcript = manual_transcript.fetch()
                 transcript_text = " ".join([snippet.text for snippet in fetched_transcript])
-                monitoring_data['transcript_types']['manual'] += 1
+                count_transcript_type('manual')
                 logger.info("✅ Found MANUAL English transcript")
                 return transcript_text, "manual"
             except:
@@ -293,7 +228,7 @@ def fetch_transcript_fixed(video_id, proxy):
                 auto_transcript = transcript_list.find_generated_transcript(['en'])
                 fetched_transcript = auto_transcript.fetch()
                 transcript_text = " ".join([snippet.text for snippet in fetched_transcript])
-                monitoring_data['transcript_types']['auto-generated'] += 1
+                count_transcript_type('auto-generated')
                 logger.info("✅ Found AUTO-GENERATED English transcript")
                 return transcript_text, "auto-generated"
             except:
@@ -305,7 +240,7 @@ def fetch_transcript_fixed(video_id, proxy):
                 fetched_transcript = ytt_api.fetch(video_id, languages=['en'])
                 # FIXED: Use correct attribute access (not subscriptable)
                 transcript_text = " ".join([snippet.text for snippet in fetched_transcript])
-                monitoring_data['transcript_types']['unknown'] += 1
+                count_transcript_type('unknown')
                 logger.info("✅ Found transcript using fallback method")
                 return transcript_text, "unknown"
             except:
@@ -318,39 +253,36 @@ def fetch_transcript_fixed(video_id, proxy):
 
 def get_transcript_with_retry(video_id, proxy_manager):
     """Enhanced transcript extraction with intelligent retry logic"""
-    monitoring_data['current_status'] = f"🎬 Processing {video_id[:11]}..."
-    update_progress_display()
+    progress.set_status(f"🎬 Processing {video_id[:11]}...")
 
     for attempt in range(1, RETRIES + 1):
         proxy = proxy_manager.get_next_proxy()
         proxy_display = proxy[:30] + "..." if len(proxy) > 30 else proxy
-        monitoring_data['current_status'] = f"🔄 Attempt {attempt}/{RETRIES}"
-        update_progress_display()
+        progress.set_status(f"🔄 Attempt {attempt}/{RETRIES}")
         logger.info(f"🔄 Attempt {attempt}/{RETRIES} with proxy: {proxy_display}")
 
+        fetch_start = time.monotonic()
         try:
-            transcript_text, transcript_type = fetch_transcript_fixed(video_id, proxy)
+            try:
+                transcript_text, transcript_type = fetch_transcript_fixed(video_id, proxy)
+            finally:
+                proxy_manager.throughput.record_proxy(proxy, time.monotonic() - fetch_start)
 
             if transcript_text:
                 proxy_manager.mark_success(proxy)
-                monitoring_data['current_status'] = f"✅ Success ({transcript_type})"
-                update_progress_display()
+                progress.set_status(f"✅ Success ({transcript_type})")
                 logger.info(f"✅ Transcript fetched successfully ({transcript_type})")
                 return transcript_text, transcript_type
             else:
-                monitoring_data['current_status'] = "⚠️ No transcript available"
+                progress.set_status("⚠️ No transcript available")
                 logger.warning("⚠️ No transcript available for this video")
                 return None, None
 
         except Exception as e:
             error_msg = str(e)
             short_error = error_msg[:50] + "..." if len(error_msg) > 50 else error_msg
-            monitoring_data['recent_errors'].append(f"{video_id}: {short_error}")
-            if len(monitoring_data['recent_errors']) > 10:
-                monitoring_data['recent_errors'] = monitoring_data['recent_errors'][-10:]
-
-            monitoring_data['current_status'] = f"❌ Error: {short_error}"
-            update_progress_display()
+            progress.record_error(video_id, short_error)
+            progress.set_status(f"❌ Error: {short_error}")
             logger.warning(f"⚠️ Failed: {error_msg[:100]}...")
 
             if any(phrase in error_msg.lower() for phrase in [
@@ -363,8 +295,7 @@ def get_transcript_with_retry(video_id, proxy_manager):
 
             if attempt < RETRIES:
                 delay = min(60, (2 ** (attempt-1)) + random.uniform(5, 15))
-                monitoring_data['current_status'] = f"😴 Retry delay: {delay:.1f}s"
-                update_progress_display()
+                progress.set_status(f"😴 Retry delay: {delay:.1f}s")
                 logger.info(f"😴 Waiting {delay:.1f}s before retry...")
                 time.sleep(delay)
 
@@ -374,252 +305,278 @@ def get_transcript_with_retry(video_id, proxy_manager):
 def save_progress_report():
     """Save a detailed progress report"""
     report_file = "Output/progress_report.txt"
+    snapshot = progress.snapshot()
     with open(report_file, 'w') as f:
         f.write(f"YOUTUBE TRANSCRIPT EXTRACTION REPORT\n")
         f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"=" * 50 + "\n")
-        f.write(f"Total Videos: {monitoring_data['total_videos']}\n")
-        f.write(f"Processed: {monitoring_data['processed_videos']}\n")
-        f.write(f"Successful: {monitoring_data['successful_transcripts']}\n")
-        f.write(f"Failed: {monitoring_data['failed_videos']}\n")
-        f.write(f"Success Rate: {(monitoring_data['successful_transcripts']/max(1,monitoring_data['processed_videos']))*100:.1f}%\n")
-        f.write(f"Runtime: {(time.time() - monitoring_data['start_time'])/60:.1f} minutes\n")
+        f.write(f"Total Videos: {snapshot['total_videos']}\n")
+        f.write(f"Processed: {snapshot['processed_videos']}\n")
+        f.write(f"Successful: {snapshot['successful_transcripts']}\n")
+        f.write(f"Failed: {snapshot['failed_videos']}\n")
+        f.write(f"Success Rate: {(snapshot['successful_transcripts']/max(1,snapshot['processed_videos']))*100:.1f}%\n")
+        f.write(f"Runtime: {snapshot['elapsed_seconds']/60:.1f} minutes\n")
         f.write(f"\nTranscript Types:\n")
-        for t_type, count in monitoring_data['transcript_types'].items():
+        for t_type, count in snapshot['transcript_types'].items():
             f.write(f"  {t_type}: {count}\n")
         f.write(f"\nProxy Statistics:\n")
-        if monitoring_data['proxy_stats']:
-            stats = monitoring_data['proxy_stats']
+        if snapshot['proxy_stats']:
+            stats = snapshot['proxy_stats']
             f.write(f"  Total: {stats['total']}\n")
             f.write(f"  Working: {stats['working']}\n")
             f.write(f"  Failed: {stats['failed']}\n")
             f.write(f"  Avg Success Rate: {stats['avg_success_rate']:.2f}\n")
-
-# MAIN EXECUTION WITH MONITORING
-monitoring_data['start_time'] = time.time()
-monitoring_data['current_status'] = "🚀 Starting extraction..."
-update_progress_display()
-
-logger.info("🚀 Starting YouTube transcript extraction with live monitoring...")
-logger.info(f"📁 Input CSV: {INPUT_CSV}")
-logger.info(f"📁 Output CSV: {OUTPUT_CSV}")
-
-# Load input data
-df = pd.read_csv(INPUT_CSV)
-print(f"📊 Input CSV columns: {list(df.columns)}")
-
-# Find video_id column (flexible column name detection)
-video_id_column = None
-for col in df.columns:
-    if 'video_id' in col.lower() or 'videoid' in col.lower() or 'id' in col.lower():
-        video_id_column = col
-        break
-
-if video_id_column is None:
-    # If no video_id column found, look for URL column to extract IDs
-    url_column = None
+            f.write(f"  Dead (health check): {stats.get('dead', 0)}\n")
+            if stats.get('avg_latency') is not None:
+                f.write(f"  Avg Probe Latency: {stats['avg_latency']*1000:.0f} ms\n")
+        f.write("\nThroughput:\n")
+        if snapshot['throughput']:
+            tp = snapshot['throughput']
+            f.write(f"  Workers: {WORKERS}\n")
+            f.write(f"  Videos/min: {tp['videos_per_minute']:.2f}\n")
+            f.write(f"  Proxies used: {tp['proxies_used']}\n")
+            for proxy, usage in sorted(tp['proxy_utilization'].items(),
+                                       key=lambda item: item[1]['utilization'], reverse=True):
+                f.write(f"  {proxy}: {usage['requests']} requests, {usage['utilization']*100:.1f}% busy\n")
+
+def load_video_ids(input_csv):
+    """Read the input CSV and return the unique video ids to process"""
+    df = pd.read_csv(input_csv)
+    print(f"📊 Input CSV columns: {list(df.columns)}")
+
+    # Find video_id column (flexible column name detection)
+    video_id_column = None
     for col in df.columns:
-        if 'url' in col.lower() or 'link' in col.lower():
-            url_column = col
+        if 'video_id' in col.lower() or 'videoid' in col.lower() or 'id' in col.lower():
+            video_id_column = col
             break
 
-    if url_column:
-        logger.info(f"📹 Extracting video IDs from URL column: {url_column}")
-        def extract_video_id(url):
-            if 'youtube.com/watch?v=' in str(url):
-                return str(url).split('watch?v=')[1].split('&')[0]
-            elif 'youtu.be/' in str(url):
-                return str(url).split('youtu.be/')[1].split('?')[0]
-            return None
-
-        df['video_id'] = df[url_column].apply(extract_video_id)
-        video_id_column = 'video_id'
-    else:
-        raise ValueError("No 'video_id' or URL column found in CSV")
-
-video_ids = [str(x).strip() for x in df[video_id_column].dropna().unique().tolist() if str(x).strip() != 'nan']
-monitoring_data['total_videos'] = len(video_ids)
-logger.info(f"📊 Total unique videos found: {len(video_ids)}")
-
-# Resume support - only continue from where we left off
-if os.path.exists(OUTPUT_CSV):
-    processed_df = pd.read_csv(OUTPUT_CSV)
-    processed_ids = set(processed_df["video_id"].astype(str))
-    results = processed_df.to_dict("records")
-    monitoring_data['successful_transcripts'] = len(results)
-
-    # Update transcript type counts
-    if 'transcript_type' in processed_df.columns:
-        type_counts = processed_df['transcript_type'].value_counts()
-        for t_type, count in type_counts.items():
-            if t_type in monitoring_data['transcript_types']:
-                monitoring_data['transcript_types'][t_type] = count
-
-    logger.info(f"♻️ Resuming: {len(processed_ids)} already processed")
-else:
-    processed_ids = set()
-    results = []
-
-remaining = [vid for vid in video_ids if vid not in processed_ids]
-logger.info(f"⏳ Remaining videos to process: {len(remaining)}")
-
-if len(remaining) == 0:
-    logger.info("🎉 All videos already processed!")
-    save_progress_report()
-    exit()
-
-# Initialize proxy manager with monitoring
-proxy_manager = MonitoringProxyManager(PROXIES)
-logger.info(f"🌐 Initialized with {len(PROXIES)} proxies")
-
-# Main processing loop with enhanced monitoring
-processed_count = len(processed_ids)  # Start from existing count
-monitoring_data['processed_videos'] = processed_count
-
-try:
-    for idx, vid in enumerate(remaining, start=1):
-        monitoring_data['current_video'] = vid
-        monitoring_data['current_status'] = f"🎬 Starting {vid[:11]}..."
-        update_progress_display()
-
-        logger.info(f"\n📹 [{idx}/{len(remaining)}] Processing video: {vid}")
-
-        transcript_text, transcript_type = get_transcript_with_retry(vid, proxy_manager)
+    if video_id_column is None:
+        # If no video_id column found, look for URL column to extract IDs
+        url_column = None
+        for col in df.columns:
+            if 'url' in col.lower() or 'link' in col.lower():
+                url_column = col
+                break
+
+        if url_column:
+            logger.info(f"📹 Extracting video IDs from URL column: {url_column}")
+            def extract_video_id(url):
+                if 'youtube.com/watch?v=' in str(url):
+                    return str(url).split('watch?v=')[1].split('&')[0]
+                elif 'youtu.be/' in str(url):
+                    return str(url).split('youtu.be/')[1].split('?')[0]
+                return None
+
+            df['video_id'] = df[url_column].apply(extract_video_id)
+            video_id_column = 'video_id'
+        else:
+            raise ValueError("No 'video_id' or URL column found in CSV")
+
+    return [str(x).strip() for x in df[video_id_column].dropna().unique().tolist() if str(x).strip() != 'nan']
+
+def main(argv=None):
+    # MAIN EXECUTION WITH MONITORING
+    parser = argparse.ArgumentParser(description="Extract YouTube transcripts through a rotating proxy pool.")
+    parser.add_argument("--input", default=INPUT_CSV, help="CSV with a video id or URL column")
+    parser.add_argument("--display", choices=DISPLAY_MODES, default=DISPLAY,
+                        help="live progress view; 'none' runs headless (JSON snapshots and log only)")
+    parser.add_argument("--headless", action="store_true", help="same as --display none")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL,
+                        help="seconds between progress snapshots / redraws")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    reporter = ProgressReporter(progress, PROGRESS_SNAPSHOTS, "none" if args.headless else args.display,
+                                interval=args.snapshot_interval)
+    proxies = load_proxies()
+
+    progress.set_status("🚀 Starting extraction...")
+
+    logger.info("🚀 Starting YouTube transcript extraction with live monitoring...")
+    logger.info(f"📁 Input CSV: {args.input}")
+    logger.info(f"📁 Output CSV: {OUTPUT_CSV}")
+    logger.info(f"📈 Progress snapshots: {PROGRESS_SNAPSHOTS} every {args.snapshot_interval:g}s "
+                f"(display: {reporter.display})")
+
+    # Load input data
+    video_ids = load_video_ids(args.input)
+    logger.info(f"📊 Total unique videos found: {len(video_ids)}")
+
+    # Resume support - only continue from where we left off.
+    # The store index holds id + type per line; an older CSV is read for its ids only.
+    store = TranscriptStore(STORE_DIR)
+    done = store.load_index()
+    if os.path.exists(OUTPUT_CSV):
+        legacy = pd.read_csv(OUTPUT_CSV, usecols=lambda c: c in ("video_id", "transcript_type"), dtype=str)
+        for vid, t_type in zip(legacy["video_id"], legacy.get("transcript_type", [""] * len(legacy))):
+            done.setdefault(vid, t_type)
+    processed_ids = set(done)
+
+    if processed_ids:
+        logger.info(f"♻️ Resuming: {len(processed_ids)} already processed")
+
+    remaining = [vid for vid in video_ids if vid not in processed_ids]
+    logger.info(f"⏳ Remaining videos to process: {len(remaining)}")
+    # Already stored videos count as processed and successful, with their transcript types
+    progress.start(len(video_ids), done.values(), session_total=len(remaining))
+    reporter.start()
+
+    if len(remaining) == 0:
+        logger.info("🎉 All videos already processed!")
+        store.compact(OUTPUT_CSV)
+        progress.set_status("🎉 Completed!")
+        reporter.stop()
+        save_progress_report()
+        return
+
+    # Initialize proxy manager with monitoring
+    proxy_manager = MonitoringProxyManager(proxies)
+    logger.info(f"🌐 Initialized with {len(proxies)} proxies, {WORKERS} workers")
+
+    # Probe every proxy once up front so dead ones never reach a real fetch
+    progress.set_status("🩺 Health-checking proxies...")
+    outcomes = proxy_manager.health_checker.check_now()
+    proxy_manager._update_stats()
+    logger.info(f"🩺 {sum(ok for ok, _ in outcomes.values())}/{len(outcomes)} proxies passed the health check")
+    proxy_manager.health_checker.start()
+
+    # Processing with enhanced monitoring; pacing is per proxy, not global sleeps
+    session_done = 0
+
+    def on_result(vid, result):
+        """Runs on the event loop as each worker finishes a video"""
+        nonlocal session_done
+        transcript_text, transcript_type = result
+        session_done += 1
+        proxy_manager.throughput.record_item(transcript_text)
+        logger.info(f"\n📹 [{session_done}/{len(remaining)}] Finished video: {vid}")
 
         # Only save if transcript was found (as per your requirement)
+        progress.record_result(vid, bool(transcript_text))
+        if transcript_text:
+            progress.set_status("💾 Saving transcript...")
+        else:
+            progress.set_status("⏭️ Skipping - no transcript")
+            logger.info("⏭️ No transcript found - skipping video (as requested)")
+        progress.set_throughput(proxy_manager.throughput.snapshot())
+        logger.info(f"⏱️ ETA: {progress.eta_minutes():.1f} minutes")
+
+        # Append-only save: one JSON line per video, fsynced every few records
         if transcript_text:
-            results.append({
+            store.append({
                 "video_id": vid,
                 "transcript": transcript_text,
                 "transcript_type": transcript_type
             })
-            monitoring_data['successful_transcripts'] += 1
-            monitoring_data['current_status'] = "💾 Saving transcript..."
-            update_progress_display()
-            logger.info("💾 Transcript saved to results")
-        else:
-            monitoring_data['failed_videos'] += 1
-            monitoring_data['current_status'] = "⏭️ Skipping - no transcript"
-            update_progress_display()
-            logger.info("⏭️ No transcript found - skipping video (as requested)")
+            logger.info("💾 Transcript appended to store")
+
+        # Save detailed report at milestones
+        if session_done % 10 == 0:
+            save_progress_report()
+
+    try:
+        asyncio.run(run_workers(
+            remaining,
+            lambda vid: get_transcript_with_retry(vid, proxy_manager),
+            on_result,
+            WORKERS,
+        ))
+    except KeyboardInterrupt:
+        logger.info("\n⏹️ Interrupted by user")
+        progress.set_status("⏹️ Interrupted by user")
+
+    proxy_manager.health_checker.stop()
+
+    # Fold the part files into the final CSV in one pass
+    store.close()
+    compacted_rows = store.compact(OUTPUT_CSV)
+    logger.info(f"🗜️ Compacted transcript store into {OUTPUT_CSV} ({compacted_rows} rows)")
+
+    # Final statistics with monitoring update
+    progress.set_throughput(proxy_manager.throughput.snapshot())
+    progress.set_status("🎉 Completed!")
+    final = reporter.stop()
+    total_time = final['elapsed_seconds']
+    processed_count = final['processed_videos']
+
+    logger.info(f"\n🎉 Process completed!")
+    logger.info(f"⏱️ Total runtime: {total_time/60:.1f} minutes")
+    logger.info(f"📊 Videos processed: {processed_count}")
+    logger.info(f"✅ Successful transcripts: {final['successful_transcripts']}")
+    logger.info(f"❌ Videos with no transcripts: {final['failed_videos']}")
+    logger.info(f"🚀 Throughput: {final['throughput']['videos_per_minute']:.2f} videos/min "
+                f"across {final['throughput']['proxies_used']} proxies")
+    logger.info(f"📁 Results saved to: {OUTPUT_CSV}")
+    if processed_count > 0:
+        logger.info(f"📈 Success rate: {final['successful_transcripts']/processed_count*100:.1f}%")
+
+    # Save final report
+    save_progress_report()
+
+    # Display sample results
+    if os.path.exists(OUTPUT_CSV):
+        final_df = pd.read_csv(OUTPUT_CSV)
+        logger.info(f"📊 Final CSV contains {len(final_df)} videos with transcripts")
+
+        # Show breakdown by transcript type
+        if 'transcript_type' in final_df.columns:
+            type_counts = final_df['transcript_type'].value_counts()
+            logger.info(f"📋 Transcript types: {dict(type_counts)}")
+
+        # Show sample
+        logger.info(f"📝 Sample results:")
+        for idx, row in final_df.head(3).iterrows():
+            preview = row['transcript'][:100] + "..." if len(row['transcript']) > 100 else row['transcript']
+            transcript_type = row.get('transcript_type', 'unknown')
+            logger.info(f"  Video {row['video_id']} ({transcript_type}): {preview}")
+
+    print(f"\n🎯 Script completed successfully!")
+    print(f"📊 Final Report saved to: Output/progress_report.txt")
+    print(f"📋 Progress Log saved to: {PROGRESS_LOG}")
+
+    # Create final summary visualization (optional)
+    try:
+        import matplotlib
+        if reporter.display == "none":
+            matplotlib.use("Agg")  # headless: write the PNG without opening a window
+        import matplotlib.pyplot as plt
+
+        # Create a simple progress chart
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+
+        # Success/Failure pie chart
+        labels = ['Successful', 'Failed']
+        sizes = [final['successful_transcripts'], final['failed_videos']]
+        ax1.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
+        ax1.set_title('Transcript Extraction Results')
+
+        # Transcript type breakdown
+        if final['transcript_types']:
+            types = final['transcript_types']
+            labels2 = []
+            sizes2 = []
+            for t_type, count in types.items():
+                if count > 0:
+                    labels2.append(t_type.title())
+                    sizes2.append(count)
+
+            if sizes2:
+                ax2.pie(sizes2, labels=labels2, autopct='%1.1f%%', startangle=90)
+                ax2.set_title('Transcript Types')
+
+        plt.tight_layout()
+        plt.savefig('Output/results_summary.png', dpi=300, bbox_inches='tight')
+        if reporter.display != "none":
+            plt.show()
+        print("📊 Results visualization saved to : Output/results_summary.png")
+
+    except Exception as e:
+        print(f"⚠️ Could not create visualization: {e}")
+
+    print("\n" + "="*60)
+    print("🎉 EXTRACTION COMPLETE - MONITORING DATA SAVED")
+    print("="*60)
 
-        # Save progress frequently
-        if results:  # Only save if we have results
-            pd.DataFrame(results).to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
-            monitoring_data['current_status'] = "💾 Progress saved"
-            update_progress_display()
-            logger.info("💾 Progress saved to CSV")
-
-        processed_count += 1
-        monitoring_data['processed_videos'] = processed_count
-
-        # Calculate ETA
-        if processed_count > len(processed_ids):
-            elapsed_time = time.time() - monitoring_data['start_time']
-            videos_processed_this_session = processed_count - len(processed_ids)
-            avg_time_per_video = elapsed_time / videos_processed_this_session
-            remaining_videos = len(remaining) - idx
-            eta_seconds = remaining_videos * avg_time_per_video
-            monitoring_data['eta_minutes'] = eta_seconds / 60
-            logger.info(f"⏱️ ETA: {monitoring_data['eta_minutes']:.1f} minutes ({avg_time_per_video:.1f}s/video)")
-
-        # Adaptive delays
-        delay = random.uniform(MIN_DELAY, MAX_DELAY)
-
-        # Milestone breaks with progress save
-        if (processed_count - len(processed_ids)) % 10 == 0:
-            extra_delay = random.uniform(120, 180)
-            monitoring_data['current_status'] = f"🎯 Milestone break: {extra_delay:.1f}s"
-            update_progress_display()
-            save_progress_report()  # Save detailed report at milestones
-            logger.info(f"🎯 Milestone break: {extra_delay:.1f}s")
-            time.sleep(extra_delay)
-
-        monitoring_data['current_status'] = f"😴 Delay: {delay:.1f}s"
-        update_progress_display()
-        logger.info(f"😴 Standard delay: {delay:.1f}s")
-        time.sleep(delay)
-
-except KeyboardInterrupt:
-    logger.info("\n⏹️ Interrupted by user")
-    monitoring_data['current_status'] = "⏹️ Interrupted by user"
-    update_progress_display()
-
-# Final statistics with monitoring update
-end_time = time.time()
-total_time = end_time - monitoring_data['start_time']
-
-monitoring_data['current_status'] = "🎉 Completed!"
-update_progress_display()
-
-logger.info(f"\n🎉 Process completed!")
-logger.info(f"⏱️ Total runtime: {total_time/60:.1f} minutes")
-logger.info(f"📊 Videos processed: {processed_count}")
-logger.info(f"✅ Successful transcripts: {monitoring_data['successful_transcripts']}")
-logger.info(f"❌ Videos with no transcripts: {monitoring_data['failed_videos']}")
-logger.info(f"📁 Results saved to: {OUTPUT_CSV}")
-if processed_count > 0:
-    logger.info(f"📈 Success rate: {monitoring_data['successful_transcripts']/processed_count*100:.1f}%")
-
-# Save final report
-save_progress_report()
-
-# Display sample results
-if os.path.exists(OUTPUT_CSV):
-    final_df = pd.read_csv(OUTPUT_CSV)
-    logger.info(f"📊 Final CSV contains {len(final_df)} videos with transcripts")
-
-    # Show breakdown by transcript type
-    if 'transcript_type' in final_df.columns:
-        type_counts = final_df['transcript_type'].value_counts()
-        logger.info(f"📋 Transcript types: {dict(type_counts)}")
-
-    # Show sample
-    logger.info(f"📝 Sample results:")
-    for idx, row in final_df.head(3).iterrows():
-        preview = row['transcript'][:100] + "..." if len(row['transcript']) > 100 else row['transcript']
-        transcript_type = row.get('transcript_type', 'unknown')
-        logger.info(f"  Video {row['video_id']} ({transcript_type}): {preview}")
-
-print(f"\n🎯 Script completed successfully!")
-print(f"📊 Final Report saved to: Output/progress_report.txt")
-print(f"📋 Progress Log saved to: {PROGRESS_LOG}")
-
-# Create final summary visualization (optional)
-try:
-    import matplotlib.pyplot as plt
-
-    # Create a simple progress chart
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-
-    # Success/Failure pie chart
-    labels = ['Successful', 'Failed']
-    sizes = [monitoring_data['successful_transcripts'], monitoring_data['failed_videos']]
-    ax1.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-    ax1.set_title('Transcript Extraction Results')
-
-    # Transcript type breakdown
-    if monitoring_data['transcript_types']:
-        types = monitoring_data['transcript_types']
-        labels2 = []
-        sizes2 = []
-        for t_type, count in types.items():
-            if count > 0:
-                labels2.append(t_type.title())
-                sizes2.append(count)
-
-        if sizes2:
-            ax2.pie(sizes2, labels=labels2, autopct='%1.1f%%', startangle=90)
-            ax2.set_title('Transcript Types')
-
-    plt.tight_layout()
-    plt.savefig('Output/results_summary.png', dpi=300, bbox_inches='tight')
-    plt.show()
-    print("📊 Results visualization saved to : Output/results_summary.png")
-
-except Exception as e:
-    print(f"⚠️ Could not create visualization: {e}")
-
-print("\n" + "="*60)
-print("🎉 EXTRACTION COMPLETE - MONITORING DATA SAVED")
-print("="*60)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
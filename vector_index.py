@@ -0,0 +1,447 @@
+"""Vector index backends behind one interface.
+
+``search_youtube_videos`` talks to a ``VectorIndex`` and gets back the same
+result shape ChromaDB returns (lists of ids / distances / metadatas per query).
+Backends:
+
+* ``chroma`` – the persistent ChromaDB collection (default)
+* ``numpy``  – exact search over a memory-mapped float32 matrix
+* ``ivf``    – inverted-file search over the same matrix (k-means lists, ``nprobe``)
+* ``int8`` / ``binary`` – scan a 4x / 32x smaller quantized copy, then rescore
+  the shortlist exactly against the float vectors
+
+The NumPy files are exported from the ingested collection:
+
+    python vector_index.py build                 # vectors.npy + rows.jsonl (ids, metadata)
+    python vector_index.py build --ivf 64        # ...plus IVF lists
+    python vector_index.py build --quantize int8 binary
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from search_filters import filter_mask, metadata_columns, to_chroma_where
+
+CHROMA_PATH = "./chroma_db"
+COLLECTION_NAME = "youtube_videos"
+NUMPY_INDEX_DIR = "numpy_index"
+EXPORT_PAGE_SIZE = 1000
+IVF_NLIST = 64
+IVF_NPROBE = 8
+IVF_ITERATIONS = 10
+QUERY_BLOCK = 65536          # rows scored per matrix product, bounds temp memory
+CODE_BLOCK = 4096            # int8 rows widened to float32 at a time; small enough to stay in cache
+QUANTIZATIONS = ("int8", "binary")
+RESCORE_FACTOR = 4           # quantized shortlist = n_results * RESCORE_FACTOR, then exact float rescoring
+
+# Set bits per byte value, for Hamming distances over packed binary codes on NumPy < 2.0
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _hamming(codes, bits):
+    """Set bits in ``codes ^ bits`` per row."""
+    diff = codes ^ bits
+    if not hasattr(np, "bitwise_count"):
+        return _POPCOUNT[diff].sum(axis=1, dtype=np.int32)
+    if diff.shape[1] % 8 == 0:
+        diff = diff.view(np.uint64)  # eight bytes per popcount
+    return np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+
+
+def _topk(distances, k):
+    """Indices of the k smallest distances, nearest first."""
+    k = min(k, distances.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(distances, k - 1)[:k]
+    return idx[np.argsort(distances[idx], kind="stable")]
+
+
+class VectorIndex:
+    """Common interface; ``query`` mirrors ``chromadb.Collection.query``."""
+
+    name = "base"
+
+    def query(self, query_embeddings, n_results, filters=None):
+        """``filters`` is a search_filters dict, applied inside the search."""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def version(self):
+        """Changes whenever the underlying data changes (used for cache invalidation)."""
+        raise NotImplementedError
+
+    def chunked(self):
+        """True if videos are stored as several chunk vectors (rows carry ``chunk_index``)."""
+        raise NotImplementedError
+
+
+class ChromaIndex(VectorIndex):
+    name = "chroma"
+
+    def __init__(self, collection, version_file=None):
+        self.collection = collection
+        self.version_file = version_file
+        self._version = self._chunked = None
+
+    def query(self, query_embeddings, n_results, filters=None):
+        # Display fields come from the metadata store, so skip documents
+        kwargs = {"include": ["metadatas", "distances"]}
+        where = to_chroma_where(filters)
+        if where is not None:
+            kwargs["where"] = where
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, **kwargs)
+
+    def count(self):
+        return self.collection.count()
+
+    def version(self):
+        from query_cache import collection_version, COLLECTION_VERSION_FILE
+        version = collection_version(self.collection, self.version_file or COLLECTION_VERSION_FILE)
+        if version != self._version:
+            self._version, self._chunked = version, None  # a reindex may switch modes
+        return version
+
+    def chunked(self):
+        if self._chunked is None:
+            # One chunk row is enough: chunks mode replaces every whole-video vector
+            found = self.collection.get(where={"chunk_index": {"$gte": 0}}, limit=1, include=[])
+            self._chunked = bool(found["ids"])
+        return self._chunked
+
+
+class NumpyFlatIndex(VectorIndex):
+    """Exact squared-L2 search (ChromaDB's default space) over a memory-mapped matrix."""
+
+    name = "numpy"
+
+    def __init__(self, directory=NUMPY_INDEX_DIR, mmap=True):
+        self.directory = directory
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r" if mmap else None)
+        self.sq_norms = np.load(os.path.join(directory, "sq_norms.npy"))
+        self.ids, self.metadatas = [], []
+        with open(os.path.join(directory, "rows.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.metadatas.append(row.get("metadata") or {})
+        self._columns = None
+        self._chunked = any("chunk_index" in metadata for metadata in self.metadatas)
+
+    def _mask(self, filters):
+        """Pre-filter bitmap over all rows, or None when unfiltered."""
+        if not filters:
+            return None
+        if self._columns is None:
+            self._columns = metadata_columns(self.metadatas)
+        return filter_mask(filters, self._columns)
+
+    def count(self):
+        return len(self.ids)
+
+    def chunked(self):
+        return self._chunked
+
+    def version(self):
+        return os.path.getmtime(os.path.join(self.directory, "vectors.npy"))
+
+    def nbytes(self):
+        """Bytes of the arrays a full scan reads."""
+        return self.vectors.nbytes + self.sq_norms.nbytes
+
+    def _distances(self, queries, rows=None):
+        """Squared L2 from each query to ``rows`` (all rows if None): |q|^2 + |x|^2 - 2 q.x."""
+        q_sq = np.einsum("ij,ij->i", queries, queries)[:, None]
+        if rows is None:
+            out = np.empty((queries.shape[0], self.vectors.shape[0]), dtype=np.float32)
+            for start in range(0, self.vectors.shape[0], QUERY_BLOCK):
+                block = np.asarray(self.vectors[start:start + QUERY_BLOCK])
+                out[:, start:start + QUERY_BLOCK] = (
+                    q_sq + self.sq_norms[start:start + QUERY_BLOCK][None, :] - 2.0 * queries @ block.T
+                )
+            return out
+        block = np.asarray(self.vectors[rows])
+        return q_sq + self.sq_norms[rows][None, :] - 2.0 * queries @ block.T
+
+    def _result(self, hits):
+        """Build a Chroma-shaped result from per-query (row indices, distances)."""
+        result = {"ids": [], "distances": [], "metadatas": []}
+        for rows, dists in hits:
+            keep = np.isfinite(dists)  # rows excluded by filters carry inf
+            rows, dists = rows[keep], dists[keep]
+            result["ids"].append([self.ids[r] for r in rows])
+            result["distances"].append([float(max(d, 0.0)) for d in dists])
+            result["metadatas"].append([self.metadatas[r] for r in rows])
+        return result
+
+    def query(self, query_embeddings, n_results, filters=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        distances = self._distances(queries)
+        mask = self._mask(filters)
+        if mask is not None:
+            distances[:, ~mask] = np.inf
+        hits = []
+        for row in distances:
+            top = _topk(row, n_results)
+            hits.append((top, row[top]))
+        return self._result(hits)
+
+
+class NumpyIVFIndex(NumpyFlatIndex):
+    """Inverted-file index: only rows in the ``nprobe`` nearest k-means lists are scored."""
+
+    name = "ivf"
+
+    def __init__(self, directory=NUMPY_INDEX_DIR, nprobe=IVF_NPROBE, mmap=True):
+        super().__init__(directory, mmap=mmap)
+        self.centroids = np.load(os.path.join(directory, "ivf_centroids.npy"))
+        self.order = np.load(os.path.join(directory, "ivf_order.npy"), mmap_mode="r" if mmap else None)
+        self.offsets = np.load(os.path.join(directory, "ivf_offsets.npy"))
+        self.nprobe = nprobe
+
+    def query(self, query_embeddings, n_results, filters=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        mask = self._mask(filters)
+        c_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        centroid_dist = c_sq[None, :] - 2.0 * queries @ self.centroids.T
+        nprobe = min(self.nprobe, len(self.centroids))
+        hits = []
+        for qi, query in enumerate(queries):
+            lists = _topk(centroid_dist[qi], nprobe)
+            rows = np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+            if mask is not None:
+                # Filtering inside the probed lists: very selective filters may need a larger nprobe
+                rows = rows[mask[rows]]
+            if rows.size == 0:
+                hits.append((rows, rows.astype(np.float32)))
+                continue
+            dists = self._distances(query[None, :], rows)[0]
+            top = _topk(dists, n_results)
+            hits.append((rows[top], dists[top]))
+        return self._result(hits)
+
+
+class NumpyQuantizedIndex(NumpyFlatIndex):
+    """Scan int8 or binary codes for a shortlist, then rescore it with exact float distances.
+
+    The codes are the only matrix read in full; the float vectors stay memory
+    mapped and only shortlisted rows are paged in. ``rescore=0`` keeps the
+    approximate ranking (for measuring what rescoring buys).
+    """
+
+    def __init__(self, directory=NUMPY_INDEX_DIR, kind="int8", rescore=RESCORE_FACTOR, mmap=True):
+        if kind not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {kind!r}; expected one of {QUANTIZATIONS}")
+        super().__init__(directory, mmap=mmap)
+        self.name = kind
+        self.rescore = rescore
+        self.codes = np.load(os.path.join(directory, f"vectors_{kind}.npy"), mmap_mode="r" if mmap else None)
+        if kind == "int8":
+            # x ~= low + (code + 128) * step, per dimension
+            self.low = np.load(os.path.join(directory, "int8_low.npy"))
+            self.step = np.load(os.path.join(directory, "int8_step.npy"))
+        else:
+            self.center = np.load(os.path.join(directory, "binary_center.npy"))
+
+    def version(self):
+        return os.path.getmtime(os.path.join(self.directory, f"vectors_{self.name}.npy"))
+
+    def nbytes(self):
+        return self.codes.nbytes + self.sq_norms.nbytes
+
+    def _approximate(self, queries):
+        """Approximate distance from each query to every row (smaller = nearer)."""
+        out = np.empty((queries.shape[0], self.codes.shape[0]), dtype=np.float32)
+        if self.name == "int8":
+            scaled = queries * self.step[None, :]
+            # q . x = q . low + 128 * sum(q * step) + (q * step) . code
+            offset = queries @ self.low + 128.0 * scaled.sum(axis=1)
+            q_sq = np.einsum("ij,ij->i", queries, queries)
+            for start in range(0, self.codes.shape[0], CODE_BLOCK):
+                block = np.asarray(self.codes[start:start + CODE_BLOCK], dtype=np.float32)
+                dots = offset[:, None] + scaled @ block.T
+                out[:, start:start + CODE_BLOCK] = (
+                    q_sq[:, None] + self.sq_norms[start:start + CODE_BLOCK][None, :] - 2.0 * dots
+                )
+            return out
+        bits = np.packbits(queries > self.center[None, :], axis=1)
+        for start in range(0, self.codes.shape[0], QUERY_BLOCK):
+            block = np.asarray(self.codes[start:start + QUERY_BLOCK])
+            for qi in range(queries.shape[0]):
+                out[qi, start:start + QUERY_BLOCK] = _hamming(block, bits[qi])
+        return out
+
+    def query(self, query_embeddings, n_results, filters=None):
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        approx = self._approximate(queries)
+        mask = self._mask(filters)
+        if mask is not None:
+            approx[:, ~mask] = np.inf
+        hits = []
+        for qi, row in enumerate(approx):
+            shortlist = _topk(row, n_results * max(self.rescore, 1))
+            # Sorted rows read the float memmap sequentially
+            shortlist = np.sort(shortlist[np.isfinite(row[shortlist])])
+            dists = self._distances(queries[qi:qi + 1], shortlist)[0]
+            if self.rescore:
+                top = _topk(dists, n_results)
+            else:
+                # Keep the approximate order; distances are still reported exactly
+                top = np.argsort(row[shortlist], kind="stable")
+            hits.append((shortlist[top], dists[top]))
+        return self._result(hits)
+
+
+def export_numpy_index(collection, directory=NUMPY_INDEX_DIR, page_size=EXPORT_PAGE_SIZE):
+    """Page every vector out of ``collection`` into ``directory`` without holding them all in RAM."""
+    os.makedirs(directory, exist_ok=True)
+    total = collection.count()
+    if total == 0:
+        raise ValueError("collection is empty, nothing to export")
+    vectors = None
+    written = 0
+    tmp_rows = os.path.join(directory, "rows.jsonl.tmp")
+    with open(tmp_rows, "w", encoding="utf-8") as rows_file:
+        for offset in range(0, total, page_size):
+            page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(os.path.join(directory, "vectors.npy.tmp"), mode="w+",
+                                                    dtype=np.float32, shape=(total, embeddings.shape[1]))
+            vectors[written:written + len(embeddings)] = embeddings
+            for i, vid in enumerate(page["ids"]):
+                rows_file.write(json.dumps({
+                    "id": vid,
+                    "metadata": (page.get("metadatas") or [None] * len(page["ids"]))[i],
+                }, ensure_ascii=False) + "\n")
+            written += len(embeddings)
+    vectors.flush()
+    sq_norms = np.einsum("ij,ij->i", vectors[:written], vectors[:written]).astype(np.float32)
+    del vectors
+    np.save(os.path.join(directory, "sq_norms.npy"), sq_norms)
+    # np.load expects the .npy suffix, so rename the finished memmap into place
+    os.replace(os.path.join(directory, "vectors.npy.tmp"), os.path.join(directory, "vectors.npy"))
+    os.replace(tmp_rows, os.path.join(directory, "rows.jsonl"))
+    return written
+
+
+def build_ivf(directory=NUMPY_INDEX_DIR, nlist=IVF_NLIST, iterations=IVF_ITERATIONS, seed=0):
+    """Train k-means centroids on the exported vectors and write the inverted lists."""
+    vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+    n = vectors.shape[0]
+    nlist = max(1, min(nlist, n))
+    rng = np.random.default_rng(seed)
+    centroids = np.array(vectors[np.sort(rng.choice(n, nlist, replace=False))], dtype=np.float32)
+
+    def assign(cents):
+        c_sq = np.einsum("ij,ij->i", cents, cents)
+        labels = np.empty(n, dtype=np.int32)
+        for start in range(0, n, QUERY_BLOCK):
+            block = np.asarray(vectors[start:start + QUERY_BLOCK])
+            labels[start:start + QUERY_BLOCK] = np.argmin(c_sq[None, :] - 2.0 * block @ cents.T, axis=1)
+        return labels
+
+    for _ in range(iterations):
+        labels = assign(centroids)
+        sums = np.zeros_like(centroids)
+        for start in range(0, n, QUERY_BLOCK):
+            np.add.at(sums, labels[start:start + QUERY_BLOCK], np.asarray(vectors[start:start + QUERY_BLOCK]))
+        counts = np.bincount(labels, minlength=nlist)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+
+    labels = assign(centroids)
+    order = np.argsort(labels, kind="stable").astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))]).astype(np.int64)
+    np.save(os.path.join(directory, "ivf_centroids.npy"), centroids)
+    np.save(os.path.join(directory, "ivf_order.npy"), order)
+    np.save(os.path.join(directory, "ivf_offsets.npy"), offsets)
+    return nlist
+
+
+def build_quantized(directory=NUMPY_INDEX_DIR, kinds=QUANTIZATIONS):
+    """Write memory-mappable int8 and/or binary codes next to the exported float vectors."""
+    vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+    n, dim = vectors.shape
+    low = np.full(dim, np.inf, dtype=np.float32)
+    high = np.full(dim, -np.inf, dtype=np.float32)
+    total = np.zeros(dim, dtype=np.float64)
+    for start in range(0, n, QUERY_BLOCK):
+        block = np.asarray(vectors[start:start + QUERY_BLOCK])
+        low = np.minimum(low, block.min(axis=0))
+        high = np.maximum(high, block.max(axis=0))
+        total += block.sum(axis=0, dtype=np.float64)
+    step = np.maximum((high - low) / 255.0, 1e-12).astype(np.float32)
+    center = (total / max(n, 1)).astype(np.float32)  # sign bits relative to the mean: embeddings are not centred
+
+    for kind in kinds:
+        if kind not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {kind!r}; expected one of {QUANTIZATIONS}")
+        width = dim if kind == "int8" else (dim + 7) // 8
+        tmp = os.path.join(directory, f"vectors_{kind}.npy.tmp")
+        codes = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.int8 if kind == "int8" else np.uint8,
+                                          shape=(n, width))
+        for start in range(0, n, QUERY_BLOCK):
+            block = np.asarray(vectors[start:start + QUERY_BLOCK])
+            if kind == "int8":
+                codes[start:start + len(block)] = (np.rint((block - low) / step) - 128).clip(-128, 127)
+            else:
+                codes[start:start + len(block)] = np.packbits(block > center, axis=1)
+        codes.flush()
+        del codes
+        if kind == "int8":
+            np.save(os.path.join(directory, "int8_low.npy"), low)
+            np.save(os.path.join(directory, "int8_step.npy"), step)
+        else:
+            np.save(os.path.join(directory, "binary_center.npy"), center)
+        os.replace(tmp, os.path.join(directory, f"vectors_{kind}.npy"))
+    return n
+
+
+def load_index(backend="chroma", chroma_path=CHROMA_PATH, collection_name=COLLECTION_NAME,
+               numpy_dir=NUMPY_INDEX_DIR, nprobe=IVF_NPROBE, rescore=RESCORE_FACTOR):
+    """Open the requested backend."""
+    if backend == "chroma":
+        import chromadb
+        from query_cache import collection_version_file
+        client = chromadb.PersistentClient(path=chroma_path)
+        return ChromaIndex(client.get_collection(collection_name), collection_version_file(chroma_path))
+    if backend == "numpy":
+        return NumpyFlatIndex(numpy_dir)
+    if backend == "ivf":
+        return NumpyIVFIndex(numpy_dir, nprobe=nprobe)
+    if backend in QUANTIZATIONS:
+        return NumpyQuantizedIndex(numpy_dir, kind=backend, rescore=rescore)
+    raise ValueError(f"Unknown vector index backend: {backend!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the ChromaDB collection to NumPy index files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="export vectors (and optionally IVF lists)")
+    build.add_argument("--chroma-path", default=CHROMA_PATH)
+    build.add_argument("--collection", default=COLLECTION_NAME)
+    build.add_argument("--out", default=NUMPY_INDEX_DIR)
+    build.add_argument("--ivf", type=int, default=0, metavar="NLIST", help="also build IVF with NLIST lists")
+    build.add_argument("--quantize", nargs="+", choices=QUANTIZATIONS, default=[],
+                       help="also write int8 and/or binary codes")
+    args = parser.parse_args(argv)
+
+    import chromadb
+    collection = chromadb.PersistentClient(path=args.chroma_path).get_collection(args.collection)
+    n = export_numpy_index(collection, args.out)
+    print(f"✅ Exported {n} vectors to {args.out}/vectors.npy")
+    if args.ivf:
+        nlist = build_ivf(args.out, nlist=args.ivf)
+        print(f"✅ Built IVF index with {nlist} lists")
+    if args.quantize:
+        build_quantized(args.out, args.quantize)
+        print(f"✅ Wrote {' + '.join(args.quantize)} codes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""Quota-aware YouTube Data API harvester for many channels.
+
+Every API call is charged against a ``QuotaBudget`` before it is sent, so a
+run stops cleanly (with its progress saved) instead of failing half-way on
+``quotaExceeded``. Raw responses are cached on disk keyed by request; a
+cached response is revalidated with ``If-None-Match`` and reused on a 304.
+The API charges a conditional request like any other, so a 304 saves the
+transfer and parsing but not quota, and the budget charges it in full.
+Quota is saved by calls that are not made: responses younger than
+``--cache-max-age`` seconds are reused without a request, and unchanged
+channels are skipped (below).
+Each channel keeps a checkpoint (uploads playlist, known video ids, next
+page token), so a re-run:
+
+* looks up all channels in one ``channels.list`` call per 50 ids,
+* skips channels whose video count has not changed since they completed,
+* pages the uploads playlist (newest first) only until it reaches videos it
+  already has, and resumes an interrupted channel from its last page.
+
+Captions cost 250 units per video (``captions.list`` + ``captions.download``)
+and only work for channels the key's owner manages, so they are off by
+default; transcripts.py fetches transcripts without spending quota.
+
+    python youtube_harvester.py UCAiLfjNXkNv24uhpzUgPa6A UC_x5XG1OV2P6uZZ5FSM9Ttw --workers 4
+    python youtube_harvester.py --channels-file channels.txt --quota 5000
+    python youtube_harvester.py UCAiLfjNXkNv24uhpzUgPa6A --record recordings/   # live, saving responses
+    python youtube_harvester.py UCAiLfjNXkNv24uhpzUgPa6A --replay recordings/   # offline, no API key
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import requests
+
+from fetch_engine import run_workers
+
+API_URL = "https://www.googleapis.com/youtube/v3/"
+API_KEY = os.getenv("YOUTUBE_API_KEY", "")
+QUOTA_BUDGET = int(os.getenv("YOUTUBE_QUOTA_BUDGET", "10000"))    # default daily project quota
+# Seconds a cached response is reused without any request; 0 = always revalidate
+CACHE_MAX_AGE = float(os.getenv("YOUTUBE_CACHE_MAX_AGE", "0"))
+STATE_DIR = "harvest_state"
+OUTPUT_DIR = "harvest_output"
+MAX_RESULTS = 50                    # ids per channels/videos call, items per playlist page
+REQUEST_TIMEOUT = 30
+# Units per call; https://developers.google.com/youtube/v3/determine_quota_cost
+QUOTA_COSTS = {"channels": 1, "playlistItems": 1, "videos": 1, "captions": 50}
+CAPTION_DOWNLOAD_COST = 200
+VIDEO_PARTS = "snippet,contentDetails,statistics,status"
+CHANNEL_FIELDS = ["channel_id", "channel_title", "channel_description", "channel_country",
+                  "channel_thumbnail", "channel_subscriberCount", "channel_videoCount"]
+VIDEO_FIELDS = ["id", "title", "description", "publishedAt", "tags", "categoryId", "defaultLanguage",
+                "defaultAudioLanguage", "thumbnail_default", "thumbnail_high", "duration", "viewCount",
+                "likeCount", "commentCount", "privacyStatus", "captions"]
+
+ApiResponse = namedtuple("ApiResponse", "status etag body")
+
+
+class QuotaExceeded(RuntimeError):
+    """The local budget (or the API's daily quota) cannot cover the next call."""
+
+
+class ApiError(RuntimeError):
+    def __init__(self, status, resource, body):
+        super().__init__(f"{resource}: HTTP {status}: {body[:200]}")
+        self.status = status
+
+
+def quota_cost(resource):
+    return CAPTION_DOWNLOAD_COST if resource.startswith("captions/") else QUOTA_COSTS[resource]
+
+
+def request_key(resource, params):
+    """Stable digest of a request (the API key is never part of ``params``)."""
+    raw = json.dumps([resource, sorted((k, str(v)) for k, v in params.items())])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _write_json(path, data):
+    """Write via a temp file and rename, so readers never see a partial file."""
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+class QuotaBudget:
+    """Thread-safe running total of quota units, refusing calls past ``limit``."""
+
+    def __init__(self, limit=QUOTA_BUDGET):
+        self.limit = limit
+        self.used = 0
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        return self.limit - self.used
+
+    def spend(self, resource, cost):
+        with self._lock:
+            if self.used + cost > self.limit:
+                raise QuotaExceeded(f"{resource} needs {cost} units, {self.limit - self.used} left")
+            self.used += cost
+            name = resource.partition("/")[0] + ("/download" if "/" in resource else "")
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+
+class ResponseCache:
+    """Raw API responses on disk, one JSON file per request key, with their ETags."""
+
+    def __init__(self, directory=os.path.join(STATE_DIR, "responses")):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        return _read_json(self._path(key))
+
+    def set(self, key, etag, body):
+        """Store (or, after a 304, re-date) a response."""
+        _write_json(self._path(key), {"etag": etag, "body": body, "fetched": time.time()})
+
+
+class HttpTransport:
+    """Live API over HTTPS; one requests session per worker thread."""
+
+    def __init__(self, api_key=API_KEY, timeout=REQUEST_TIMEOUT):
+        if not api_key:
+            raise ValueError("A YouTube Data API key is required (--api-key or YOUTUBE_API_KEY)")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self, resource, params, headers=None):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.get(API_URL + resource, params={**params, "key": self.api_key},
+                               headers=headers or {}, timeout=self.timeout)
+        return ApiResponse(response.status_code, response.headers.get("ETag"), response.text)
+
+
+class RecordedTransport:
+    """Replays responses recorded under ``directory``; with ``inner`` set, records the misses.
+
+    Replays honour ``If-None-Match`` against the recorded ETag, so cache and
+    checkpoint behaviour can be exercised offline.
+    """
+
+    def __init__(self, directory, inner=None):
+        self.directory = directory
+        self.inner = inner
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, resource, params, headers=None):
+        path = os.path.join(self.directory, f"{request_key(resource, params)}.json")
+        record = _read_json(path)
+        if record is None:
+            if self.inner is None:
+                raise LookupError(f"No recorded response for {resource} {params}")
+            # Always record the full body, never a 304
+            response = self.inner.get(resource, params)
+            record = {"resource": resource, "params": params, **response._asdict()}
+            _write_json(path, record)
+        if record["etag"] and (headers or {}).get("If-None-Match") == record["etag"]:
+            return ApiResponse(304, record["etag"], "")
+        return ApiResponse(record["status"], record["etag"], record["body"])
+
+
+class YouTubeClient:
+    """Budgeted, cached GETs against the Data API.
+
+    Cached responses younger than ``max_age`` seconds are returned without a
+    request and cost nothing (counted in ``cache_hits`` / ``units_saved``).
+    Older ones are revalidated by ETag; the API charges that request in full.
+    """
+
+    def __init__(self, transport, budget=None, cache=None, max_age=CACHE_MAX_AGE):
+        self.transport = transport
+        self.budget = budget or QuotaBudget()
+        self.cache = cache
+        self.max_age = max_age
+        self.requests = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+        self.units_saved = 0
+        self._lock = threading.Lock()
+
+    def get(self, resource, **params):
+        params = {k: v for k, v in params.items() if v is not None}
+        key = request_key(resource, params)
+        cost = quota_cost(resource)
+        cached = self.cache.get(key) if self.cache else None
+        if cached and self.max_age > 0 and time.time() - cached.get("fetched", 0) < self.max_age:
+            with self._lock:
+                self.cache_hits += 1
+                self.units_saved += cost
+            return cached["body"]
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else None
+        # Conditional requests are charged like any other call, by the API and here
+        self.budget.spend(resource, cost)
+        response = self.transport.get(resource, params, headers)
+        with self._lock:
+            self.requests += 1
+            self.not_modified += int(response.status == 304)
+        if response.status == 304 and cached:
+            if self.max_age > 0:
+                self.cache.set(key, cached["etag"], cached["body"])  # fresh again for max_age
+            return cached["body"]
+        if response.status == 403 and "quotaExceeded" in response.body:
+            raise QuotaExceeded(f"{resource}: daily quota exhausted on the API side")
+        if response.status >= 400:
+            raise ApiError(response.status, resource, response.body)
+        if self.cache is not None and response.etag:
+            self.cache.set(key, response.etag, response.body)
+        return response.body
+
+    def list(self, resource, **params):
+        return json.loads(self.get(resource, **params))
+
+    def caption(self, video_id, language="en"):
+        """Text of the preferred caption track (SRT), or "" if there is none or it is not ours."""
+        if self.budget.remaining() < QUOTA_COSTS["captions"] + CAPTION_DOWNLOAD_COST:
+            raise QuotaExceeded(f"captions for {video_id} need "
+                                f"{QUOTA_COSTS['captions'] + CAPTION_DOWNLOAD_COST} units")
+        try:
+            tracks = self.list("captions", part="snippet", videoId=video_id).get("items", [])
+            if not tracks:
+                return ""
+            preferred = [t for t in tracks if t["snippet"]["language"] == language
+                         and t["snippet"]["trackKind"] != "forced"]
+            return self.get(f"captions/{(preferred or tracks)[0]['id']}", tfmt="srt")
+        except ApiError as e:
+            print(f"⚠️ Captions unavailable for {video_id}: {e}")
+            return ""
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "cache_hits": self.cache_hits,
+            "units_saved": self.units_saved,
+            "quota_used": self.budget.used,
+            "quota_limit": self.budget.limit,
+            "calls": dict(self.budget.calls),
+        }
+
+
+def channel_row(item):
+    snippet, stats = item["snippet"], item.get("statistics", {})
+    return {
+        "channel_id": item["id"],
+        "channel_title": snippet["title"],
+        "channel_description": snippet["description"],
+        "channel_country": snippet.get("country", ""),
+        "channel_thumbnail": snippet["thumbnails"]["high"]["url"],
+        "channel_subscriberCount": stats.get("subscriberCount", ""),
+        "channel_videoCount": stats.get("videoCount", ""),
+    }
+
+
+def video_row(item, captions=""):
+    snippet = item["snippet"]
+    stats = item.get("statistics", {})
+    content = item.get("contentDetails", {})
+    thumbnails = snippet.get("thumbnails", {})
+    return {
+        "id": item["id"],
+        "title": snippet.get("title", ""),
+        "description": snippet.get("description", ""),
+        "publishedAt": snippet.get("publishedAt", ""),
+        "tags": "|".join(snippet.get("tags", [])),
+        "categoryId": snippet.get("categoryId", ""),
+        "defaultLanguage": snippet.get("defaultLanguage", ""),
+        "defaultAudioLanguage": snippet.get("defaultAudioLanguage", ""),
+        "thumbnail_default": thumbnails.get("default", {}).get("url", ""),
+        "thumbnail_high": thumbnails.get("high", {}).get("url", ""),
+        "duration": content.get("duration", ""),
+        "viewCount": stats.get("viewCount", ""),
+        "likeCount": stats.get("likeCount", ""),
+        "commentCount": stats.get("commentCount", ""),
+        "privacyStatus": item.get("status", {}).get("privacyStatus", ""),
+        "captions": captions.replace("\n", " "),  # one line per row in the CSV
+    }
+
+
+def get_channels(client, channel_ids, part="snippet,statistics,contentDetails"):
+    """{channel_id: channel resource}, looked up ``MAX_RESULTS`` ids per call."""
+    channels = {}
+    for start in range(0, len(channel_ids), MAX_RESULTS):
+        batch = channel_ids[start:start + MAX_RESULTS]
+        for item in client.list("channels", part=part, id=",".join(batch), maxResults=MAX_RESULTS).get("items", []):
+            channels[item["id"]] = item
+    return channels
+
+
+def get_videos(client, video_ids):
+    """Video resources for ``video_ids`` (at most ``MAX_RESULTS``), in the order given."""
+    if not video_ids:
+        return []
+    items = client.list("videos", part=VIDEO_PARTS, id=",".join(video_ids)).get("items", [])
+    order = {video_id: i for i, video_id in enumerate(video_ids)}
+    return sorted(items, key=lambda item: order.get(item["id"], len(order)))
+
+
+def iter_upload_pages(client, playlist_id, page_token=None):
+    """Yield (video ids, next page token) for each page of an uploads playlist, newest first."""
+    while True:
+        page = client.list("playlistItems", part="snippet", playlistId=playlist_id,
+                           maxResults=MAX_RESULTS, pageToken=page_token)
+        page_token = page.get("nextPageToken")
+        yield [item["snippet"]["resourceId"]["videoId"] for item in page.get("items", [])], page_token
+        if not page_token:
+            return
+
+
+def write_csv(path, channel, videos):
+    """Channel columns appended to every video row, as the downstream cleaning expects."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=VIDEO_FIELDS + CHANNEL_FIELDS)
+        writer.writeheader()
+        for video in videos:
+            writer.writerow({**video, **channel})
+    os.replace(tmp, path)
+    return path
+
+
+class ChannelHarvester:
+    """Checkpointed, incremental harvest of channel uploads into one CSV per channel."""
+
+    def __init__(self, client, state_dir=STATE_DIR, output_dir=OUTPUT_DIR, max_captions=0,
+                 caption_language="en", full=False):
+        self.client = client
+        self.output_dir = output_dir
+        self.checkpoint_dir = os.path.join(state_dir, "checkpoints")
+        self.videos_dir = os.path.join(state_dir, "videos")
+        self.max_captions = max_captions
+        self.caption_language = caption_language
+        self.full = full
+        for directory in (output_dir, self.checkpoint_dir, self.videos_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    # ----- per-channel state -----
+    def load_checkpoint(self, channel_id):
+        return _read_json(os.path.join(self.checkpoint_dir, f"{channel_id}.json")) or {
+            "channel_id": channel_id, "video_ids": [], "page_token": None,
+            "complete": False, "video_count": None, "captions": 0,
+        }
+
+    def save_checkpoint(self, checkpoint):
+        _write_json(os.path.join(self.checkpoint_dir, f"{checkpoint['channel_id']}.json"), checkpoint)
+
+    def _videos_path(self, channel_id):
+        return os.path.join(self.videos_dir, f"{channel_id}.jsonl")
+
+    def load_videos(self, channel_id):
+        """Stored rows for a channel, latest copy per video, newest video first."""
+        videos = {}
+        path = self._videos_path(channel_id)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    videos[row["id"]] = row
+        return sorted(videos.values(), key=lambda row: row["publishedAt"], reverse=True)
+
+    def _append_videos(self, channel_id, rows):
+        with open(self._videos_path(channel_id), "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ----- harvesting -----
+    def harvest_channel(self, channel):
+        """Fetch new (or, with ``full``, all) uploads of one channel; returns a summary dict."""
+        channel_id = channel["id"]
+        checkpoint = self.load_checkpoint(channel_id)
+        checkpoint["channel"] = channel_row(channel)
+        video_count = channel.get("statistics", {}).get("videoCount")
+        summary = {"channel_id": channel_id, "title": checkpoint["channel"]["channel_title"], "new_videos": 0}
+        if checkpoint["complete"] and checkpoint["video_count"] == video_count and not self.full:
+            return {**summary, "status": "unchanged"}
+
+        if checkpoint["complete"]:
+            # A finished channel starts a fresh pass from the newest upload
+            checkpoint.update(page_token=None, complete=False)
+        known = set(checkpoint["video_ids"])
+        playlist_id = channel["contentDetails"]["relatedPlaylists"]["uploads"]
+        try:
+            for video_ids, next_token in iter_upload_pages(self.client, playlist_id, checkpoint["page_token"]):
+                wanted = video_ids if self.full else [v for v in video_ids if v not in known]
+                rows = []
+                for item in get_videos(self.client, wanted):
+                    captions = ""
+                    if checkpoint["captions"] < self.max_captions and item["id"] not in known:
+                        captions = self.client.caption(item["id"], self.caption_language)
+                        checkpoint["captions"] += int(bool(captions))
+                    rows.append(video_row(item, captions))
+                self._append_videos(channel_id, rows)
+                checkpoint["video_ids"].extend(v for v in wanted if v not in known)
+                summary["new_videos"] += sum(v not in known for v in wanted)
+                known.update(wanted)
+                checkpoint["page_token"] = next_token
+                self.save_checkpoint(checkpoint)
+                # Uploads are newest first: once a page reaches stored videos the rest are stored too
+                if not self.full and len(wanted) < len(video_ids) and checkpoint["video_count"] is not None:
+                    break
+        except QuotaExceeded as e:
+            self.save_checkpoint(checkpoint)
+            return {**summary, "status": "quota", "error": str(e)}
+        except (ApiError, LookupError, requests.RequestException) as e:
+            self.save_checkpoint(checkpoint)
+            return {**summary, "status": "error", "error": str(e)}
+
+        checkpoint.update(page_token=None, complete=True, video_count=video_count)
+        self.save_checkpoint(checkpoint)
+        path = write_csv(os.path.join(self.output_dir, f"{channel_id}_videos_metadata.csv"),
+                         checkpoint["channel"], self.load_videos(channel_id))
+        return {**summary, "status": "complete", "csv": path}
+
+    def run(self, channel_ids, workers=4):
+        """Harvest ``channel_ids`` with up to ``workers`` channels in flight; returns summaries."""
+        channel_ids = list(dict.fromkeys(channel_ids))
+        try:
+            channels = get_channels(self.client, channel_ids)
+        except QuotaExceeded as e:
+            return [{"channel_id": c, "status": "quota", "error": str(e), "new_videos": 0} for c in channel_ids]
+        summaries = [{"channel_id": c, "status": "not found", "new_videos": 0}
+                     for c in channel_ids if c not in channels]
+
+        def on_result(channel, summary):
+            summaries.append(summary)
+            print(f"{'✅' if summary['status'] in ('complete', 'unchanged') else '⚠️'} "
+                  f"{summary['title']}: {summary['status']}, {summary['new_videos']} new videos "
+                  f"({self.client.budget.used} units used)")
+
+        items = [channels[c] for c in channel_ids if c in channels]
+        asyncio.run(run_workers(items, self.harvest_channel, on_result, workers))
+        return summaries
+
+
+def build_client(api_key=API_KEY, quota=QUOTA_BUDGET, state_dir=STATE_DIR, cache=True, record=None, replay=None,
+                 max_age=CACHE_MAX_AGE):
+    """A client over the live API, a recording of it (``record``) or a replay (``replay``)."""
+    if replay:
+        transport = RecordedTransport(replay)
+    elif record:
+        transport = RecordedTransport(record, HttpTransport(api_key))
+    else:
+        transport = HttpTransport(api_key)
+    return YouTubeClient(transport, QuotaBudget(quota),
+                         ResponseCache(os.path.join(state_dir, "responses")) if cache else None, max_age)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest video metadata for many YouTube channels.")
+    parser.add_argument("channels", nargs="*", help="channel ids")
+    parser.add_argument("--channels-file", help="file with one channel id per line")
+    parser.add_argument("--api-key", default=API_KEY)
+    parser.add_argument("--quota", type=int, default=QUOTA_BUDGET, help="units this run may spend")
+    parser.add_argument("--workers", type=int, default=4, help="channels harvested concurrently")
+    parser.add_argument("--captions", type=int, default=0, help="videos per channel to fetch captions for")
+    parser.add_argument("--language", default="en", help="preferred caption language")
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--full", action="store_true", help="refresh every video, not just new uploads")
+    parser.add_argument("--no-cache", action="store_true", help="do not cache or revalidate responses")
+    parser.add_argument("--cache-max-age", type=float, default=CACHE_MAX_AGE,
+                        help="seconds a cached response is reused without a request (costs no quota)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--record", metavar="DIR", help="save every live response under DIR")
+    source.add_argument("--replay", metavar="DIR", help="serve responses from DIR instead of the API")
+    args = parser.parse_args(argv)
+
+    channel_ids = list(args.channels)
+    if args.channels_file:
+        with open(args.channels_file, encoding="utf-8") as f:
+            channel_ids += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not channel_ids:
+        parser.error("no channel ids given")
+
+    client = build_client(args.api_key, args.quota, args.state_dir, not args.no_cache, args.record, args.replay,
+                          args.cache_max_age)
+    harvester = ChannelHarvester(client, args.state_dir, args.out, args.captions, args.language, args.full)
+    summaries = harvester.run(channel_ids, args.workers)
+    stats = client.stats()
+    counts = {}
+    for summary in summaries:
+        counts[summary["status"]] = counts.get(summary["status"], 0) + 1
+    print(f"📹 {sum(s['new_videos'] for s in summaries)} new videos; channels: "
+          + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    print(f"📊 API units consumed: {stats['quota_used']} of {stats['quota_limit']} "
+          f"({stats['requests']} requests, {stats['not_modified']} not modified; "
+          f"{stats['cache_hits']} served from cache, {stats['units_saved']} units saved)")
+    print(f"✅ CSVs in {args.out}/, checkpoints in {args.state_dir}/")
+
+
+if __name__ == "__main__":
+    main()